@@ -4,16 +4,19 @@ artest is a Python package designed for automated regression testing, providing
 
 Modules:
     - artest: Contains decorators for automatic regression and stubbing.
+    - metrics: Contains the in-process metrics of capturing test cases.
+    - storage: Contains the storage backends of test case files.
 
 Public Objects:
     - autoreg: Decorator for creating regression tests during runtime.
     - autostub: Decorator for automatic stubbing during test execution.
+    - autoshadow: Decorator for running a candidate implementation alongside an autoreg function.
     - search_meta: Search for metadata of test cases.
 
 Version: 0.3.0
 """
 
-__all__ = ["autoreg", "autostub", "search_meta"]
+__all__ = ["autoreg", "autostub", "autoshadow", "search_meta"]
 __version__ = "0.3.0"
 
-from .artest import autoreg, autostub, search_meta
+from .artest import autoreg, autoshadow, autostub, search_meta
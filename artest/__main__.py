@@ -22,7 +22,9 @@ Note:
 
 """
 
+import sys
+
 import artest
 
 if __name__ == "__main__":
-    artest.artest.main()
+    artest.artest.main(sys.argv[1:])
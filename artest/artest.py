@@ -5,27 +5,50 @@ This module provides decorators and utilities for automatic regression testing.
 Functions:
     autoreg: Auto Regression Test Decorator.
     autostub: Autostub Decorator.
+    autoshadow: Shadow Decorator.
     main: Execute Automated Regression Testing.
 
 """
 
 import ast
+import atexit
+import copy
+import cProfile
 import dataclasses
 import datetime as dt
 import hashlib
 import importlib
+import importlib.util
 import inspect
+import io
 import json
+import mmap
 import os
+import pickle
+import pstats
+import queue
+import random
+import re
 import shutil
+import signal
+import statistics
+import subprocess
 import sys
 import tempfile
+import threading
+import time
+import tracemalloc
 import warnings
-from collections import Counter, defaultdict
+import zipfile
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import ExitStack, contextmanager, nullcontext
 from contextvars import ContextVar
 from functools import wraps
 from glob import glob
-from typing import Literal, Optional
+from typing import Literal, NamedTuple, Optional
+from uuid import uuid4
+from xml.sax.saxutils import quoteattr
 
 import artest
 from artest.config import (
@@ -33,35 +56,63 @@ from artest.config import (
     get_assert_pickled_object_on_case_mode,
     get_function_root_path,
     get_is_equal,
+    get_large_output_threshold,
     get_message_formatter,
     get_on_func_id_duplicate,
     get_on_pickle_dump_error,
     get_pickler,
     get_printer,
+    get_profile_interval_on_case_mode,
+    get_record_memory_on_case_mode,
+    get_record_performance_on_case_mode,
+    get_storage_backend,
     get_test_case_id_generator,
     get_test_case_quota,
+    get_test_case_tags,
     set_test_case_quota,
 )
+from artest.config._match_result import _default_is_equal, _is_buffer_equal
+from artest.metrics import get_metrics_registry
+from artest.storage import LocalStorage
 from artest.types import (
     ArtestConfig,
     ArtestMode,
+    BenchConfig,
+    BenchResult,
     ConfigTestCaseQuota,
+    ExportConfig,
+    ExportResult,
     FunctionOutput,
     FunctionOutputType,
+    GcConfig,
+    GcResult,
+    ImportConfig,
+    ImportResult,
     MessageRecord,
     Metadata,
     MetadataTestCase,
+    MinimizeConfig,
+    MinimizeResult,
     OnFuncIdDuplicateAction,
     OnPickleDumpErrorAction,
     StatusTestResult,
+    StatusVerifyResult,
+    StubMatchPolicy,
     TestResult,
+    VerifyConfig,
+    VerifyResult,
 )
 
 _overload_on_duplicate_var = ContextVar("__ARTEST_ON_DUPLICATE__", default=None)
 _fcid_var = ContextVar("__ARTEST_FCID__")
 _tcid_var = ContextVar("__ARTEST_TCID__")
 _artest_mode_var = ContextVar("__ARTEST_MODE__", default=ArtestMode.USE_ENV)
+# the stub functions called by a shadowed primary implementation
+_stub_calls_var = ContextVar("__ARTEST_STUB_CALLS__", default=None)
 _enable_fastreg_var = ContextVar("__ARTEST_ENABLE_FASTREG__", default=False)
+_prefetched_files_var = ContextVar("__ARTEST_PREFETCHED_FILES__", default=None)
+_preloaded_objects_var = ContextVar("__ARTEST_PRELOADED_OBJECTS__", default=None)
+_metrics = get_metrics_registry()
 
 
 def _get_on_duplicate(on_duplicate: Optional[OnFuncIdDuplicateAction]):
@@ -254,6 +305,15 @@ def _get_artest_mode():
 
 
 class _Paths:
+    # a test case is complete when these files exist and its metadata is added
+    REQUIRED_CASE_NAMES = ("inputs", "func", "outputs")
+    CASE_NAMES = REQUIRED_CASE_NAMES + (
+        "outputs.digest",
+        "profile.collapsed",
+        "stub",
+        "fastreg",
+    )
+
     @staticmethod
     def _build_path(fcid: str, tcid: str, basename: str):
         return os.path.join(get_artest_root(), fcid, tcid, basename)
@@ -271,6 +331,12 @@ class _Paths:
     def outputs(self, fcid: str, tcid: str):
         return self._build_path(fcid, tcid, "outputs")
 
+    def outputs_digest(self, fcid: str, tcid: str):
+        return self._build_path(fcid, tcid, "outputs.digest")
+
+    def profile_collapsed(self, fcid: str, tcid: str):
+        return self._build_path(fcid, tcid, "profile.collapsed")
+
     def stub(
         self,
         caller_fcid: str,
@@ -299,6 +365,9 @@ class _Paths:
             os.path.join("fastreg", f"{reg_fcid}.{call_count}.{input_hash}.output"),
         )
 
+    def fastreg_index(self, caller_fcid: str, tcid: str):
+        return self._build_path(caller_fcid, tcid, os.path.join("fastreg", "index"))
+
     def fastreg_stub_counter(
         self,
         caller_fcid: str,
@@ -319,8 +388,37 @@ class _Paths:
 _paths = _Paths()
 
 
+def _is_local_storage() -> bool:
+    """Check whether the test case files are stored under the artest root."""
+    storage = get_storage_backend()
+    return isinstance(storage, LocalStorage) and os.path.abspath(
+        storage.root
+    ) == os.path.abspath(get_artest_root())
+
+
+def _require_local_storage(command: str):
+    if not _is_local_storage():
+        raise ValueError(
+            f"artest {command} only supports test case files stored under the artest root."
+        )
+
+
+def _delete_test_case(fcid: str, tcid: str):
+    """Delete all files of a test case, if any."""
+    if _is_local_storage():
+        shutil.rmtree(_paths.root(fcid, tcid), ignore_errors=True)
+        return
+    storage = get_storage_backend()
+    for key in storage.list(fcid, tcid):
+        storage.delete(*key)
+
+
 class _MetaHandler:
     _META_FILE_NAME = "meta.json"
+    # written only when sampling is on, so left out of the hash and the size
+    _UNHASHED_FILE_NAMES = frozenset({"profile.collapsed"})
+    # shadow calls record test cases from worker threads
+    _lock = threading.Lock()
 
     @property
     def meta_path(self):
@@ -345,40 +443,83 @@ class _MetaHandler:
             json.dump(dataclasses.asdict(meta), tmp, indent=4)
             tmp.seek(0)
 
+            # nothing else creates the root if test case files are stored elsewhere
+            os.makedirs(get_artest_root(), exist_ok=True)
             with open(self.meta_path, "w") as f:
                 f.write(tmp.read())
 
     def add_test_case_meta(self, tc_meta: MetadataTestCase):
-        meta = self.read_meta()
-        meta.test_cases.append(tc_meta)
-        self.save_meta(meta)
+        with self._lock:
+            meta = self.read_meta()
+            meta.test_cases.append(tc_meta)
+            self.save_meta(meta)
 
     @staticmethod
-    def build_meta(fcid: str, tcid: str):
-        """Build metadata for the test case.
+    def calc_hash(fcid: str, tcid: str, hash_version: int = 2) -> tuple[str, int]:
+        """Calculate the hash and the size of all files under the test case root.
 
         Args:
             fcid (str): the function id
             tcid (str): the test case id
+            hash_version (int): 1 hashes the absolute file paths, which change
+                when the artest root is moved. 2 hashes the paths relative to
+                the test case root.
+
+        Returns:
+            tuple[str, int]: The hash and the size in bytes.
         """
-        f_root = _paths.root(fcid, tcid)
-        if not os.path.isdir(f_root):
-            raise ValueError(f"Test case {fcid}/{tcid} does not exist.")
+        if hash_version == 1:
+            return _MetaHandler.calc_hash_of_root(_paths.root(fcid, tcid), 1)
+        storage = get_storage_backend()
+        return _MetaHandler._hash_files(
+            (key[2], storage.get(*key))
+            for key in storage.list(fcid, tcid)
+            if key[2] not in _MetaHandler._UNHASHED_FILE_NAMES
+        )
+
+    @staticmethod
+    def calc_hash_of_root(f_root: str, hash_version: int = 2) -> tuple[str, int]:
+        """Calculate the hash and the size of all files under a local directory.
+
+        See `calc_hash` for the hash versions.
+        """
+
+        def read_files():
+            for fname in sorted(glob(f"{f_root}/**/*", recursive=True)):
+                if not os.path.isfile(fname):
+                    continue
+                name = os.path.relpath(fname, f_root).replace(os.path.sep, "/")
+                if name in _MetaHandler._UNHASHED_FILE_NAMES:
+                    continue
+                if hash_version == 1:
+                    name = fname
+                with open(fname, "rb") as f:
+                    yield name, f.read()
 
-        # read all files under the test case root
-        # and calculate the hash
+        return _MetaHandler._hash_files(read_files())
 
+    @staticmethod
+    def _hash_files(files) -> tuple[str, int]:
         sha256_gen = hashlib.sha256()
         total_bytes_size = 0
-        for fname in sorted(glob(f"{f_root}/**/*", recursive=True)):
-            if not os.path.isfile(fname):
-                continue
-            total_bytes_size += os.path.getsize(fname)
-            with open(fname, "rb") as f:
-                sha256_gen.update(f"<{fname}>".encode())
-                sha256_gen.update(f.read())
-                sha256_gen.update(f"</{fname}>".encode())
-        hash_hex = sha256_gen.hexdigest()
+        for name, data in files:
+            total_bytes_size += len(data)
+            sha256_gen.update(f"<{name}>".encode())
+            sha256_gen.update(data)
+            sha256_gen.update(f"</{name}>".encode())
+        return sha256_gen.hexdigest(), total_bytes_size
+
+    def build_meta(self, fcid: str, tcid: str):
+        """Build metadata for the test case.
+
+        Args:
+            fcid (str): the function id
+            tcid (str): the test case id
+        """
+        if not get_storage_backend().list(fcid, tcid):
+            raise ValueError(f"Test case {fcid}/{tcid} does not exist.")
+
+        hash_hex, total_bytes_size = self.calc_hash(fcid, tcid)
 
         tc_meta = MetadataTestCase(
             version=artest.__version__,
@@ -387,6 +528,8 @@ class _MetaHandler:
             test_case_id=tcid,
             hash_hex=hash_hex,
             bytes_size=total_bytes_size,
+            hash_version=2,
+            tags=list(get_test_case_tags()),
         )
         return tc_meta
 
@@ -416,6 +559,607 @@ def search_meta(fcid: str, tcid: str, on_missing: Literal["none", "raise"] = "ra
     return None
 
 
+class _ExecutionTracer:
+    """Records the source lines executed while the tracer is active.
+
+    Only files under the function root path are traced, artest itself is excluded.
+    Executed lines are collected in `lines`, keyed by absolute file path.
+    If `record_lines` is False, only function calls are traced,
+    and `lines` only tells which files were executed.
+    If `record_arcs` is True, the transitions between lines are collected in `arcs`
+    as `(from_line, to_line)`, where a negative line number is the entry or exit
+    of the function starting at that line.
+    """
+
+    def __init__(self, record_lines: bool = True, record_arcs: bool = False):
+        self.lines = defaultdict(set)
+        self.arcs = defaultdict(set)
+        self._record_lines = record_lines
+        self._record_arcs = record_arcs
+        self._root_path = get_function_root_path()
+        self._artest_path = os.path.dirname(os.path.abspath(artest.__file__))
+        self._traced_files = {}
+        self._previous_trace = None
+
+    def _get_traced_path(self, filename):
+        if filename not in self._traced_files:
+            path = os.path.abspath(filename)
+            # os.path.join adds the separator unless the root already ends with it, e.g. "/"
+            in_root = path == self._root_path or path.startswith(
+                os.path.join(self._root_path, "")
+            )
+            if in_root and not path.startswith(self._artest_path + os.path.sep):
+                self._traced_files[filename] = path
+            else:
+                self._traced_files[filename] = None
+        return self._traced_files[filename]
+
+    def _trace_call(self, frame, event, arg):
+        path = self._get_traced_path(frame.f_code.co_filename)
+        if path is None:
+            return None
+        lines = self.lines[path]
+        lines.add(frame.f_lineno)
+        if self._record_arcs:
+            return self._make_trace_arcs(lines, self.arcs[path], frame)
+        if not self._record_lines:
+            return None
+
+        def _trace_line(frame, event, arg):
+            if event == "line":
+                lines.add(frame.f_lineno)
+            return _trace_line
+
+        return _trace_line
+
+    @staticmethod
+    def _make_trace_arcs(lines, arcs, frame):
+        last_line = -frame.f_code.co_firstlineno
+
+        def _trace_arc(frame, event, arg):
+            nonlocal last_line
+            if event == "line":
+                lines.add(frame.f_lineno)
+                arcs.add((last_line, frame.f_lineno))
+                last_line = frame.f_lineno
+            elif event == "return":
+                arcs.add((last_line, -frame.f_code.co_firstlineno))
+            return _trace_arc
+
+        return _trace_arc
+
+    def __enter__(self):
+        self._previous_trace = sys.gettrace()
+        sys.settrace(self._trace_call)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        sys.settrace(self._previous_trace)
+
+
+class _PeakMemoryTracer:
+    """Traces the peak memory allocated while the tracer is active.
+
+    tracemalloc is started if it is not tracing yet, and stopped on exit.
+    The peak is relative to the traced memory when the tracer is entered.
+    """
+
+    def __init__(self):
+        self.peak_memory = None
+        self._started = False
+        self._current_memory = 0
+
+    def __enter__(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._current_memory = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        self.peak_memory = max(peak_memory - self._current_memory, 0)
+        if self._started:
+            tracemalloc.stop()
+
+
+class _StackSampler:
+    """Samples the stack of the running code with a profiling timer.
+
+    SIGPROF is raised every `interval` seconds of CPU time while the sampler
+    is active, and the stack below the frame entering the sampler is counted.
+    Frames of the artest package are left out. The samples are formatted as
+    collapsed stacks, which can be rendered by flame graph tools.
+
+    Sampling relies on `signal.setitimer`, so it only works in the main thread,
+    and it is skipped if another SIGPROF handler is installed.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self._artest_path = os.path.dirname(os.path.abspath(artest.__file__))
+        self._entry_frame = None
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        names = []
+        while frame is not None and frame is not self._entry_frame:
+            code = frame.f_code
+            if not code.co_filename.startswith(self._artest_path + os.path.sep):
+                names.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+            frame = frame.f_back
+        if frame is not None and names:
+            self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        if (
+            not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()
+            or signal.getsignal(signal.SIGPROF) not in (signal.SIG_DFL, None)
+        ):
+            return self
+        self._entry_frame = sys._getframe(1)
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._entry_frame is None:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        self._entry_frame = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class _CoverageHandler:
+    """Stores the source lines executed by each test case.
+
+    The coverage map is saved next to the metadata, with file paths
+    relative to the function root path, in the form of
+    `{fcid: {tcid: {relpath: [lines]}}}`.
+    """
+
+    _COVERAGE_FILE_NAME = "coverage.json"
+
+    def __init__(self):
+        self._coverage = None
+        self._modified = False
+
+    @property
+    def coverage_path(self):
+        return os.path.join(get_artest_root(), self._COVERAGE_FILE_NAME)
+
+    def remove(self):
+        if os.path.isfile(self.coverage_path):
+            os.remove(self.coverage_path)
+        self._coverage = None
+
+    def load(self):
+        if os.path.isfile(self.coverage_path):
+            with open(self.coverage_path, "r") as f:
+                self._coverage = json.load(f)
+        else:
+            self._coverage = {}
+        self._modified = False
+
+    def save(self):
+        if not self._modified:
+            return
+        os.makedirs(get_artest_root(), exist_ok=True)
+        with open(self.coverage_path, "w") as f:
+            json.dump(self._coverage, f)
+        self._modified = False
+
+    def get(self, fcid: str, tcid: str) -> Optional[dict[str, list[int]]]:
+        if self._coverage is None:
+            self.load()
+        return self._coverage.get(fcid, {}).get(tcid)
+
+    def set(self, fcid: str, tcid: str, lines: dict[str, set[int]]):
+        if self._coverage is None:
+            self.load()
+        root_path = get_function_root_path()
+        self._coverage.setdefault(fcid, {})[tcid] = {
+            os.path.relpath(path, root_path): sorted(path_lines)
+            for path, path_lines in lines.items()
+        }
+        self._modified = True
+
+    def discard(self, fcid: str, tcid: str):
+        if self._coverage is None:
+            self.load()
+        if self._coverage.get(fcid, {}).pop(tcid, None) is not None:
+            self._modified = True
+
+    def is_affected(self, fcid: str, tcid: str, changed_files: list[str]) -> bool:
+        """Whether the test case executed any of the changed files.
+
+        A test case without recorded coverage is always affected.
+
+        Args:
+            fcid (str): the function id
+            tcid (str): the test case id
+            changed_files (list[str]): absolute paths of the changed files
+        """
+        covered = self.get(fcid, tcid)
+        if covered is None:
+            return True
+        root_path = get_function_root_path()
+        changed_files = set(changed_files)
+        return any(os.path.join(root_path, path) in changed_files for path in covered)
+
+
+_coverage_handler = _CoverageHandler()
+
+
+class _ResultCacheHandler:
+    """Caches successful test results by the fingerprint of the test case.
+
+    The fingerprint covers the artifact hash in the metadata and the source
+    hash of every file executed by the test case. If neither has changed,
+    the test case would pass again and does not need to be replayed.
+    The cache is saved next to the metadata, in the form of
+    `{fcid: {tcid: {"fingerprint": str, "files": [relpath]}}}`.
+    """
+
+    _RESULT_CACHE_FILE_NAME = "result_cache.json"
+
+    def __init__(self):
+        self._cache = None
+        self._modified = False
+        self._source_hashes = {}
+
+    @property
+    def result_cache_path(self):
+        return os.path.join(get_artest_root(), self._RESULT_CACHE_FILE_NAME)
+
+    def remove(self):
+        if os.path.isfile(self.result_cache_path):
+            os.remove(self.result_cache_path)
+        self._cache = None
+
+    def load(self):
+        if os.path.isfile(self.result_cache_path):
+            with open(self.result_cache_path, "r") as f:
+                self._cache = json.load(f)
+        else:
+            self._cache = {}
+        self._modified = False
+        self._source_hashes = {}
+
+    def save(self):
+        if not self._modified:
+            return
+        os.makedirs(get_artest_root(), exist_ok=True)
+        with open(self.result_cache_path, "w") as f:
+            json.dump(self._cache, f)
+        self._modified = False
+
+    def _source_hash(self, relpath: str) -> str:
+        if relpath not in self._source_hashes:
+            path = os.path.join(get_function_root_path(), relpath)
+            try:
+                with open(path, "rb") as f:
+                    source_hash = importlib.util.source_hash(f.read()).hex()
+            except OSError:
+                source_hash = "missing"
+            self._source_hashes[relpath] = source_hash
+        return self._source_hashes[relpath]
+
+    def _fingerprint(self, tc_meta: MetadataTestCase, files, enable_fastreg: bool):
+        sha256_gen = hashlib.sha256()
+        sha256_gen.update(f"{artest.__version__}:{enable_fastreg}".encode())
+        sha256_gen.update(tc_meta.hash_hex.encode())
+        for relpath in sorted(files):
+            sha256_gen.update(f"<{relpath}>{self._source_hash(relpath)}".encode())
+        return sha256_gen.hexdigest()
+
+    def is_cached(self, tc_meta: MetadataTestCase, enable_fastreg: bool) -> bool:
+        if self._cache is None:
+            self.load()
+        entry = self._cache.get(tc_meta.func_id, {}).get(tc_meta.test_case_id)
+        if entry is None:
+            return False
+        return entry["fingerprint"] == self._fingerprint(
+            tc_meta, entry["files"], enable_fastreg
+        )
+
+    def update(
+        self,
+        tc_meta: MetadataTestCase,
+        result: TestResult,
+        executed_files,
+        enable_fastreg: bool,
+    ):
+        # nothing traced, e.g. the function is outside the function root path,
+        # so a code change could not be told from the fingerprint
+        if result.status != StatusTestResult.SUCCESS or not executed_files:
+            self.discard(tc_meta.func_id, tc_meta.test_case_id)
+            return
+        if self._cache is None:
+            self.load()
+        root_path = get_function_root_path()
+        files = sorted(os.path.relpath(path, root_path) for path in executed_files)
+        self._cache.setdefault(tc_meta.func_id, {})[tc_meta.test_case_id] = {
+            "fingerprint": self._fingerprint(tc_meta, files, enable_fastreg),
+            "files": files,
+        }
+        self._modified = True
+
+    def discard(self, fcid: str, tcid: str):
+        if self._cache is None:
+            self.load()
+        if self._cache.get(fcid, {}).pop(tcid, None) is not None:
+            self._modified = True
+
+
+_result_cache_handler = _ResultCacheHandler()
+
+
+class _ProfileHandler:
+    """Merges the cProfile stats of test cases per function id.
+
+    Entries of the artest package, including the autostub wrappers, are
+    filtered out so that only user code shows. So are the library calls that
+    are only made by artest, e.g. pickling the inputs of a stub.
+    Code under the function root path is always kept.
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def clear(self):
+        self._stats = {}
+
+    def _filter(self, stats: pstats.Stats) -> pstats.Stats:
+        root_path = get_function_root_path()
+        artest_path = os.path.dirname(os.path.abspath(artest.__file__))
+
+        def is_artest_code(key):
+            return os.path.abspath(key[0]).startswith(artest_path + os.path.sep)
+
+        def is_user_code(key):
+            # builtins are named "~" and frozen modules "<frozen ...>"
+            if key[0] == "~" or key[0].startswith("<"):
+                return False
+            return os.path.abspath(key[0]).startswith(root_path)
+
+        callees = defaultdict(list)
+        for key, (cc, nc, tt, ct, callers) in stats.stats.items():
+            for caller in callers:
+                callees[caller].append(key)
+
+        # keep what user code calls, without following calls into artest
+        kept = {
+            key for key in stats.stats if is_user_code(key) and not is_artest_code(key)
+        }
+        pending = list(kept)
+        while pending:
+            for callee in callees[pending.pop()]:
+                if callee not in kept and not is_artest_code(callee):
+                    kept.add(callee)
+                    pending.append(callee)
+        dropped = set(stats.stats) - kept
+        for key in dropped:
+            del stats.stats[key]
+        for cc, nc, tt, ct, callers in stats.stats.values():
+            for key in dropped.intersection(callers):
+                del callers[key]
+        return stats
+
+    def add(self, fcid: str, profiler: cProfile.Profile):
+        stats = self._filter(pstats.Stats(profiler))
+        if fcid in self._stats:
+            self._stats[fcid].add(stats)
+        else:
+            self._stats[fcid] = stats
+
+    def save(self, dirpath: str):
+        """Save the merged stats as `{dirpath}/{fcid}.pstats`."""
+        os.makedirs(dirpath, exist_ok=True)
+        for fcid, stats in self._stats.items():
+            stats.dump_stats(os.path.join(dirpath, f"{fcid}.pstats"))
+
+    def print_top(self, n: int):
+        """Print the top n entries of all functions by cumulative time."""
+        if not self._stats:
+            return
+        stream = io.StringIO()
+        all_stats = pstats.Stats(stream=stream)
+        for stats in self._stats.values():
+            all_stats.add(stats)
+        all_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(n)
+        get_printer()(stream.getvalue())
+
+
+_profile_handler = _ProfileHandler()
+
+
+class _LargeOutputsWriter:
+    """Builds the large layout of outputs.
+
+    The layout is the magic, the 8-byte length of a JSON header, the header,
+    and then the segments aligned to `ALIGNMENT` bytes. The header holds the
+    [offset, length] of each segment relative to the first aligned byte
+    after the header. A pickled object is a segment of the protocol 5 pickle
+    and a segment for each of its out-of-band buffers.
+    """
+
+    MAGIC = b"ARTEST-LARGE-1\n"
+    ALIGNMENT = 64
+    CHUNK_BYTES = 16 * 1024 * 1024
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def add(self, data) -> list[int]:
+        padding = -self._size % self.ALIGNMENT
+        if padding:
+            self._parts.append(bytes(padding))
+            self._size += padding
+        offset = self._size
+        data = memoryview(data).cast("B")
+        self._parts.append(data)
+        self._size += data.nbytes
+        return [offset, data.nbytes]
+
+    def add_pickle(self, obj) -> dict:
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        return {
+            "pickle": self.add(data),
+            "buffers": [self.add(buffer.raw()) for buffer in buffers],
+        }
+
+    def getvalue(self, header: dict) -> bytes:
+        header_data = json.dumps(header).encode()
+        prefix = self.MAGIC + len(header_data).to_bytes(8, "little") + header_data
+        return b"".join([prefix, bytes(-len(prefix) % self.ALIGNMENT), *self._parts])
+
+    @classmethod
+    def encode(cls, outputs: FunctionOutput, pickled_size: int) -> Optional[bytes]:
+        """Encode outputs in the large layout.
+
+        Bytes and bytearrays are saved as a raw buffer, lists are pickled in
+        chunks of about `CHUNK_BYTES`, and other objects are pickled with
+        their buffers, e.g. of numpy arrays, out of band.
+
+        Returns:
+            Optional[bytes]: The encoded outputs, None if the standard pickle cannot pickle them.
+        """
+        writer = cls()
+        output = outputs.output
+        header = {"output_type": outputs.output_type.value}
+        try:
+            if type(output) in (bytes, bytearray):
+                header["kind"] = "bytes"
+                header["type"] = type(output).__name__
+                header["buffer"] = writer.add(output)
+            elif output.__class__ is list and output:
+                chunk_length = max(
+                    1, len(output) * cls.CHUNK_BYTES // max(pickled_size, 1)
+                )
+                header["kind"] = "list"
+                header["length"] = len(output)
+                header["chunks"] = [
+                    writer.add_pickle(output[i : i + chunk_length])
+                    for i in range(0, len(output), chunk_length)
+                ]
+            else:
+                header["kind"] = "object"
+                header["object"] = writer.add_pickle(output)
+        except Exception:
+            return None
+        return writer.getvalue(header)
+
+
+class _LargeOutputs:
+    """Reads outputs saved in the large layout, lazily from the given buffer.
+
+    Given a memory map, only the pages being compared are read into memory,
+    and array-likes are loaded without copying their buffers.
+    """
+
+    def __init__(self, data):
+        self._source = data
+        self._data = memoryview(data)
+        start = len(_LargeOutputsWriter.MAGIC)
+        header_size = int.from_bytes(self._data[start : start + 8], "little")
+        self._header = json.loads(
+            bytes(self._data[start + 8 : start + 8 + header_size])
+        )
+        end = start + 8 + header_size
+        self._base = end + -end % _LargeOutputsWriter.ALIGNMENT
+        self.output_type = FunctionOutputType(self._header["output_type"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the buffer, and close it if it is a memory map."""
+        try:
+            self._data.release()
+            if isinstance(self._source, mmap.mmap):
+                self._source.close()
+        except BufferError:
+            # still referenced by loaded objects, closed when they are collected
+            pass
+
+    @staticmethod
+    def is_large(data) -> bool:
+        magic = _LargeOutputsWriter.MAGIC
+        return bytes(memoryview(data)[: len(magic)]) == magic
+
+    def _view(self, segment):
+        offset, length = segment
+        return self._data[self._base + offset : self._base + offset + length]
+
+    def _load_pickle(self, segment):
+        return pickle.loads(
+            self._view(segment["pickle"]),
+            buffers=[self._view(buffer) for buffer in segment["buffers"]],
+        )
+
+    def _iter_list(self):
+        for chunk in self._header["chunks"]:
+            yield from self._load_pickle(chunk)
+
+    def load(self) -> FunctionOutput:
+        """Load the whole outputs."""
+        kind = self._header["kind"]
+        if kind == "bytes":
+            cls = bytearray if self._header["type"] == "bytearray" else bytes
+            output = cls(self._view(self._header["buffer"]))
+        elif kind == "list":
+            output = list(self._iter_list())
+        else:
+            output = self._load_pickle(self._header["object"])
+        return FunctionOutput(self.output_type, output)
+
+    def is_equal(self, actual, is_equal) -> bool:
+        """Compare the actual output with the saved one, a chunk at a time.
+
+        Args:
+            actual: The actual output.
+            is_equal: The function comparing the items of lists and other objects.
+        """
+        kind = self._header["kind"]
+        if kind == "bytes":
+            if type(actual).__name__ != self._header["type"]:
+                return False
+            return bool(_is_buffer_equal(actual, self._view(self._header["buffer"])))
+        if kind == "list":
+            if actual.__class__ is not list or len(actual) != self._header["length"]:
+                return False
+            return all(is_equal(a, e) for a, e in zip(actual, self._iter_list()))
+        return is_equal(actual, self._load_pickle(self._header["object"]))
+
+
+class _DigestWriter:
+    """A file-like object hashing what is written to it."""
+
+    def __init__(self):
+        self._sha256_gen = hashlib.sha256()
+
+    def write(self, data):
+        self._sha256_gen.update(data)
+        return len(data)
+
+    def hexdigest(self):
+        return self._sha256_gen.hexdigest()
+
+
 class _TestCaseSerializer:
     """Handles serialization and deserialization of test case objects."""
 
@@ -431,13 +1175,22 @@ class _TestCaseSerializer:
         try:
             pickler.dump(obj, fp)
         except Exception as e:
-            action = get_on_pickle_dump_error(e)
-            if action == OnPickleDumpErrorAction.IGNORE:
-                return
-            if action == OnPickleDumpErrorAction.RAISE:
-                raise e
-            if action == OnPickleDumpErrorAction.WARNING:
-                warnings.warn(str(e))
+            _TestCaseSerializer._handle_dump_error(e)
+
+    @staticmethod
+    def _handle_dump_error(e: Exception):
+        """Take the action configured for a pickling error.
+
+        Args:
+            e: The pickling error.
+        """
+        action = get_on_pickle_dump_error(e)
+        if action == OnPickleDumpErrorAction.IGNORE:
+            return
+        if action == OnPickleDumpErrorAction.RAISE:
+            raise e
+        if action == OnPickleDumpErrorAction.WARNING:
+            warnings.warn(str(e))
 
     @staticmethod
     def dumps(obj):
@@ -463,6 +1216,18 @@ class _TestCaseSerializer:
         """
         return get_pickler().load(fp)
 
+    @staticmethod
+    def loads(data):
+        """Deserialize an object from a bytes object.
+
+        Args:
+            data: Serialized object as bytes.
+
+        Returns:
+            Deserialized object.
+        """
+        return get_pickler().loads(data)
+
     def save(self, obj, path):
         """Save the serialized object to a file.
 
@@ -470,11 +1235,86 @@ class _TestCaseSerializer:
             obj: The object to be serialized.
             path: Path to save the serialized object.
         """
-        dirpath = os.path.dirname(path)
-        if not os.path.exists(dirpath):
-            os.makedirs(dirpath, exist_ok=True)
-        with open(path, "wb") as f:
-            self.dump(obj, f)
+        fcid = self._fcid_of(path)
+        buffer = io.BytesIO()
+        with _metrics.time("pickle_seconds", fcid):
+            try:
+                get_pickler().dump(obj, buffer)
+            except Exception as e:
+                _metrics.inc("pickle_failures", fcid)
+                self._handle_dump_error(e)
+        self.save_bytes(buffer.getvalue(), path)
+
+    def save_bytes(self, data: bytes, path):
+        """Save serialized bytes to a file.
+
+        Args:
+            data: Serialized object as bytes.
+            path: Path to save the serialized object.
+        """
+        fcid = self._fcid_of(path)
+        with _metrics.time("write_seconds", fcid):
+            get_storage_backend().put(*self._key_of(path), data)
+        _metrics.inc("bytes_written", fcid, len(data))
+
+    @staticmethod
+    def _key_of(path):
+        """Get the (fcid, tcid, artifact) of a test case file in the storage backend."""
+        relpath = os.path.relpath(path, get_artest_root()).split(os.path.sep)
+        return relpath[0], relpath[1], "/".join(relpath[2:])
+
+    @staticmethod
+    def _fcid_of(path):
+        """Get the function id a test case file belongs to, for the metrics."""
+        return os.path.relpath(path, get_artest_root()).split(os.path.sep)[0]
+
+    def exists(self, path):
+        """Check whether a test case file exists.
+
+        Args:
+            path: Path to the file.
+
+        Returns:
+            bool: Whether the file exists.
+        """
+        prefetched_files = _prefetched_files_var.get()
+        if prefetched_files is not None and path in prefetched_files:
+            return True
+        return get_storage_backend().exists(*self._key_of(path))
+
+    def delete(self, path):
+        """Delete a test case file, if it exists.
+
+        Args:
+            path: Path to the file.
+        """
+        get_storage_backend().delete(*self._key_of(path))
+
+    def save_outputs(self, outputs: FunctionOutput, path, digest_path):
+        """Save the outputs and the digest of its serialized bytes.
+
+        The digest lets the test runner compare outputs without loading them.
+
+        Args:
+            outputs: The function output.
+            path: Path to save the outputs.
+            digest_path: Path to save the digest.
+        """
+        try:
+            with _metrics.time("pickle_seconds", self._fcid_of(path)):
+                data = self.dumps(outputs)
+        except Exception:
+            # no digest, let save() handle the error as configured
+            self.delete(digest_path)
+            return self.save(outputs, path)
+        digest = self.calc_digest(data)
+        threshold = get_large_output_threshold()
+        if threshold is not None and len(data) >= threshold:
+            large_data = _LargeOutputsWriter.encode(outputs, len(data))
+            if large_data is not None:
+                data = large_data
+        self.save_bytes(data, path)
+        self.save_bytes(digest.encode(), digest_path)
 
     def save_inputs(self, inputs: tuple[tuple, dict], path):
         """Save the input dictionary to a file.
@@ -497,14 +1337,72 @@ class _TestCaseSerializer:
     def read(self, path):
         """Read a serialized object from a file.
 
+        If the file has been prefetched for the running test case,
+        the prefetched bytes are used instead of reading the file again.
+        An object preloaded from the file is returned once, as is.
+
         Args:
             path: Path to the serialized object file.
 
         Returns:
             Deserialized object.
         """
-        with open(path, "rb") as f:
-            return self.load(f)
+        preloaded_objects = _preloaded_objects_var.get()
+        if preloaded_objects is not None and path in preloaded_objects:
+            return preloaded_objects.pop(path)
+        return self.loads_file(self.read_bytes(path))
+
+    def loads_file(self, data):
+        """Deserialize the content of a test case file, in either outputs layout.
+
+        Args:
+            data: The content of the file.
+
+        Returns:
+            Deserialized object.
+        """
+        if _LargeOutputs.is_large(data):
+            return _LargeOutputs(data).load()
+        return self.loads(data)
+
+    def read_bytes(self, path):
+        """Read the raw bytes of a file.
+
+        Args:
+            path: Path to the file.
+
+        Returns:
+            bytes: The content of the file.
+        """
+        prefetched_files = _prefetched_files_var.get()
+        if prefetched_files is not None and path in prefetched_files:
+            return prefetched_files[path]
+        return get_storage_backend().get(*self._key_of(path))
+
+    def open_large_outputs(self, path) -> Optional[_LargeOutputs]:
+        """Open outputs saved in the large layout without reading them.
+
+        The file is memory-mapped if the storage backend has a local copy
+        of it.
+
+        Args:
+            path: Path to the outputs.
+
+        Returns:
+            Optional[_LargeOutputs]: The outputs, None if they are not in the large layout.
+        """
+        prefetched_files = _prefetched_files_var.get()
+        if prefetched_files is not None and path in prefetched_files:
+            data = prefetched_files[path]
+            return _LargeOutputs(data) if _LargeOutputs.is_large(data) else None
+        local_path = get_storage_backend().local_path(*self._key_of(path))
+        if local_path is None:
+            return None
+        with open(local_path, "rb") as f:
+            if not _LargeOutputs.is_large(f.read(len(_LargeOutputsWriter.MAGIC))):
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return _LargeOutputs(data)
 
     def read_inputs(self, path):
         """Read the input dictionary from a file.
@@ -544,6 +1442,32 @@ class _TestCaseSerializer:
         """
         return hashlib.sha256(self.dumps(obj)).hexdigest()[10:20]
 
+    @staticmethod
+    def calc_digest(data: bytes):
+        """Calculate the digest of serialized bytes.
+
+        Args:
+            data: Serialized object as bytes.
+
+        Returns:
+            str: the digest string.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def calc_obj_digest(obj):
+        """Calculate the digest of an object, without keeping its serialized bytes.
+
+        Args:
+            obj: The object to calculate the digest for.
+
+        Returns:
+            str: the digest string, the same as `calc_digest` of its serialized bytes.
+        """
+        digest_writer = _DigestWriter()
+        get_pickler().dump(obj, digest_writer)
+        return digest_writer.hexdigest()
+
 
 _serializer = _TestCaseSerializer()
 
@@ -552,6 +1476,13 @@ _AUTOSTUB_REGISTERED = set()
 _test_stack = []
 
 
+class _StubFrame:
+    """Marks a running stub call on the test stack, with the thread calling it."""
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+
+
 def _get_func_output(func, args, kwargs):
     try:
         ret = func(*args, **kwargs)
@@ -585,6 +1516,34 @@ def _find_input_hash(func, args, kwargs):
 
 
 _fastreg_counter = {}
+# fastreg outputs of the nested calls, written when the caller test case is saved
+_fastreg_buffer = defaultdict(dict)
+# fastreg indexes of the replaying test cases, None for the legacy per-file layout
+_fastreg_index = {}
+
+
+def _load_fastreg_index(caller_fcid: str, tcid: str) -> Optional[dict]:
+    """Load the fastreg index of a test case, once per replay.
+
+    Returns:
+        Optional[dict]: (reg_fcid, call_count, input_hash) to (pickled output, stub counter delta),
+            None if the test case is saved in the per-file layout.
+    """
+    key = (caller_fcid, tcid)
+    if key not in _fastreg_index:
+        index_path = _paths.fastreg_index(caller_fcid, tcid)
+        if _serializer.exists(index_path):
+            _fastreg_index[key] = _serializer.read(index_path)
+        else:
+            _fastreg_index[key] = None
+    return _fastreg_index[key]
+
+
+def _add_stub_counter_delta(caller_fcid: str, tcid: str, delta_stub_counter: dict):
+    for stub_fcid, stub_call_count in delta_stub_counter.items():
+        if stub_fcid not in _stub_counter[caller_fcid, tcid]:
+            _stub_counter[caller_fcid, tcid][stub_fcid] = 0
+        _stub_counter[caller_fcid, tcid][stub_fcid] += stub_call_count
 
 
 def autoreg(
@@ -653,6 +1612,7 @@ def autoreg(
 
         def case_mode(*args, **kwargs):
             if not get_test_case_quota(func_id).can_add_test_case(func_id):
+                _metrics.inc("skipped_by_quota", func_id)
                 return disable_mode(*args, **kwargs)
             tcid = next(get_test_case_id_generator())
             _test_stack.append((func_id, tcid))
@@ -663,7 +1623,7 @@ def autoreg(
             if len(_test_stack) <= 1:
                 # this is the top level function
                 caller_fcid_tcid = None
-            elif _test_stack[-2] is None:
+            elif isinstance(_test_stack[-2], _StubFrame):
                 # this is a stub, no need to save
                 caller_fcid_tcid = None
             else:
@@ -681,8 +1641,29 @@ def autoreg(
                         counter_before_call = _stub_counter[caller_fcid_tcid].copy()
                     else:
                         counter_before_call = {}
-                    output = _get_func_output(func, args, kwargs)
-                    _serializer.save(output, f_outputs)
+                    # nested captured calls would reset the traced peak
+                    memory_tracer = None
+                    if get_record_memory_on_case_mode() and len(_test_stack) == 1:
+                        memory_tracer = _PeakMemoryTracer()
+                    # nested captured calls are sampled by the outermost one
+                    sampler = None
+                    profile_interval = get_profile_interval_on_case_mode()
+                    if profile_interval is not None and len(_test_stack) == 1:
+                        sampler = _StackSampler(profile_interval)
+                    wall_start = time.perf_counter()
+                    cpu_start = time.process_time()
+                    with memory_tracer or nullcontext(), sampler or nullcontext():
+                        output = _get_func_output(func, args, kwargs)
+                    wall_time = time.perf_counter() - wall_start
+                    cpu_time = time.process_time() - cpu_start
+                    _serializer.save_outputs(
+                        output, f_outputs, _paths.outputs_digest(func_id, tcid)
+                    )
+                    if sampler is not None:
+                        _serializer.save_bytes(
+                            sampler.collapsed().encode(),
+                            _paths.profile_collapsed(func_id, tcid),
+                        )
 
                     if caller_fcid_tcid is not None:
                         caller_fcid, caller_tcid = caller_fcid_tcid
@@ -702,39 +1683,45 @@ def autoreg(
                         _fastreg_counter[(func_id, caller_fcid, caller_tcid)] = (
                             call_count + 1
                         )
+                        input_hash = _find_input_hash(func, args, kwargs)
+                        # pickled now, the caller may mutate the returned output
+                        try:
+                            output_data = _serializer.dumps(output)
+                        except Exception as e:
+                            # the index is written under the caller
+                            _metrics.inc("pickle_failures", caller_fcid)
+                            _serializer._handle_dump_error(e)
+                        else:
+                            _fastreg_buffer[caller_fcid_tcid][
+                                func_id, call_count, input_hash
+                            ] = (output_data, counter_delta)
+
+                    fastreg_entries = _fastreg_buffer.pop((func_id, tcid), None)
+                    if fastreg_entries:
                         _serializer.save(
-                            output,
-                            _paths.fastreg(
-                                caller_fcid,
-                                caller_tcid,
-                                func_id,
-                                call_count,
-                                _find_input_hash(func, args, kwargs),
-                            ),
-                        )
-                        _serializer.save(
-                            counter_delta,
-                            _paths.fastreg_stub_counter(
-                                caller_fcid,
-                                caller_tcid,
-                                func_id,
-                                call_count,
-                                _find_input_hash(func, args, kwargs),
-                            ),
+                            fastreg_entries, _paths.fastreg_index(func_id, tcid)
                         )
                 except Exception as e:
                     # remove the test case if there is an error
-                    shutil.rmtree(_paths.root(func_id, tcid), ignore_errors=True)
+                    _delete_test_case(func_id, tcid)
                     raise e
 
                 tc_meta = _meta_handler.build_meta(func_id, tcid)
+                if get_record_performance_on_case_mode():
+                    tc_meta.wall_time = wall_time
+                    tc_meta.cpu_time = cpu_time
+                if memory_tracer is not None:
+                    tc_meta.peak_memory = memory_tracer.peak_memory
                 _meta_handler.add_test_case_meta(tc_meta)
+                _metrics.inc("captured", func_id)
 
                 if get_assert_pickled_object_on_case_mode():
                     output_saved = _serializer.read(f_outputs)
                     assert get_is_equal()(output, output_saved)
             finally:
                 _test_stack.pop()
+                # the nested calls of a failed capture are dropped with it
+                _fastreg_buffer.pop((func_id, tcid), None)
             if output.output_type == FunctionOutputType.RAISE:
                 raise output.output
             return output.output
@@ -747,7 +1734,7 @@ def autoreg(
                 if len(_test_stack) <= 1:
                     # this is the top level function
                     caller_fcid_tcid = None
-                elif _test_stack[-2] is None:
+                elif isinstance(_test_stack[-2], _StubFrame):
                     # this is a stub, no need to save
                     caller_fcid_tcid = None
                 else:
@@ -760,6 +1747,19 @@ def autoreg(
 
                     input_hash = _find_input_hash(func, args, kwargs)
 
+                    fastreg_index = _load_fastreg_index(caller_fcid, tcid)
+                    if fastreg_index is not None:
+                        entry = fastreg_index.get((func_id, call_count, input_hash))
+                        if entry is None:
+                            return func(*args, **kwargs)
+                        output_data, delta_stub_counter = entry
+                        output: FunctionOutput = _serializer.loads(output_data)
+                        _add_stub_counter_delta(caller_fcid, tcid, delta_stub_counter)
+                        if output.output_type == FunctionOutputType.RAISE:
+                            raise output.output
+                        return output.output
+
+                    # test cases saved before the fastreg index
                     stub_counter_path = _paths.fastreg_stub_counter(
                         caller_fcid,
                         tcid,
@@ -767,14 +1767,9 @@ def autoreg(
                         call_count,
                         input_hash,
                     )
-                    if os.path.exists(stub_counter_path):
+                    if _serializer.exists(stub_counter_path):
                         delta_stub_counter: dict = _serializer.read(stub_counter_path)
-                        for stub_fcid, stub_call_count in delta_stub_counter.items():
-                            if stub_fcid not in _stub_counter[caller_fcid, tcid]:
-                                _stub_counter[caller_fcid, tcid][stub_fcid] = 0
-                            _stub_counter[caller_fcid, tcid][
-                                stub_fcid
-                            ] += stub_call_count
+                        _add_stub_counter_delta(caller_fcid, tcid, delta_stub_counter)
                     output_path = _paths.fastreg(
                         caller_fcid,
                         tcid,
@@ -783,7 +1778,7 @@ def autoreg(
                         input_hash,
                     )
 
-                    if os.path.exists(output_path):
+                    if _serializer.exists(output_path):
                         output: FunctionOutput = _serializer.read(output_path)
                         if output.output_type == FunctionOutputType.RAISE:
                             raise output.output
@@ -792,9 +1787,7 @@ def autoreg(
             finally:
                 _test_stack.pop()
 
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            artest_mode = _get_artest_mode()
+        def run_in_mode(artest_mode, *args, **kwargs):
             if artest_mode == ArtestMode.DISABLE:
                 return disable_mode(*args, **kwargs)
             elif artest_mode == ArtestMode.CASE:
@@ -803,18 +1796,70 @@ def autoreg(
                 return test_mode(*args, **kwargs)
             raise ValueError(f"Unknown artest mode {artest_mode}")
 
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            artest_mode = _get_artest_mode()
+            shadow = _shadow_candidates.get(func_id)
+            if shadow is not None and artest_mode != ArtestMode.TEST:
+                return shadow.call(run_in_mode, artest_mode, args, kwargs)
+            return run_in_mode(artest_mode, *args, **kwargs)
+
         return wrapper
 
     return _autoreg
 
 
 _stub_counter = defaultdict(dict)
+_stub_counter_lock = threading.Lock()
+# stub files of the replaying test cases by (stub fcid, input hash), first call first
+_stub_index = {}
+_stub_index_lock = threading.Lock()
+
+
+def _next_stub_path(
+    caller_fcid: str, tcid: str, stub_fcid: str, input_hash: str
+) -> Optional[str]:
+    """Take the first recorded call of a stub with the given input hash not replayed yet.
+
+    The stub files of a test case are listed once per replay.
+
+    Returns:
+        Optional[str]: The path of the stub file, None if all calls have been replayed.
+    """
+    with _stub_index_lock:
+        _load_stub_index(caller_fcid, tcid)
+        paths = _stub_index[caller_fcid, tcid].get((stub_fcid, input_hash))
+        return paths.popleft() if paths else None
+
+
+def _load_stub_index(caller_fcid: str, tcid: str):
+    """List the stub files of a test case by stub function id and input hash, if not listed yet.
+
+    Must be called with `_stub_index_lock` held.
+    """
+    if (caller_fcid, tcid) in _stub_index:
+        return
+    calls = defaultdict(list)
+    for _, _, artifact in get_storage_backend().list(caller_fcid, tcid):
+        dirname, _, name = artifact.partition("/")
+        if dirname != "stub" or not name.endswith(".output"):
+            continue
+        fcid, call_count, call_input_hash, _ = name.rsplit(".", 3)
+        calls[fcid, call_input_hash].append((int(call_count), artifact))
+    _stub_index[caller_fcid, tcid] = {
+        key: deque(
+            _paths._build_path(caller_fcid, tcid, artifact)
+            for _, artifact in sorted(value)
+        )
+        for key, value in calls.items()
+    }
 
 
 def autostub(
     func_id: str,
     *,
     on_duplicate: Optional[OnFuncIdDuplicateAction] = None,
+    match_policy: StubMatchPolicy = StubMatchPolicy.ORDERED,
 ):
     """Autostub Decorator.
 
@@ -825,6 +1870,11 @@ def autostub(
         func_id (str): The identifier for the function.
         on_duplicate (OnFuncIdDuplicateAction): The action when a duplicate func_id is found.
             If None, the default action is used.
+        match_policy (StubMatchPolicy): How calls are matched with the recorded outputs on replay.
+            Use INPUT_HASH if the calls may be reordered, e.g. made concurrently.
+            Calls made from worker threads must run in a copy of the caller's context,
+            e.g. `executor.submit(contextvars.copy_context().run, stub, *args)`,
+            since the replayed test case is kept in context variables.
 
     Returns:
         function: Decorated function.
@@ -833,6 +1883,7 @@ def autostub(
         ValueError: If the provided function ID is already registered in autostub.
     """
     on_duplicate = _get_on_duplicate(on_duplicate)
+    match_policy = StubMatchPolicy(match_policy)
     func_id = str(func_id)
     if func_id in _AUTOSTUB_REGISTERED:
         if on_duplicate == OnFuncIdDuplicateAction.RAISE:
@@ -854,17 +1905,24 @@ def autostub(
                 # Because mutable inputs can be different
                 # before and after running the function
                 input_hash = _find_input_hash(func, args, kwargs)
-            _test_stack.append(None)
+            stub_frame = _StubFrame()
+            _test_stack.append(stub_frame)
             try:
                 output = _get_func_output(func, args, kwargs)
             finally:
-                _test_stack.pop()
+                # other threads may have pushed their frames since
+                _test_stack.remove(stub_frame)
             for stack_item in _test_stack[::-1]:  # start from latest caller
-                if stack_item is None:
-                    break
+                if isinstance(stack_item, _StubFrame):
+                    if stack_item.thread_id == stub_frame.thread_id:
+                        break
+                    # a stub called concurrently from another thread
+                    continue
                 caller_fcid, tcid = stack_item
-                call_count = _stub_counter[caller_fcid, tcid].get(func_id, 0)
-                _stub_counter[caller_fcid, tcid][func_id] = call_count + 1
+                # stubs may be called concurrently
+                with _stub_counter_lock:
+                    call_count = _stub_counter[caller_fcid, tcid].get(func_id, 0)
+                    _stub_counter[caller_fcid, tcid][func_id] = call_count + 1
                 _serializer.save(
                     output,
                     _paths.stub(
@@ -884,18 +1942,27 @@ def autostub(
             caller_fcid = _fcid_var.get()
             tcid = _tcid_var.get()
 
-            call_count = _stub_counter[caller_fcid, tcid].get(func_id, 0)
-            _stub_counter[caller_fcid, tcid][func_id] = call_count + 1
+            with _stub_counter_lock:
+                call_count = _stub_counter[caller_fcid, tcid].get(func_id, 0)
+                _stub_counter[caller_fcid, tcid][func_id] = call_count + 1
 
             input_hash = _find_input_hash(func, args, kwargs)
-            path = _paths.stub(
-                caller_fcid,
-                tcid,
-                func_id,
-                call_count,
-                input_hash,
-            )
-            if not os.path.exists(path):
+            if match_policy == StubMatchPolicy.INPUT_HASH:
+                path = _next_stub_path(caller_fcid, tcid, func_id, input_hash)
+                if path is None:
+                    raise ValueError(
+                        f"Stub file missing: no more calls of {func_id} "
+                        f"with input hash {input_hash} in {caller_fcid}/{tcid}"
+                    )
+            else:
+                path = _paths.stub(
+                    caller_fcid,
+                    tcid,
+                    func_id,
+                    call_count,
+                    input_hash,
+                )
+            if not _serializer.exists(path):
                 raise ValueError(f"Stub file missing: {path}")
             output: FunctionOutput = _serializer.read(path)
             if output.output_type == FunctionOutputType.RAISE:
@@ -906,6 +1973,9 @@ def autostub(
         def wrapper(*args, **kwargs):
             """Wrapper function determining the behavior based on artest_mode."""
             artest_mode = _get_artest_mode()
+            stub_calls = _stub_calls_var.get()
+            if stub_calls is not None:
+                stub_calls.append(func_id)
             if artest_mode == ArtestMode.DISABLE:
                 return disable_mode(*args, **kwargs)
             elif artest_mode == ArtestMode.CASE:
@@ -919,22 +1989,294 @@ def autostub(
     return _autostub
 
 
+class _ShadowCandidate:
+    """Runs a candidate implementation alongside the primary one of a function id.
+
+    On a sampled fraction of calls, the inputs and the primary output are deep-copied,
+    and the candidate runs on the copied inputs in a worker thread under the disable mode.
+    Outputs are compared by `get_is_equal()`, and a mismatch is recorded as a test case
+    expecting the primary output. Latencies of both implementations are observed
+    in the metrics registry.
+    """
+
+    def __init__(
+        self,
+        func_id: str,
+        candidate,
+        sample_rate: float,
+        max_workers: int,
+        max_pending: int,
+    ):
+        self.func_id = func_id
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"artest-shadow-{func_id}"
+        )
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def _can_submit(self) -> bool:
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if len(self._futures) < self.max_pending:
+                return True
+        # the candidate cannot keep up, do not queue more work
+        _metrics.inc("shadow_skipped", self.func_id)
+        return False
+
+    def call(self, primary, artest_mode, args, kwargs):
+        if not self._can_submit():
+            return primary(artest_mode, *args, **kwargs)
+        try:
+            inputs = copy.deepcopy((args, kwargs))
+        except Exception:
+            _metrics.inc("shadow_skipped", self.func_id)
+            return primary(artest_mode, *args, **kwargs)
+
+        stub_calls = []
+        stub_calls_reset_token = _stub_calls_var.set(stub_calls)
+        start = time.perf_counter()
+        try:
+            output = primary(artest_mode, *args, **kwargs)
+        except Exception as e:
+            _metrics.observe(
+                "shadow_primary_seconds", self.func_id, time.perf_counter() - start
+            )
+            self._submit(
+                inputs, FunctionOutput(FunctionOutputType.RAISE, e), bool(stub_calls)
+            )
+            raise e
+        finally:
+            _stub_calls_var.reset(stub_calls_reset_token)
+            # a shadowed caller calls the stubs too
+            outer_stub_calls = _stub_calls_var.get()
+            if outer_stub_calls is not None:
+                outer_stub_calls.extend(stub_calls)
+        _metrics.observe(
+            "shadow_primary_seconds", self.func_id, time.perf_counter() - start
+        )
+        self._submit(
+            inputs, FunctionOutput(FunctionOutputType.RETURN, output), bool(stub_calls)
+        )
+        return output
+
+    def _submit(self, inputs, primary_output: FunctionOutput, has_stub_calls: bool):
+        try:
+            primary_output = copy.deepcopy(primary_output)
+        except Exception:
+            _metrics.inc("shadow_skipped", self.func_id)
+            return
+        future = self._executor.submit(
+            self._run, inputs, primary_output, has_stub_calls
+        )
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, inputs, primary_output: FunctionOutput, has_stub_calls: bool):
+        artest_mode_reset_token = _artest_mode_var.set(ArtestMode.DISABLE)
+        try:
+            args, kwargs = inputs
+            # the candidate may modify the inputs
+            inputs_data = _serializer.dumps(inputs)
+            start = time.perf_counter()
+            candidate_output = _get_func_output(self.candidate, args, kwargs)
+            _metrics.observe(
+                "shadow_candidate_seconds", self.func_id, time.perf_counter() - start
+            )
+            is_equal = (
+                candidate_output.output_type == primary_output.output_type
+                and get_is_equal()(candidate_output.output, primary_output.output)
+            )
+            if is_equal:
+                _metrics.inc("shadow_matches", self.func_id)
+                return
+            _metrics.inc("shadow_mismatches", self.func_id)
+            if has_stub_calls:
+                # the recorded outputs of the stubs would be missing on replay
+                _metrics.inc("shadow_unrecorded", self.func_id)
+                return
+            self._record_mismatch(inputs_data, primary_output)
+        except Exception as e:
+            _metrics.inc("shadow_errors", self.func_id)
+            warnings.warn(f"Shadow call of {self.func_id} failed: {e}")
+        finally:
+            _artest_mode_var.reset(artest_mode_reset_token)
+
+    def _record_mismatch(self, inputs_data: bytes, primary_output: FunctionOutput):
+        if not get_test_case_quota(self.func_id).can_add_test_case(self.func_id):
+            _metrics.inc("skipped_by_quota", self.func_id)
+            return
+        # the id generator is not shared with worker threads
+        tcid = f"shadow-{uuid4().hex}"
+        try:
+            _serializer.save_bytes(inputs_data, _paths.inputs(self.func_id, tcid))
+            _serializer.save_func((self.func_id, tcid), _paths.func(self.func_id, tcid))
+            _serializer.save_outputs(
+                primary_output,
+                _paths.outputs(self.func_id, tcid),
+                _paths.outputs_digest(self.func_id, tcid),
+            )
+        except Exception as e:
+            _delete_test_case(self.func_id, tcid)
+            raise e
+        _meta_handler.add_test_case_meta(_meta_handler.build_meta(self.func_id, tcid))
+
+    def wait(self, timeout: Optional[float] = None):
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads, waiting for or cancelling the pending runs."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_shadow_candidates: dict[str, _ShadowCandidate] = {}
+
+
+@atexit.register
+def _shutdown_shadow_candidates():
+    for shadow in _shadow_candidates.values():
+        shadow.shutdown(wait=False)
+
+
+def autoshadow(
+    func_id: str,
+    *,
+    sample_rate: float = 1.0,
+    max_workers: int = 1,
+    max_pending: int = 100,
+):
+    """Shadow Decorator.
+
+    This decorator registers a candidate implementation of an autoreg function,
+    e.g. an optimized rewrite, to be verified on live traffic without serving its results.
+
+    On a sampled fraction of calls to the autoreg function under 'Disable Mode' or 'Case Mode',
+    the candidate runs on deep copies of the same inputs in a worker thread,
+    and its output is compared with the primary output by `get_is_equal()`.
+    The primary output is always the one returned.
+    A mismatch is recorded as a test case of the function id expecting the primary output,
+    so it can be replayed against the candidate later, unless the primary implementation
+    calls autostub functions, whose outputs are not recorded by shadow calls.
+    Stubs called by the candidate are not replayed, since it runs under 'Disable Mode'.
+
+    Latencies are observed in the `shadow_primary_seconds` and `shadow_candidate_seconds`
+    histograms of the metrics registry, and outcomes are counted in `shadow_matches`,
+    `shadow_mismatches`, `shadow_skipped` and `shadow_errors`.
+
+    Args:
+        func_id (str): The identifier of the autoreg function.
+        sample_rate (float): The fraction of calls to run the candidate on.
+        max_workers (int): The number of worker threads running the candidate.
+        max_pending (int): The max number of pending candidate runs.
+            Calls are not sampled while the candidate is behind.
+
+    Returns:
+        function: The candidate function, unchanged.
+    """
+    func_id = str(func_id)
+
+    def _autoshadow(candidate):
+        previous = _shadow_candidates.get(func_id)
+        if previous is not None:
+            previous.shutdown(wait=False)
+        _shadow_candidates[func_id] = _ShadowCandidate(
+            func_id, candidate, sample_rate, max_workers, max_pending
+        )
+        return candidate
+
+    return _autoshadow
+
+
+def _reset_test_case_counters(tcid: str):
+    """Reset the stub and fastreg counters of a test case, so it can be replayed again."""
+    for key in [key for key in _stub_counter if key[1] == tcid]:
+        del _stub_counter[key]
+    for key in [key for key in _fastreg_counter if key[2] == tcid]:
+        del _fastreg_counter[key]
+    _discard_case_indexes(tcid)
+
+
+def _discard_case_indexes(tcid: str):
+    """Drop the fastreg and stub indexes loaded for replaying a test case."""
+    for key in [key for key in _fastreg_index if key[1] == tcid]:
+        del _fastreg_index[key]
+    with _stub_index_lock:
+        for key in [key for key in _stub_index if key[1] == tcid]:
+            del _stub_index[key]
+
+
 class _StopTest(Exception):
     def __init__(self, result):
         self.result = result
 
 
+class _TestCaseTimeout(BaseException):
+    """Raised inside a running test case when it exceeds its time limit.
+
+    It is a BaseException so that it is not recorded as a raised output
+    of the tested function.
+    """
+
+
+@contextmanager
+def _time_limit(seconds: Optional[float]):
+    """Raise _TestCaseTimeout in the current thread after `seconds` of wall time.
+
+    The limit relies on SIGALRM, so it is only enforced in the main thread
+    of platforms supporting `signal.setitimer`.
+    """
+    if not seconds:
+        yield
+        return
+    if (
+        not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        warnings.warn("Test case timeout is only supported in the main thread.")
+        yield
+        return
+
+    def _on_timeout(signum, frame):
+        raise _TestCaseTimeout()
+
+    previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
 class _TestRunner:
     """Test runner."""
 
-    def __init__(self, func_id, tcid, artest_config: ArtestConfig):
+    def __init__(
+        self,
+        func_id,
+        tcid,
+        artest_config: ArtestConfig,
+        tc_meta: Optional[MetadataTestCase] = None,
+    ):
         self.func_id = func_id
         self.tcid = tcid
         self.artest_config = artest_config
+        self.tc_meta = tc_meta
 
         self.f_inputs = _paths.inputs(func_id, tcid)
         self.f_func = _paths.func(func_id, tcid)
         self.f_outputs = _paths.outputs(func_id, tcid)
+        self.f_outputs_digest = _paths.outputs_digest(func_id, tcid)
 
         self._inputs = None
         self._func = None
@@ -942,12 +2284,48 @@ class _TestRunner:
         self._actual_outputs = None
         self._compared_outputs = None
 
+        self._use_cache = (
+            artest_config.use_cache
+            and artest_config.mode == "test"
+            and not artest_config.perf
+            and not artest_config.memory
+            and artest_config.profile is None
+            and tc_meta is not None
+        )
+        self._timings = Counter()
+
+        self._memory_tracer = None
+        if artest_config.memory and artest_config.mode == "test":
+            self._memory_tracer = _PeakMemoryTracer()
+
+        self._profiler = None
+        if artest_config.profile is not None and artest_config.mode == "test":
+            self._profiler = cProfile.Profile()
+
+        self._tracer = None
+        if artest_config.mode == "test" and (
+            artest_config.record_coverage or self._use_cache
+        ):
+            self._tracer = _ExecutionTracer(
+                record_lines=artest_config.record_coverage,
+                record_arcs=artest_config.record_arcs,
+            )
+
+    @contextmanager
+    def _timed(self, phase: Literal["load", "exec", "compare"]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings[phase] += time.perf_counter() - start
+
     @property
     def inputs(self) -> tuple[tuple, dict]:
         if self._inputs is not None:
             return self._inputs
-        if os.path.exists(self.f_inputs):
-            args, kwargs = _serializer.read_inputs(self.f_inputs)
+        if _serializer.exists(self.f_inputs):
+            with self._timed("load"):
+                args, kwargs = _serializer.read_inputs(self.f_inputs)
             self._inputs = args, kwargs
             return self._inputs
         raise _StopTest(
@@ -960,8 +2338,9 @@ class _TestRunner:
     def func(self):
         if self._func is not None:
             return self._func
-        if os.path.exists(self.f_func):
-            self._func = _serializer.read_func(self.f_func)
+        if _serializer.exists(self.f_func):
+            with self._timed("load"):
+                self._func = _serializer.read_func(self.f_func)
             return self._func
         raise _StopTest(
             self.info_test_result(
@@ -973,8 +2352,12 @@ class _TestRunner:
     def actual_outputs(self):
         if self._actual_outputs is not None:
             return self._actual_outputs
+        func = self.func
+        args, kwargs = self.inputs
         token = _enable_fastreg_var.set(self.artest_config.enable_fastreg)
-        self._actual_outputs = _get_func_output(self.func, *self.inputs)
+        with self._timed("exec"), self._tracer or nullcontext():
+            with self._memory_tracer or nullcontext(), self._profiler or nullcontext():
+                self._actual_outputs = _get_func_output(func, args, kwargs)
         _enable_fastreg_var.reset(token)
         return self._actual_outputs
 
@@ -982,8 +2365,9 @@ class _TestRunner:
     def expected_outputs(self) -> FunctionOutput:
         if self._expected_outputs is not None:
             return self._expected_outputs
-        if os.path.exists(self.f_outputs):
-            self._expected_outputs = _serializer.read(self.f_outputs)
+        if _serializer.exists(self.f_outputs):
+            with self._timed("load"):
+                self._expected_outputs = _serializer.read(self.f_outputs)
             return self._expected_outputs
         raise _StopTest(
             self.info_test_result(
@@ -1003,37 +2387,152 @@ class _TestRunner:
         # But it may be related to the fact that func is using _func_id_repo, a global variable.
         func = self.func
         args, kwargs = self.inputs
+        actual_outputs = self.actual_outputs
 
-        if self.actual_outputs.output_type != self.expected_outputs.output_type:
+        with self._timed("compare"):
+            is_digest_matched = (
+                self._is_outputs_digest_matched() or self._is_large_outputs_equal()
+            )
+        if is_digest_matched:
+            # identical serialized outputs, no need to load the expected outputs
+            self._compared_outputs = self._info_outputs_matched(
+                _inputs=(args, kwargs),
+                _actual_outputs=actual_outputs,
+                _func=func,
+            )
+            return self._compared_outputs
+
+        expected_outputs = self.expected_outputs
+        with self._timed("compare"):
+            is_type_matched = actual_outputs.output_type == expected_outputs.output_type
+            is_equal = is_type_matched and get_is_equal()(
+                actual_outputs.output, expected_outputs.output
+            )
+        if not is_type_matched:
             self._compared_outputs = self.info_test_result(
                 StatusTestResult.FAIL,
-                f"Output type mismatch: {self.actual_outputs.output_type} != {self.expected_outputs.output_type}",
+                f"Output type mismatch: {actual_outputs.output_type} != {expected_outputs.output_type}",
                 _inputs=(args, kwargs),
-                _expected_outputs=self.expected_outputs,
-                _actual_outputs=self.actual_outputs,
+                _expected_outputs=expected_outputs,
+                _actual_outputs=actual_outputs,
                 _func=func,
             )
-        elif not get_is_equal()(
-            self.actual_outputs.output, self.expected_outputs.output
-        ):
+        elif not is_equal:
             self._compared_outputs = self.info_test_result(
                 StatusTestResult.FAIL,
                 "Outputs not matched.",
                 _inputs=(args, kwargs),
-                _expected_outputs=self.expected_outputs,
-                _actual_outputs=self.actual_outputs,
+                _expected_outputs=expected_outputs,
+                _actual_outputs=actual_outputs,
                 _func=func,
             )
         else:
-            self._compared_outputs = self.info_test_result(
-                StatusTestResult.SUCCESS,
+            self._compared_outputs = self._info_outputs_matched(
                 _inputs=(args, kwargs),
-                _expected_outputs=self.expected_outputs,
-                _actual_outputs=self.actual_outputs,
+                _expected_outputs=expected_outputs,
+                _actual_outputs=actual_outputs,
                 _func=func,
             )
         return self._compared_outputs
 
+    def _measure_time(self):
+        """Replay the test case and measure its time.
+
+        Inputs are loaded again for each replay,
+        since the function may have modified them.
+
+        Returns:
+            tuple[float, float]: the min wall time and the min CPU time in seconds.
+        """
+        func = self.func
+        wall_times = []
+        cpu_times = []
+        for _ in range(max(self.artest_config.perf_repeat, 1)):
+            _reset_test_case_counters(self.tcid)
+            args, kwargs = _serializer.read_inputs(self.f_inputs)
+            token = _enable_fastreg_var.set(self.artest_config.enable_fastreg)
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            _get_func_output(func, args, kwargs)
+            wall_times.append(time.perf_counter() - wall_start)
+            cpu_times.append(time.process_time() - cpu_start)
+            _enable_fastreg_var.reset(token)
+        return min(wall_times), min(cpu_times)
+
+    def _find_performance_regression(self) -> Optional[str]:
+        if not self.artest_config.perf or self.tc_meta is None:
+            return None
+        metric = self.artest_config.perf_metric
+        baseline = getattr(self.tc_meta, f"{metric}_time")
+        if baseline is None:
+            return None
+        wall_time, cpu_time = self._measure_time()
+        measured = wall_time if metric == "wall" else cpu_time
+        if (
+            measured > baseline * self.artest_config.perf_ratio
+            and measured - baseline > self.artest_config.perf_min_delta
+        ):
+            return (
+                f"Performance regression: {metric} time {measured:.6f}s > "
+                f"{self.artest_config.perf_ratio} x baseline {baseline:.6f}s."
+            )
+        return None
+
+    def _find_memory_regression(self) -> Optional[str]:
+        if self._memory_tracer is None or self.tc_meta is None:
+            return None
+        if self.artest_config.memory_bless:
+            return None
+        baseline = self.tc_meta.peak_memory
+        if baseline is None:
+            return None
+        peak_memory = self._memory_tracer.peak_memory
+        if (
+            peak_memory > baseline * self.artest_config.memory_ratio
+            and peak_memory - baseline > self.artest_config.memory_min_delta
+        ):
+            return (
+                f"Memory regression: peak {peak_memory} bytes > "
+                f"{self.artest_config.memory_ratio} x baseline {baseline} bytes."
+            )
+        return None
+
+    def _info_outputs_matched(self, **kwargs):
+        regression = (
+            self._find_memory_regression() or self._find_performance_regression()
+        )
+        if regression is not None:
+            return self.info_test_result(StatusTestResult.FAIL, regression, **kwargs)
+        return self.info_test_result(StatusTestResult.SUCCESS, **kwargs)
+
+    def _is_outputs_digest_matched(self):
+        if not _serializer.exists(self.f_outputs_digest):
+            return False
+        expected_digest = _serializer.read_bytes(self.f_outputs_digest).decode()
+        try:
+            return _serializer.calc_obj_digest(self.actual_outputs) == expected_digest
+        except Exception:
+            return False
+
+    def _is_large_outputs_equal(self) -> bool:
+        """Compare the actual outputs with large expected outputs, a chunk at a time.
+
+        Only the default comparison is done lazily, since a custom one may
+        need the whole expected outputs.
+
+        Returns:
+            bool: Whether the outputs are matched, False if they are not large.
+        """
+        if get_is_equal() is not _default_is_equal:
+            return False
+        large_outputs = _serializer.open_large_outputs(self.f_outputs)
+        if large_outputs is None:
+            return False
+        with large_outputs:
+            if large_outputs.output_type != self.actual_outputs.output_type:
+                return False
+            return large_outputs.is_equal(self.actual_outputs.output, _default_is_equal)
+
     def info_test_result(
         self,
         result_status,
@@ -1071,6 +2570,11 @@ class _TestRunner:
         if self.artest_config.exclude_test_case is not None:
             if self.tcid in self.artest_config.exclude_test_case:
                 return False
+        if self.artest_config.changed_files is not None:
+            if not _coverage_handler.is_affected(
+                self.func_id, self.tcid, self.artest_config.changed_files
+            ):
+                return False
         return True
 
     def _run(self):
@@ -1078,42 +2582,456 @@ class _TestRunner:
             return self.info_test_result(StatusTestResult.SKIP)
 
         if self.artest_config.mode == "test":
-            return self.compared_outputs
+            enable_fastreg = self.artest_config.enable_fastreg
+            if self._use_cache and _result_cache_handler.is_cached(
+                self.tc_meta, enable_fastreg
+            ):
+                return self.info_test_result(StatusTestResult.CACHED)
+            result = self.compared_outputs
+            if self.artest_config.record_coverage:
+                if result.status == StatusTestResult.SUCCESS:
+                    _coverage_handler.set(self.func_id, self.tcid, self._tracer.lines)
+            if self._use_cache:
+                _result_cache_handler.update(
+                    self.tc_meta, result, self._tracer.lines, enable_fastreg
+                )
+            return result
         if self.artest_config.mode == "refresh":
+            _result_cache_handler.discard(self.func_id, self.tcid)
             actual_output = self.actual_outputs
-            _serializer.save(actual_output, self.f_outputs)
+            _serializer.save_outputs(
+                actual_output,
+                self.f_outputs,
+                _paths.outputs_digest(self.func_id, self.tcid),
+            )
             return self.info_test_result(StatusTestResult.REFRESH)
 
+    def _artifact_bytes(self):
+        if self.tc_meta is not None:
+            return self.tc_meta.bytes_size
+        storage = get_storage_backend()
+        return sum(storage.size(*key) for key in storage.list(self.func_id, self.tcid))
+
+    def _run_with_time_limit(self):
+        try:
+            with _time_limit(self.artest_config.timeout):
+                return self._run()
+        except _StopTest as e:
+            return e.result
+        except _TestCaseTimeout:
+            return self.info_test_result(
+                StatusTestResult.ERROR,
+                f"TIMEOUT: exceeded {self.artest_config.timeout} seconds.",
+            )
+
     def run(self):
         fcid_reset_token = _fcid_var.set(self.func_id)
         tcid_reset_token = _tcid_var.set(self.tcid)
 
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
         try:
-            return self._run()
-        except _StopTest as e:
-            return e.result
+            result = self._run_with_time_limit()
         finally:
             _fcid_var.reset(fcid_reset_token)
             _tcid_var.reset(tcid_reset_token)
+            _discard_case_indexes(self.tcid)
+        if self._profiler is not None and self._actual_outputs is not None:
+            _profile_handler.add(self.func_id, self._profiler)
+        return result._replace(
+            wall_time=time.perf_counter() - wall_start,
+            cpu_time=time.process_time() - cpu_start,
+            artifact_bytes=self._artifact_bytes(),
+            load_time=self._timings["load"],
+            exec_time=self._timings["exec"],
+            compare_time=self._timings["compare"],
+            peak_memory=(
+                self._memory_tracer.peak_memory
+                if self._memory_tracer is not None
+                else None
+            ),
+        )
+
+
+class _PrefetchFailed(NamedTuple):
+    """Put in the queue of `_Prefetcher` when its background thread fails."""
+
+    error: BaseException
+
+
+class _Prefetcher:
+    """Reads the artifacts of upcoming test cases in a background thread.
+
+    While the current test case runs, the raw bytes of the next test cases are
+    read into memory, so the runner does not wait for the filesystem.
+    At most `depth` test cases are buffered ahead, and the bytes held by
+    buffered test cases are kept under `max_bytes` if it is given.
+    A test case larger than `max_bytes` is still read, but only when
+    nothing else is held.
+    """
+
+    def __init__(self, cases, depth: int, max_bytes: Optional[int] = None):
+        self._cases = list(cases)
+        self._max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=max(depth, 1))
+        self._cond = threading.Condition()
+        self._bytes_held = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+
+    @staticmethod
+    def _list_case_files(fcid: str, tcid: str):
+        storage = get_storage_backend()
+        files = []
+        for key in storage.list(fcid, tcid):
+            # func is resolved by its path, its content is never read
+            if key[2] == "func":
+                continue
+            size = storage.size(*key)
+            # large outputs are memory-mapped by the runner instead
+            threshold = get_large_output_threshold()
+            if key[2] == "outputs" and threshold is not None and size >= threshold:
+                continue
+            files.append((key, size))
+        return files
+
+    def _can_hold(self, nbytes):
+        return (
+            self._stopped
+            or self._max_bytes is None
+            or self._bytes_held == 0
+            or self._bytes_held + nbytes <= self._max_bytes
+        )
+
+    def _put(self, item):
+        while not self._stopped:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self):
+        try:
+            self._prefetch()
+        except BaseException as e:
+            # the consumer would otherwise wait for the next case forever
+            self._put(_PrefetchFailed(e))
+
+    def _prefetch(self):
+        for fcid, tcid in self._cases:
+            try:
+                files = self._list_case_files(fcid, tcid)
+            except Exception:
+                # let the runner read the case and report the error
+                files = []
+            nbytes = sum(size for _, size in files)
+            with self._cond:
+                self._cond.wait_for(lambda: self._can_hold(nbytes))
+                if self._stopped:
+                    return
+                self._bytes_held += nbytes
+
+            contents = {}
+            for key, _ in files:
+                try:
+                    path = _paths._build_path(*key)
+                    contents[path] = get_storage_backend().get(*key)
+                except Exception:
+                    # let the runner read it again and report the error
+                    pass
+            self._put((fcid, tcid, contents, nbytes))
+
+    def _release(self, nbytes):
+        with self._cond:
+            self._bytes_held -= nbytes
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop the background thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        """Yield (fcid, tcid, prefetched files) in the order of the given cases."""
+        self._thread.start()
+        try:
+            for _ in range(len(self._cases)):
+                item = self._queue.get()
+                if isinstance(item, _PrefetchFailed):
+                    raise item.error
+                fcid, tcid, contents, nbytes = item
+                try:
+                    yield fcid, tcid, contents
+                finally:
+                    self._release(nbytes)
+        finally:
+            self.close()
+
+
+def _iter_test_cases(artest_config: ArtestConfig):
+    cases = sorted({(fcid, tcid) for fcid, tcid, _ in get_storage_backend().list()})
+    if artest_config.prefetch_depth <= 0:
+        for fcid, tcid in cases:
+            yield fcid, tcid, None
+        return
+    yield from _Prefetcher(
+        cases, artest_config.prefetch_depth, artest_config.prefetch_max_bytes
+    )
+
+
+def _test_result_record(result: TestResult) -> dict:
+    return {
+        "status": result.status.value,
+        "fcid": result.fcid,
+        "tcid": result.tcid,
+        "message": result.message,
+        "wall_time": result.wall_time,
+        "cpu_time": result.cpu_time,
+        "artifact_bytes": result.artifact_bytes,
+        "load_time": result.load_time,
+        "exec_time": result.exec_time,
+        "compare_time": result.compare_time,
+        "peak_memory": result.peak_memory,
+    }
+
+
+class _JsonlReporter:
+    """Writes one JSON line per test result as soon as it finishes."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self._path, "w")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._f.close()
+
+    def report(self, result: TestResult):
+        self.write_record(_test_result_record(result))
+
+    def write_record(self, record: dict):
+        self._f.write(json.dumps(record) + "\n")
+        self._f.flush()
+
+
+class _JunitXmlReporter:
+    """Writes test results as a JUnit XML test suite as soon as they finish.
+
+    The counts in the <testsuite> tag are only known at the end,
+    so the tag is written with padding and rewritten in place on exit.
+    """
+
+    _SUITE_TAG_WIDTH = 256
+    # characters that are not allowed in XML 1.0 even when escaped
+    _INVALID_XML_CHARS = re.compile(
+        "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+    )
+
+    def __init__(self, path: str):
+        self._path = path
+        self._f = None
+        self._suite_tag_offset = None
+        self._counts = Counter()
+        self._total_time = 0.0
+
+    def _suite_tag(self):
+        tag = (
+            f'<testsuite name="artest" tests="{sum(self._counts.values())}"'
+            f' failures="{self._counts[StatusTestResult.FAIL]}"'
+            f' errors="{self._counts[StatusTestResult.ERROR]}"'
+            f' skipped="{self._counts[StatusTestResult.SKIP] + self._counts[StatusTestResult.CACHED]}"'
+            f' time="{self._total_time:.6f}"'
+        )
+        return tag.ljust(self._SUITE_TAG_WIDTH - 2) + ">\n"
+
+    def __enter__(self):
+        self._f = open(self._path, "w", encoding="utf-8")
+        self._f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self._suite_tag_offset = self._f.tell()
+        self._f.write(self._suite_tag())
+        self._f.flush()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._f.write("</testsuite>\n")
+            self._f.seek(self._suite_tag_offset)
+            self._f.write(self._suite_tag())
+        finally:
+            self._f.close()
+
+    @classmethod
+    def _attr(cls, value: str) -> str:
+        return quoteattr(cls._INVALID_XML_CHARS.sub("", value))
+
+    def report(self, result: TestResult):
+        self._counts[result.status] += 1
+        self._total_time += result.wall_time or 0.0
+        s = [
+            f"  <testcase classname={self._attr(result.fcid)} name={self._attr(result.tcid)}"
+            f' time="{result.wall_time or 0.0:.6f}">'
+        ]
+        message = self._attr(result.message or result.status.value)
+        if result.status == StatusTestResult.FAIL:
+            s.append(f"    <failure message={message}/>")
+        elif result.status == StatusTestResult.ERROR:
+            s.append(f"    <error message={message}/>")
+        elif result.status in (StatusTestResult.SKIP, StatusTestResult.CACHED):
+            s.append(f"    <skipped message={message}/>")
+        s.append("  </testcase>\n")
+        self._f.write("\n".join(s))
+        self._f.flush()
+
+
+@contextmanager
+def _open_reporters(artest_config: ArtestConfig):
+    with ExitStack() as stack:
+        reporters = []
+        if artest_config.report_jsonl is not None:
+            reporters.append(
+                stack.enter_context(_JsonlReporter(artest_config.report_jsonl))
+            )
+        if artest_config.junit_xml is not None:
+            reporters.append(
+                stack.enter_context(_JunitXmlReporter(artest_config.junit_xml))
+            )
+        yield reporters
+
+
+def _get_max_failures(artest_config: ArtestConfig) -> Optional[int]:
+    if artest_config.fail_fast:
+        return 1
+    return artest_config.max_failures
 
 
 def _gather_test_results(artest_config: ArtestConfig) -> list[TestResult]:
     test_results = []
-    for path in glob(os.path.join(get_artest_root(), "*", "*")):
-        fcid, tcid = path.split(os.path.sep)[-2:]
-
-        result = _TestRunner(fcid, tcid, artest_config).run()
-        test_results.append(result)
+    tc_metas = {
+        (tc_meta.func_id, tc_meta.test_case_id): tc_meta
+        for tc_meta in _meta_handler.read_meta().test_cases
+    }
+    max_failures = _get_max_failures(artest_config)
+    n_failures = 0
+    with _open_reporters(artest_config) as reporters:
+        for fcid, tcid, prefetched_files in _iter_test_cases(artest_config):
+            prefetched_files_reset_token = _prefetched_files_var.set(prefetched_files)
+            try:
+                result = _TestRunner(
+                    fcid, tcid, artest_config, tc_metas.get((fcid, tcid))
+                ).run()
+            finally:
+                _prefetched_files_var.reset(prefetched_files_reset_token)
+            test_results.append(result)
+            for reporter in reporters:
+                reporter.report(result)
+
+            if result.status in (StatusTestResult.FAIL, StatusTestResult.ERROR):
+                n_failures += 1
+                if max_failures is not None and n_failures >= max_failures:
+                    get_printer()(f"Stopped after {n_failures} failed test cases.")
+                    break
 
     return test_results
 
 
+def _print_durations(test_results: list[TestResult], n: int):
+    """Print the slowest test cases and the slowest functions.
+
+    Args:
+        test_results (list[TestResult]): the test results.
+        n (int): the number of items to print. 0 prints all.
+    """
+    timed_results = [r for r in test_results if r.wall_time is not None]
+    slowest_results = sorted(timed_results, key=lambda r: r.wall_time, reverse=True)
+    if n > 0:
+        slowest_results = slowest_results[:n]
+    get_printer()("Slowest test cases:")
+    for r in slowest_results:
+        get_printer()(
+            f"{r.wall_time:10.6f}s fc={r.fcid} tc={r.tcid} "
+            f"load={r.load_time:.6f}s exec={r.exec_time:.6f}s compare={r.compare_time:.6f}s"
+        )
+
+    func_wall_time = Counter()
+    func_count = Counter()
+    for r in timed_results:
+        func_wall_time[r.fcid] += r.wall_time
+        func_count[r.fcid] += 1
+    get_printer()("Slowest functions:")
+    for fcid, wall_time in func_wall_time.most_common(n if n > 0 else None):
+        get_printer()(f"{wall_time:10.6f}s fc={fcid} test_cases={func_count[fcid]}")
+
+
+def _print_memory_top(test_results: list[TestResult], n: int):
+    """Print the test cases with the highest peak memory.
+
+    Args:
+        test_results (list[TestResult]): the test results.
+        n (int): the number of test cases to print.
+    """
+    traced_results = [r for r in test_results if r.peak_memory is not None]
+    get_printer()("Top memory consumers:")
+    for r in sorted(traced_results, key=lambda r: r.peak_memory, reverse=True)[:n]:
+        get_printer()(f"{r.peak_memory:12d} bytes fc={r.fcid} tc={r.tcid}")
+
+
+def _bless_peak_memory(test_results: list[TestResult]):
+    """Save the peak memory of passing test cases in the metadata as the baseline."""
+    peak_memory = {
+        (r.fcid, r.tcid): r.peak_memory
+        for r in test_results
+        if r.status == StatusTestResult.SUCCESS and r.peak_memory is not None
+    }
+    meta = _meta_handler.read_meta()
+    for tc_meta in meta.test_cases:
+        key = (tc_meta.func_id, tc_meta.test_case_id)
+        if key in peak_memory:
+            tc_meta.peak_memory = peak_memory[key]
+    _meta_handler.save_meta(meta)
+
+
+def _rehash_refreshed(test_results: list[TestResult]):
+    """Update the hash in the metadata of refreshed test cases, whose outputs are rewritten."""
+    refreshed = {
+        (r.fcid, r.tcid) for r in test_results if r.status == StatusTestResult.REFRESH
+    }
+    if not refreshed:
+        return
+    with _meta_handler._lock:
+        meta = _meta_handler.read_meta()
+        for tc_meta in meta.test_cases:
+            key = (tc_meta.func_id, tc_meta.test_case_id)
+            if key in refreshed:
+                tc_meta.hash_hex, tc_meta.bytes_size = _meta_handler.calc_hash(*key)
+                tc_meta.hash_version = 2
+        _meta_handler.save_meta(meta)
+
+
 def _run_artest(artest_config: ArtestConfig):
     _stub_counter.clear()
     _fastreg_counter.clear()
+    _fastreg_index.clear()
+    _stub_index.clear()
+    _coverage_handler.load()
+    _result_cache_handler.load()
+    _profile_handler.clear()
     artest_mode_reset_token = _artest_mode_var.set(ArtestMode.TEST)
+    # keep tracemalloc running for the whole run rather than per test case
+    memory_tracer = _PeakMemoryTracer() if artest_config.memory else nullcontext()
     try:
-        test_results = _gather_test_results(artest_config)
+        with memory_tracer:
+            test_results = _gather_test_results(artest_config)
+        _coverage_handler.save()
+        _result_cache_handler.save()
+        if artest_config.memory_bless:
+            _bless_peak_memory(test_results)
+        if artest_config.mode == "refresh":
+            _rehash_refreshed(test_results)
         status_counts = Counter([r.status for r in test_results])
         if (
             status_counts[StatusTestResult.ERROR] > 0
@@ -1122,9 +3040,17 @@ def _run_artest(artest_config: ArtestConfig):
             get_printer()("Failed")
         else:
             get_printer()("Passed")
-        get_printer()(
-            f"Test results: {status_counts[StatusTestResult.SUCCESS]} passed, {status_counts[StatusTestResult.FAIL]} failed, {status_counts[StatusTestResult.SKIP]} skipped, {status_counts[StatusTestResult.ERROR]} error, {status_counts[StatusTestResult.REFRESH]} refreshed."
-        )
+        summary = f"Test results: {status_counts[StatusTestResult.SUCCESS]} passed, {status_counts[StatusTestResult.FAIL]} failed, {status_counts[StatusTestResult.SKIP]} skipped, {status_counts[StatusTestResult.ERROR]} error, {status_counts[StatusTestResult.REFRESH]} refreshed"
+        if status_counts[StatusTestResult.CACHED] > 0:
+            summary += f", {status_counts[StatusTestResult.CACHED]} cached"
+        get_printer()(f"{summary}.")
+        if artest_config.durations is not None:
+            _print_durations(test_results, artest_config.durations)
+        if artest_config.memory:
+            _print_memory_top(test_results, artest_config.memory_top)
+        if artest_config.profile is not None:
+            _profile_handler.save(artest_config.profile)
+            _profile_handler.print_top(artest_config.profile_top)
         return test_results
     except Exception as e:
         raise e
@@ -1132,6 +3058,1040 @@ def _run_artest(artest_config: ArtestConfig):
         _artest_mode_var.reset(artest_mode_reset_token)
 
 
+def _bench_function(fcid: str, tcids: list[str], bench_config: BenchConfig):
+    """Replay the test cases of a function repeatedly and time each call.
+
+    The inputs, stub and fastreg files of each test case are read from the
+    storage once. Before each call, outside the timed part, they are
+    deserialized again since the function may modify them, and the stub and
+    fastreg indexes are loaded. So the timings cover the function, with
+    autostub functions returning their recorded outputs from memory, but
+    no storage I/O or deserialization of stub outputs. Only the outputs of
+    nested calls served by fastreg are still unpickled within the timings.
+
+    Args:
+        fcid (str): The function id.
+        tcids (list[str]): The test case ids of the function.
+        bench_config (BenchConfig): The bench config.
+
+    Returns:
+        list[float]: The wall time in seconds of each timed call.
+    """
+    cases = []
+    func = None
+    for tcid in tcids:
+        f_inputs = _paths.inputs(fcid, tcid)
+        f_func = _paths.func(fcid, tcid)
+        if not (_serializer.exists(f_inputs) and _serializer.exists(f_func)):
+            continue
+        if func is None:
+            func = _serializer.read_func(f_func)
+        storage = get_storage_backend()
+        replay_files = {
+            _paths._build_path(*key): storage.get(*key)
+            for key in storage.list(fcid, tcid)
+            if key[2].startswith(("stub/", "fastreg/"))
+        }
+        cases.append((tcid, _serializer.read_bytes(f_inputs), replay_files))
+
+    wall_times = []
+    for i in range(bench_config.warmup + bench_config.repeat):
+        for tcid, inputs_data, replay_files in cases:
+            _reset_test_case_counters(tcid)
+            args, kwargs = _serializer.loads(inputs_data)
+            preloaded_objects = {
+                path: _serializer.loads_file(data)
+                for path, data in replay_files.items()
+            }
+            fcid_reset_token = _fcid_var.set(fcid)
+            tcid_reset_token = _tcid_var.set(tcid)
+            enable_fastreg_reset_token = _enable_fastreg_var.set(
+                bench_config.enable_fastreg
+            )
+            prefetched_files_reset_token = _prefetched_files_var.set(replay_files)
+            preloaded_objects_reset_token = _preloaded_objects_var.set(
+                preloaded_objects
+            )
+            try:
+                with _stub_index_lock:
+                    _load_stub_index(fcid, tcid)
+                if bench_config.enable_fastreg:
+                    _load_fastreg_index(fcid, tcid)
+                wall_start = time.perf_counter()
+                _get_func_output(func, args, kwargs)
+                wall_time = time.perf_counter() - wall_start
+            finally:
+                _preloaded_objects_var.reset(preloaded_objects_reset_token)
+                _prefetched_files_var.reset(prefetched_files_reset_token)
+                _enable_fastreg_var.reset(enable_fastreg_reset_token)
+                _tcid_var.reset(tcid_reset_token)
+                _fcid_var.reset(fcid_reset_token)
+            if i >= bench_config.warmup:
+                wall_times.append(wall_time)
+    return wall_times
+
+
+def _bench_result(fcid: str, wall_times: list[float]) -> BenchResult:
+    sorted_times = sorted(wall_times)
+    p95_index = max(int(len(sorted_times) * 0.95 + 0.5) - 1, 0)
+    total_time = sum(sorted_times)
+    return BenchResult(
+        fcid=fcid,
+        calls=len(sorted_times),
+        min=sorted_times[0],
+        median=statistics.median(sorted_times),
+        p95=sorted_times[p95_index],
+        stddev=statistics.pstdev(sorted_times),
+        calls_per_sec=len(sorted_times) / total_time if total_time > 0 else 0.0,
+    )
+
+
+def _print_bench_comparison(bench_results: list[BenchResult], path: str):
+    """Print the speedup or slowdown of each function against saved results.
+
+    Args:
+        bench_results (list[BenchResult]): The benchmark results.
+        path (str): The path of the saved benchmark results.
+    """
+    with open(path) as f:
+        baseline = {r["fcid"]: BenchResult(**r) for r in json.load(f)}
+    get_printer()(f"Compared with {path}:")
+    for r in bench_results:
+        if r.fcid not in baseline:
+            get_printer()(f"fc={r.fcid} median={r.median:.6f}s (new)")
+            continue
+        base_median = baseline[r.fcid].median
+        if r.median <= 0 or base_median <= 0:
+            change = "unchanged"
+        elif r.median <= base_median:
+            change = f"{base_median / r.median:.2f}x faster"
+        else:
+            change = f"{r.median / base_median:.2f}x slower"
+        get_printer()(
+            f"fc={r.fcid} median={base_median:.6f}s -> {r.median:.6f}s {change}"
+        )
+
+
+def _list_test_cases(
+    include_function: Optional[list[str]] = None,
+    exclude_function: Optional[list[str]] = None,
+) -> dict[str, list[str]]:
+    """List the test cases in the storage backend.
+
+    Args:
+        include_function (Optional[list[str]]): The function ids to be included.
+        exclude_function (Optional[list[str]]): The function ids to be excluded.
+
+    Returns:
+        dict[str, list[str]]: The sorted test case ids of each function id.
+    """
+    tcids = defaultdict(list)
+    cases = {(fcid, tcid) for fcid, tcid, _ in get_storage_backend().list()}
+    for fcid, tcid in sorted(cases):
+        if include_function is not None and fcid not in include_function:
+            continue
+        if exclude_function is not None and fcid in exclude_function:
+            continue
+        tcids[fcid].append(tcid)
+    return tcids
+
+
+def _run_bench(bench_config: BenchConfig) -> list[BenchResult]:
+    tcids = _list_test_cases(
+        bench_config.include_function, bench_config.exclude_function
+    )
+
+    _stub_counter.clear()
+    _fastreg_counter.clear()
+    _fastreg_index.clear()
+    _stub_index.clear()
+    artest_mode_reset_token = _artest_mode_var.set(ArtestMode.TEST)
+    try:
+        get_printer()(
+            "Timing the wall time of each call, with stub outputs served from memory, "
+            "excluding storage reads and the deserialization of inputs and stub outputs."
+        )
+        bench_results = []
+        for fcid, fcid_tcids in tcids.items():
+            wall_times = _bench_function(fcid, fcid_tcids, bench_config)
+            if not wall_times:
+                continue
+            r = _bench_result(fcid, wall_times)
+            bench_results.append(r)
+            get_printer()(
+                f"fc={r.fcid} calls={r.calls} min={r.min:.6f}s median={r.median:.6f}s "
+                f"p95={r.p95:.6f}s stddev={r.stddev:.6f}s calls/sec={r.calls_per_sec:.1f}"
+            )
+    finally:
+        _artest_mode_var.reset(artest_mode_reset_token)
+
+    if bench_config.compare is not None:
+        _print_bench_comparison(bench_results, bench_config.compare)
+    if bench_config.save is not None:
+        with open(bench_config.save, "w") as f:
+            json.dump([r._asdict() for r in bench_results], f, indent=2)
+    return bench_results
+
+
+def _bench_main(args) -> list[BenchResult]:
+    """Replay the recorded inputs of each function as a microbenchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest bench")
+
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--enable-fastreg", action="store_true")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--save", default=None)
+    parser.add_argument("--compare", default=None)
+
+    args = parser.parse_args(args)
+
+    bench_config = BenchConfig(
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        enable_fastreg=args.enable_fastreg,
+        warmup=args.warmup,
+        repeat=max(args.repeat, 1),
+        save=args.save,
+        compare=args.compare,
+    )
+    return _run_bench(bench_config)
+
+
+def _greedy_cover(coverage: dict[str, set], bytes_size: dict[str, int]) -> list[str]:
+    """Greedily pick test cases until their union covers all covered elements.
+
+    The test case covering the most uncovered elements is picked first,
+    and ties are broken by the smaller size, then by the test case id.
+
+    Args:
+        coverage (dict[str, set]): The covered elements of each test case.
+        bytes_size (dict[str, int]): The size of each test case.
+
+    Returns:
+        list[str]: The picked test case ids, in the picking order.
+    """
+    uncovered = set().union(*coverage.values())
+    candidates = set(coverage)
+    picked = []
+    while uncovered:
+        tcid = min(
+            candidates,
+            key=lambda t: (-len(coverage[t] & uncovered), bytes_size.get(t, 0), t),
+        )
+        candidates.remove(tcid)
+        picked.append(tcid)
+        uncovered -= coverage[tcid]
+    return picked
+
+
+def _remove_test_cases(fcid: str, tcids: list[str], minimize_config: MinimizeConfig):
+    storage = get_storage_backend()
+    for tcid in tcids:
+        archive_root = None
+        if minimize_config.action == "archive":
+            archive_root = os.path.join(minimize_config.archive, fcid, tcid)
+        if archive_root is not None and _is_local_storage():
+            os.makedirs(os.path.dirname(archive_root), exist_ok=True)
+            shutil.move(_paths.root(fcid, tcid), archive_root)
+        else:
+            if archive_root is not None:
+                for key in storage.list(fcid, tcid):
+                    path = os.path.join(archive_root, *key[2].split("/"))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(storage.get(*key))
+            _delete_test_case(fcid, tcid)
+        _coverage_handler.discard(fcid, tcid)
+        _result_cache_handler.discard(fcid, tcid)
+
+
+def _run_minimize(minimize_config: MinimizeConfig) -> list[MinimizeResult]:
+    tcids = _list_test_cases(
+        minimize_config.include_function, minimize_config.exclude_function
+    )
+    tc_metas = {
+        (tc_meta.func_id, tc_meta.test_case_id): tc_meta
+        for tc_meta in _meta_handler.read_meta().test_cases
+    }
+    artest_config = ArtestConfig(
+        enable_fastreg=minimize_config.enable_fastreg,
+        record_coverage=True,
+        record_arcs=True,
+        use_cache=False,
+    )
+
+    _stub_counter.clear()
+    _fastreg_counter.clear()
+    _fastreg_index.clear()
+    _stub_index.clear()
+    _coverage_handler.load()
+    _result_cache_handler.load()
+    artest_mode_reset_token = _artest_mode_var.set(ArtestMode.TEST)
+    minimize_results = []
+    try:
+        for fcid, fcid_tcids in tcids.items():
+            coverage = {}
+            bytes_size = {}
+            failed = []
+            for tcid in fcid_tcids:
+                tc_meta = tc_metas.get((fcid, tcid))
+                runner = _TestRunner(fcid, tcid, artest_config, tc_meta)
+                if runner.run().status != StatusTestResult.SUCCESS:
+                    # only passing test cases are known to be redundant
+                    failed.append(tcid)
+                    continue
+                tracer = runner._tracer
+                coverage[tcid] = {
+                    (path, line)
+                    for path, lines in tracer.lines.items()
+                    for line in lines
+                } | {(path, arc) for path, arcs in tracer.arcs.items() for arc in arcs}
+                bytes_size[tcid] = runner._artifact_bytes()
+
+            kept = _greedy_cover(coverage, bytes_size)
+            if not kept and coverage:
+                # nothing traced, e.g. the function is outside the function root path
+                kept = [min(coverage, key=lambda t: (bytes_size[t], t))]
+            kept = sorted(kept + failed)
+            removed = [tcid for tcid in fcid_tcids if tcid not in kept]
+            minimize_results.append(MinimizeResult(fcid, kept, removed))
+            get_printer()(
+                f"fc={fcid} kept {len(kept)} of {len(fcid_tcids)} test cases."
+            )
+    finally:
+        _artest_mode_var.reset(artest_mode_reset_token)
+
+    if minimize_config.action != "dry-run":
+        removed_keys = set()
+        for r in minimize_results:
+            _remove_test_cases(r.fcid, r.removed, minimize_config)
+            removed_keys.update((r.fcid, tcid) for tcid in r.removed)
+        with _meta_handler._lock:
+            meta = _meta_handler.read_meta()
+            meta.test_cases = [
+                tc_meta
+                for tc_meta in meta.test_cases
+                if (tc_meta.func_id, tc_meta.test_case_id) not in removed_keys
+            ]
+            _meta_handler.save_meta(meta)
+        _coverage_handler.save()
+        _result_cache_handler.save()
+
+    n_kept = sum(len(r.kept) for r in minimize_results)
+    n_total = n_kept + sum(len(r.removed) for r in minimize_results)
+    verb = {"dry-run": "would keep", "archive": "kept", "delete": "kept"}[
+        minimize_config.action
+    ]
+    get_printer()(f"Minimized: {verb} {n_kept} of {n_total} test cases.")
+    return minimize_results
+
+
+def _minimize_main(args) -> list[MinimizeResult]:
+    """Replay the test cases under coverage and remove the redundant ones."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest minimize")
+
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--enable-fastreg", action="store_true")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--archive", default=None)
+    group.add_argument("--delete", action="store_true")
+
+    args = parser.parse_args(args)
+
+    if args.archive is not None and os.path.abspath(args.archive).startswith(
+        os.path.abspath(get_artest_root()) + os.path.sep
+    ):
+        parser.error("--archive must be a directory outside the artest root")
+
+    if args.archive is not None:
+        action = "archive"
+    elif args.delete:
+        action = "delete"
+    else:
+        action = "dry-run"
+    minimize_config = MinimizeConfig(
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        enable_fastreg=args.enable_fastreg,
+        action=action,
+        archive=args.archive,
+    )
+    return _run_minimize(minimize_config)
+
+
+class _GcStateHandler:
+    """Stores what the previous garbage collection has checked.
+
+    A function directory with the same mtime has no test case added or
+    removed since, and a checked test case stays complete, so neither has
+    to be scanned again. The state is saved next to the metadata, in the form
+    of `{fcid: {"mtime_ns": int, "complete": [tcid], "pending": bool}}`.
+    """
+
+    _GC_STATE_FILE_NAME = "gc_state.json"
+
+    @property
+    def gc_state_path(self):
+        return os.path.join(get_artest_root(), self._GC_STATE_FILE_NAME)
+
+    def remove(self):
+        if os.path.isfile(self.gc_state_path):
+            os.remove(self.gc_state_path)
+
+    def load(self) -> dict:
+        if os.path.isfile(self.gc_state_path):
+            with open(self.gc_state_path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def save(self, state: dict):
+        os.makedirs(get_artest_root(), exist_ok=True)
+        with open(self.gc_state_path, "w") as f:
+            json.dump(state, f)
+
+
+_gc_state_handler = _GcStateHandler()
+
+
+class _GcScan(NamedTuple):
+    fcid: str
+    incomplete: list
+    over_quota: list
+    missing: list
+    stray_files: list
+    state: Optional[dict]
+
+
+def _remove_path(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _gc_function(
+    fcid: str,
+    fcid_state: dict,
+    registered: dict[str, dt.datetime],
+    max_count,
+    gc_config: GcConfig,
+    now: float,
+) -> _GcScan:
+    """Scan the test cases of a function, and remove the incomplete ones,
+    the oldest ones over the quota and the stray files.
+
+    Args:
+        fcid (str): The function id.
+        fcid_state (dict): The state saved by the previous run for the function.
+        registered (dict[str, dt.datetime]): The created time of each test case in the metadata.
+        max_count (Union[int, Literal['inf']]): The max count of test cases.
+        gc_config (GcConfig): The garbage collection config.
+        now (float): The time the garbage collection started.
+    """
+    fcid_root = os.path.join(get_artest_root(), fcid)
+    mtime_ns = os.stat(fcid_root).st_mtime_ns if os.path.isdir(fcid_root) else None
+    checked = set(fcid_state.get("complete", [])) & set(registered)
+
+    complete, incomplete, stray_files = [], [], []
+    pending = False
+    if (
+        checked
+        and fcid_state.get("mtime_ns") == mtime_ns
+        and not fcid_state.get("pending")
+    ):
+        # nothing is added or removed since the previous run
+        complete = sorted(checked)
+        seen = checked
+    elif mtime_ns is None:
+        seen = set()
+    else:
+        with os.scandir(fcid_root) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        seen = {entry.name for entry in entries if entry.is_dir()}
+        for entry in entries:
+            if not entry.is_dir():
+                stray_files.append(entry.path)
+                continue
+            tcid = entry.name
+            if tcid in checked:
+                complete.append(tcid)
+                continue
+            names = set(os.listdir(entry.path))
+            # the metadata is added after all files are written
+            if tcid in registered and names.issuperset(_Paths.REQUIRED_CASE_NAMES):
+                complete.append(tcid)
+                stray_files.extend(
+                    os.path.join(entry.path, name)
+                    for name in sorted(names.difference(_Paths.CASE_NAMES))
+                )
+            elif now - entry.stat().st_mtime < gc_config.min_age:
+                # may be being captured
+                pending = True
+            else:
+                incomplete.append(tcid)
+
+    over_quota = []
+    if max_count != "inf" and len(complete) > max_count:
+        oldest_first = sorted(complete, key=lambda t: (registered[t], t))
+        over_quota = sorted(oldest_first[: len(complete) - max_count])
+        complete = [tcid for tcid in complete if tcid not in over_quota]
+    missing = sorted(set(registered) - seen)
+
+    state = {"mtime_ns": mtime_ns, "complete": complete, "pending": pending}
+    if not gc_config.dry_run and mtime_ns is not None:
+        for tcid in incomplete + over_quota:
+            _remove_path(os.path.join(fcid_root, tcid))
+        for path in stray_files:
+            _remove_path(path)
+        if incomplete or over_quota or stray_files:
+            if os.listdir(fcid_root):
+                state["mtime_ns"] = os.stat(fcid_root).st_mtime_ns
+            else:
+                os.rmdir(fcid_root)
+                state = None
+    return _GcScan(fcid, incomplete, over_quota, missing, stray_files, state)
+
+
+def _get_registered_max_count(fcid: str):
+    """Get the max count of test cases in the quota registered by the code of a function."""
+    # quotas are registered when the module of the function is imported
+    try:
+        _func_id_repo.get_func(fcid)
+    except KeyError:
+        raise ValueError(
+            f"Cannot find the function of fc={fcid} to read its test case quota, "
+            "pass --max-count or --exclude-function."
+        ) from None
+    return get_test_case_quota(fcid).max_count
+
+
+def _run_gc(gc_config: GcConfig) -> GcResult:
+    def is_included(fcid):
+        if gc_config.include_function is not None:
+            if fcid not in gc_config.include_function:
+                return False
+        if gc_config.exclude_function is not None:
+            if fcid in gc_config.exclude_function:
+                return False
+        return True
+
+    # incomplete test cases are told by the mtime of their directories
+    _require_local_storage("gc")
+    artest_root = get_artest_root()
+    registered = defaultdict(dict)
+    for tc_meta in _meta_handler.read_meta().test_cases:
+        registered[tc_meta.func_id][tc_meta.test_case_id] = dt.datetime.fromisoformat(
+            tc_meta.test_case_created_time
+        )
+    fcids = set(registered)
+    if os.path.isdir(artest_root):
+        fcids.update(
+            name
+            for name in os.listdir(artest_root)
+            if os.path.isdir(os.path.join(artest_root, name))
+        )
+    fcids = sorted(fcid for fcid in fcids if is_included(fcid))
+
+    prev_state = _gc_state_handler.load()
+    max_counts = {
+        fcid: gc_config.max_count
+        if gc_config.max_count is not None
+        else _get_registered_max_count(fcid)
+        for fcid in fcids
+    }
+    now = time.time()
+
+    def gc_function(fcid):
+        fcid_state = {} if gc_config.full else prev_state.get(fcid, {})
+        return _gc_function(
+            fcid,
+            fcid_state,
+            registered.get(fcid, {}),
+            max_counts[fcid],
+            gc_config,
+            now,
+        )
+
+    with ThreadPoolExecutor(max_workers=gc_config.workers) as executor:
+        scans = list(executor.map(gc_function, fcids))
+
+    gc_result = GcResult(
+        removed_incomplete=[(s.fcid, t) for s in scans for t in s.incomplete],
+        removed_by_quota=[(s.fcid, t) for s in scans for t in s.over_quota],
+        dropped_meta=[(s.fcid, t) for s in scans for t in s.missing],
+        removed_files=[path for s in scans for path in s.stray_files],
+    )
+
+    if not gc_config.dry_run:
+        dropped = set(
+            gc_result.removed_incomplete
+            + gc_result.removed_by_quota
+            + gc_result.dropped_meta
+        )
+        if dropped:
+            with _meta_handler._lock:
+                meta = _meta_handler.read_meta()
+                meta.test_cases = [
+                    tc_meta
+                    for tc_meta in meta.test_cases
+                    if (tc_meta.func_id, tc_meta.test_case_id) not in dropped
+                ]
+                _meta_handler.save_meta(meta)
+            _coverage_handler.load()
+            _result_cache_handler.load()
+            for fcid, tcid in dropped:
+                _coverage_handler.discard(fcid, tcid)
+                _result_cache_handler.discard(fcid, tcid)
+            _coverage_handler.save()
+            _result_cache_handler.save()
+
+        state = {
+            fcid: fcid_state
+            for fcid, fcid_state in prev_state.items()
+            if not is_included(fcid)
+        }
+        state.update({s.fcid: s.state for s in scans if s.state is not None})
+        _gc_state_handler.save(state)
+
+    verb = "Would remove" if gc_config.dry_run else "Removed"
+    get_printer()(
+        f"{verb} {len(gc_result.removed_incomplete)} incomplete test cases, "
+        f"{len(gc_result.removed_by_quota)} test cases over the quota, "
+        f"{len(gc_result.dropped_meta)} metadata entries without test case "
+        f"and {len(gc_result.removed_files)} stray files."
+    )
+    return gc_result
+
+
+def _gc_main(args) -> GcResult:
+    """Remove incomplete test cases, stale metadata, stray files and test cases over the quota."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest gc")
+
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--max-count", type=int, default=None)
+    parser.add_argument("--min-age", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args(args)
+
+    gc_config = GcConfig(
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        max_count=args.max_count,
+        min_age=args.min_age,
+        workers=args.workers,
+        full=args.full,
+        dry_run=args.dry_run,
+    )
+    return _run_gc(gc_config)
+
+
+def _verify_test_case(tc_meta: MetadataTestCase) -> VerifyResult:
+    fcid, tcid = tc_meta.func_id, tc_meta.test_case_id
+
+    def verify_result(status, message=None):
+        return VerifyResult(fcid, tcid, status, message)
+
+    storage = get_storage_backend()
+    artifacts = {artifact for _, _, artifact in storage.list(fcid, tcid)}
+    if not artifacts:
+        return verify_result(StatusVerifyResult.MISSING, "Test case not found.")
+    for name in _Paths.REQUIRED_CASE_NAMES:
+        if name not in artifacts:
+            return verify_result(StatusVerifyResult.MISSING, f"File {name} not found.")
+    try:
+        if "outputs.digest" in artifacts:
+            digest = storage.get(fcid, tcid, "outputs.digest").decode()
+            outputs_data = storage.get(fcid, tcid, "outputs")
+            if _LargeOutputs.is_large(outputs_data):
+                # the digest is of the regular pickle, which may differ from
+                # pickling the loaded outputs again, e.g. for shared references
+                try:
+                    _LargeOutputs(outputs_data).load()
+                except Exception as e:
+                    return verify_result(
+                        StatusVerifyResult.CORRUPTED,
+                        f"Outputs cannot be loaded: {type(e).__name__}: {e}",
+                    )
+            elif _serializer.calc_digest(outputs_data) != digest:
+                return verify_result(
+                    StatusVerifyResult.CORRUPTED,
+                    "Outputs do not match the digest.",
+                )
+        hash_hex, bytes_size = _meta_handler.calc_hash(fcid, tcid, tc_meta.hash_version)
+    except (OSError, UnicodeDecodeError) as e:
+        return verify_result(StatusVerifyResult.CORRUPTED, f"{type(e).__name__}: {e}")
+    if hash_hex != tc_meta.hash_hex:
+        return verify_result(
+            StatusVerifyResult.MODIFIED,
+            f"Hash {hash_hex} does not match {tc_meta.hash_hex} in the metadata "
+            f"({bytes_size} bytes, {tc_meta.bytes_size} bytes in the metadata).",
+        )
+    return verify_result(StatusVerifyResult.OK)
+
+
+def _run_verify(verify_config: VerifyConfig) -> list[VerifyResult]:
+    tc_metas = [
+        tc_meta
+        for tc_meta in _meta_handler.read_meta().test_cases
+        if (
+            verify_config.include_function is None
+            or tc_meta.func_id in verify_config.include_function
+        )
+        and (
+            verify_config.exclude_function is None
+            or tc_meta.func_id not in verify_config.exclude_function
+        )
+    ]
+
+    reporter = (
+        _JsonlReporter(verify_config.report_jsonl)
+        if verify_config.report_jsonl is not None
+        else nullcontext()
+    )
+    verify_results = []
+    with reporter as jsonl_reporter, ThreadPoolExecutor(
+        max_workers=verify_config.workers
+    ) as executor:
+        futures = [executor.submit(_verify_test_case, tc_meta) for tc_meta in tc_metas]
+        # report in the completion order, so a long run can be followed
+        for future in as_completed(futures):
+            r = future.result()
+            verify_results.append(r)
+            if jsonl_reporter is not None:
+                jsonl_reporter.write_record(r._asdict())
+            if r.status != StatusVerifyResult.OK:
+                get_printer()(
+                    f"ARTEST: {r.status} fc={r.fcid} tc={r.tcid} msg={r.message}"
+                )
+
+    verify_results.sort(key=lambda r: (r.fcid, r.tcid))
+    status_counts = Counter([r.status for r in verify_results])
+    get_printer()(
+        f"Verified {len(verify_results)} test cases: "
+        f"{status_counts[StatusVerifyResult.OK]} ok, "
+        f"{status_counts[StatusVerifyResult.MODIFIED]} modified, "
+        f"{status_counts[StatusVerifyResult.CORRUPTED]} corrupted, "
+        f"{status_counts[StatusVerifyResult.MISSING]} missing."
+    )
+    return verify_results
+
+
+def _verify_main(args) -> list[VerifyResult]:
+    """Check the files of each test case against the hash in the metadata."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest verify")
+
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--report-jsonl", default=None)
+
+    args = parser.parse_args(args)
+
+    verify_config = VerifyConfig(
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        workers=args.workers,
+        report_jsonl=args.report_jsonl,
+    )
+    return _run_verify(verify_config)
+
+
+_BUNDLE_META_NAME = "meta.json"
+
+
+def _parse_time(time_str: str) -> dt.datetime:
+    """Parse an ISO 8601 time, in the local time zone if it has none."""
+    parsed = dt.datetime.fromisoformat(time_str)
+    return parsed if parsed.tzinfo is not None else parsed.astimezone()
+
+
+def _run_export(export_config: ExportConfig) -> ExportResult:
+    since = _parse_time(export_config.since) if export_config.since else None
+    until = _parse_time(export_config.until) if export_config.until else None
+
+    def is_selected(tc_meta: MetadataTestCase):
+        if export_config.include_function is not None:
+            if tc_meta.func_id not in export_config.include_function:
+                return False
+        if export_config.exclude_function is not None:
+            if tc_meta.func_id in export_config.exclude_function:
+                return False
+        created_time = _parse_time(tc_meta.test_case_created_time)
+        if since is not None and created_time < since:
+            return False
+        if until is not None and created_time >= until:
+            return False
+        if export_config.tags is not None:
+            if not set(export_config.tags).intersection(tc_meta.tags):
+                return False
+        return True
+
+    compression = zipfile.ZIP_DEFLATED if export_config.compress else zipfile.ZIP_STORED
+    exported, missing = [], []
+    bundle_metas = []
+    storage = get_storage_backend()
+    # files are streamed into the bundle one by one, and the metadata comes last,
+    # indexed by the central directory of the zip file
+    with zipfile.ZipFile(export_config.path, "w", compression) as zf:
+        for tc_meta in _meta_handler.read_meta().test_cases:
+            if not is_selected(tc_meta):
+                continue
+            fcid, tcid = tc_meta.func_id, tc_meta.test_case_id
+            keys = storage.list(fcid, tcid)
+            if not keys:
+                missing.append((fcid, tcid))
+                continue
+            for key in keys:
+                zf.writestr(f"{fcid}/{tcid}/{key[2]}", storage.get(*key))
+            if tc_meta.hash_version != 2:
+                # absolute paths do not hold on another machine
+                tc_meta = dataclasses.replace(tc_meta, hash_version=2)
+                tc_meta.hash_hex, tc_meta.bytes_size = _meta_handler.calc_hash(
+                    fcid, tcid
+                )
+            bundle_metas.append(dataclasses.asdict(tc_meta))
+            exported.append((fcid, tcid))
+        zf.writestr(
+            _BUNDLE_META_NAME, json.dumps({"test_cases": bundle_metas}, indent=4)
+        )
+
+    get_printer()(
+        f"Exported {len(exported)} test cases to {export_config.path}"
+        + (f", {len(missing)} missing." if missing else ".")
+    )
+    return ExportResult(exported, missing)
+
+
+def _export_main(args) -> ExportResult:
+    """Write the selected test cases and their metadata to a single zip file."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest export")
+
+    parser.add_argument("path")
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--since", default=None)
+    parser.add_argument("--until", default=None)
+    parser.add_argument("--tags", nargs="+", action="extend")
+    parser.add_argument("--compress", action="store_true")
+
+    args = parser.parse_args(args)
+
+    export_config = ExportConfig(
+        path=args.path,
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        since=args.since,
+        until=args.until,
+        tags=args.tags,
+        compress=args.compress,
+    )
+    return _run_export(export_config)
+
+
+def _extract_test_case(zf: zipfile.ZipFile, names: list[str], prefix: str, dest: str):
+    """Extract the files of a test case from a bundle into a directory."""
+    for name in names:
+        target = os.path.abspath(os.path.join(dest, name[len(prefix) :]))
+        if not target.startswith(os.path.abspath(dest) + os.path.sep):
+            raise ValueError(f"Unsafe path {name} in the bundle.")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with zf.open(name) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+
+def _check_bundle_case_root(fcid: str, tcid: str) -> str:
+    """Get the root of a test case from a bundle, rejecting ids escaping the artest root."""
+    for id_ in (fcid, tcid):
+        if (
+            not isinstance(id_, str)
+            or id_ in ("", ".", "..")
+            or "/" in id_
+            or os.path.sep in id_
+            or (os.path.altsep is not None and os.path.altsep in id_)
+        ):
+            raise ValueError(f"Unsafe test case {fcid!r}/{tcid!r} in the bundle.")
+    f_root = _paths.root(fcid, tcid)
+    artest_root = os.path.abspath(get_artest_root())
+    if not os.path.abspath(f_root).startswith(artest_root + os.path.sep):
+        raise ValueError(f"Unsafe test case {fcid!r}/{tcid!r} in the bundle.")
+    return f_root
+
+
+def _run_import(import_config: ImportConfig) -> ImportResult:
+    local_metas = {
+        (tc_meta.func_id, tc_meta.test_case_id): tc_meta
+        for tc_meta in _meta_handler.read_meta().test_cases
+    }
+    imported, skipped, conflicted, corrupted = [], [], [], []
+    imported_metas = []
+    storage = get_storage_backend()
+    is_local_storage = _is_local_storage()
+
+    with zipfile.ZipFile(import_config.path) as zf:
+        bundle_meta = Metadata(**json.loads(zf.read(_BUNDLE_META_NAME)))
+        # checked before anything is written
+        f_roots = {
+            (tc_meta.func_id, tc_meta.test_case_id): _check_bundle_case_root(
+                tc_meta.func_id, tc_meta.test_case_id
+            )
+            for tc_meta in bundle_meta.test_cases
+        }
+        names = defaultdict(list)
+        for name in zf.namelist():
+            if name.count("/") >= 2 and not name.endswith("/"):
+                fcid, tcid, _ = name.split("/", 2)
+                names[fcid, tcid].append(name)
+
+        for tc_meta in bundle_meta.test_cases:
+            key = (fcid, tcid) = (tc_meta.func_id, tc_meta.test_case_id)
+            if import_config.include_function is not None:
+                if fcid not in import_config.include_function:
+                    continue
+            if import_config.exclude_function is not None:
+                if fcid in import_config.exclude_function:
+                    continue
+
+            f_root = f_roots[key]
+            local_meta = local_metas.get(key)
+            if local_meta is not None and storage.list(fcid, tcid):
+                if local_meta.hash_version == 2:
+                    local_hash = local_meta.hash_hex
+                else:
+                    local_hash, _ = _meta_handler.calc_hash(fcid, tcid)
+                if local_hash == tc_meta.hash_hex:
+                    skipped.append(key)
+                    continue
+                if not import_config.overwrite:
+                    conflicted.append(key)
+                    continue
+
+            # extract next to the test case, then move it in place at once
+            if is_local_storage:
+                os.makedirs(os.path.dirname(f_root), exist_ok=True)
+                tmp_root = tempfile.mkdtemp(
+                    prefix=".import-", dir=os.path.dirname(f_root)
+                )
+            else:
+                tmp_root = tempfile.mkdtemp(prefix=".import-")
+            try:
+                _extract_test_case(zf, names[key], f"{fcid}/{tcid}/", tmp_root)
+                if tc_meta.hash_version == 2:
+                    hash_hex, _ = _meta_handler.calc_hash_of_root(tmp_root)
+                    if hash_hex != tc_meta.hash_hex:
+                        corrupted.append(key)
+                        continue
+                _delete_test_case(fcid, tcid)
+                if is_local_storage:
+                    os.rename(tmp_root, f_root)
+                else:
+                    for name in names[key]:
+                        artifact = name[len(f"{fcid}/{tcid}/") :]
+                        path = os.path.join(tmp_root, *artifact.split("/"))
+                        with open(path, "rb") as f:
+                            storage.put(fcid, tcid, artifact, f.read())
+            finally:
+                if os.path.isdir(tmp_root):
+                    shutil.rmtree(tmp_root)
+            imported.append(key)
+            imported_metas.append(tc_meta)
+
+    if imported:
+        imported_keys = set(imported)
+        with _meta_handler._lock:
+            meta = _meta_handler.read_meta()
+            meta.test_cases = [
+                tc_meta
+                for tc_meta in meta.test_cases
+                if (tc_meta.func_id, tc_meta.test_case_id) not in imported_keys
+            ] + imported_metas
+            _meta_handler.save_meta(meta)
+        _coverage_handler.load()
+        _result_cache_handler.load()
+        for fcid, tcid in imported:
+            _coverage_handler.discard(fcid, tcid)
+            _result_cache_handler.discard(fcid, tcid)
+        _coverage_handler.save()
+        _result_cache_handler.save()
+
+    get_printer()(
+        f"Imported {len(imported)} test cases from {import_config.path}, "
+        f"{len(skipped)} already present, {len(conflicted)} conflicted, "
+        f"{len(corrupted)} corrupted."
+    )
+    return ImportResult(imported, skipped, conflicted, corrupted)
+
+
+def _import_main(args) -> ImportResult:
+    """Read the test cases and their metadata from a zip file written by export."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="artest import")
+
+    parser.add_argument("path")
+    parser.add_argument("--include-function", nargs="+", action="extend")
+    parser.add_argument("--exclude-function", nargs="+", action="extend")
+    parser.add_argument("--overwrite", action="store_true")
+
+    args = parser.parse_args(args)
+
+    import_config = ImportConfig(
+        path=args.path,
+        include_function=args.include_function,
+        exclude_function=args.exclude_function,
+        overwrite=args.overwrite,
+    )
+    return _run_import(import_config)
+
+
+_SUBCOMMANDS = {
+    "bench": _bench_main,
+    "export": _export_main,
+    "gc": _gc_main,
+    "import": _import_main,
+    "minimize": _minimize_main,
+    "verify": _verify_main,
+}
+
+
+def _git_changed_files(rev: str) -> list[str]:
+    """Get the absolute paths of the files changed since a git revision.
+
+    Args:
+        rev (str): the git revision to compare the working tree with.
+    """
+    toplevel = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    diff = subprocess.run(
+        ["git", "diff", "--name-only", rev, "--"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=toplevel,
+    ).stdout
+    return [os.path.join(toplevel, line) for line in diff.splitlines() if line]
+
+
 def main(args=None):
     """Execute Automated Regression Testing.
 
@@ -1146,6 +4106,14 @@ def main(args=None):
     Note:
         The function relies on the TestCaseSerializer for serialization and deserialization.
 
+    The first argument may name a subcommand instead:
+        bench: replay the recorded inputs of each function as a microbenchmark.
+        export: write the selected test cases and their metadata to a single zip file.
+        gc: remove incomplete test cases, stale metadata, stray files and test cases over the quota.
+        import: read the test cases and their metadata from a zip file written by export.
+        minimize: remove test cases adding no line or branch coverage to their function.
+        verify: check the files of each test case against the hash in the metadata.
+
     Raises:
         ValueError: If the inputs, outputs, or func files are missing for a test case directory.
                     Or if an exception occurs during function execution.
@@ -1153,6 +4121,9 @@ def main(args=None):
     """
     import argparse
 
+    if args and args[0] in _SUBCOMMANDS:
+        return _SUBCOMMANDS[args[0]](args[1:])
+
     parser = argparse.ArgumentParser()
 
     parser.add_argument("--refresh", action="store_true")
@@ -1161,11 +4132,46 @@ def main(args=None):
     parser.add_argument("--exclude-function", nargs="+", action="extend")
     parser.add_argument("--exclude-test-case", nargs="+", action="extend")
     parser.add_argument("--enable-fastreg", action="store_true")
+    parser.add_argument("--prefetch-depth", type=int, default=0)
+    parser.add_argument("--prefetch-max-bytes", type=int, default=None)
+    parser.add_argument("--fail-fast", action="store_true")
+    parser.add_argument("--max-failures", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--record-coverage", action="store_true")
+    parser.add_argument("--changed-files", nargs="+", action="extend")
+    parser.add_argument("--changed-since", default=None)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--report-jsonl", default=None)
+    parser.add_argument("--junit-xml", default=None)
+    parser.add_argument("--durations", type=int, default=None)
+    parser.add_argument("--perf", action="store_true")
+    parser.add_argument("--perf-repeat", type=int, default=5)
+    parser.add_argument("--perf-ratio", type=float, default=1.5)
+    parser.add_argument("--perf-min-delta", type=float, default=0.0)
+    parser.add_argument("--perf-metric", choices=["wall", "cpu"], default="wall")
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--memory-bless", action="store_true")
+    parser.add_argument("--memory-ratio", type=float, default=1.2)
+    parser.add_argument("--memory-min-delta", type=int, default=0)
+    parser.add_argument("--memory-top", type=int, default=10)
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--profile-top", type=int, default=20)
 
     if args is None:
         args = []
     args = parser.parse_args(args)
 
+    if args.profile is not None and os.path.abspath(args.profile).startswith(
+        os.path.abspath(get_artest_root()) + os.path.sep
+    ):
+        parser.error("--profile must be a directory outside the artest root")
+
+    changed_files = None
+    if args.changed_files is not None or args.changed_since is not None:
+        changed_files = [os.path.abspath(f) for f in args.changed_files or []]
+        if args.changed_since is not None:
+            changed_files.extend(_git_changed_files(args.changed_since))
+
     artest_config = ArtestConfig(
         mode="refresh" if args.refresh else "test",  # noqa
         include_function=args.include_function,
@@ -1173,6 +4179,29 @@ def main(args=None):
         exclude_function=args.exclude_function,
         exclude_test_case=args.exclude_test_case,
         enable_fastreg=args.enable_fastreg,
+        prefetch_depth=args.prefetch_depth,
+        prefetch_max_bytes=args.prefetch_max_bytes,
+        fail_fast=args.fail_fast,
+        max_failures=args.max_failures,
+        timeout=args.timeout,
+        record_coverage=args.record_coverage,
+        changed_files=changed_files,
+        use_cache=not args.no_cache,
+        report_jsonl=args.report_jsonl,
+        junit_xml=args.junit_xml,
+        durations=args.durations,
+        perf=args.perf,
+        perf_repeat=args.perf_repeat,
+        perf_ratio=args.perf_ratio,
+        perf_min_delta=args.perf_min_delta,
+        perf_metric=args.perf_metric,
+        memory=args.memory or args.memory_bless,
+        memory_bless=args.memory_bless,
+        memory_ratio=args.memory_ratio,
+        memory_min_delta=args.memory_min_delta,
+        memory_top=args.memory_top,
+        profile=args.profile,
+        profile_top=args.profile_top,
     )
     return _run_artest(artest_config)
 
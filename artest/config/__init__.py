@@ -11,6 +11,8 @@ Functions and Modules Available:
     - set_on_pickle_dump_error(): Sets the action to take on specific pickling errors.
     - get_assert_pickled_object_on_case_mode(): Gets the status of asserting pickled object on case mode.
     - set_assert_pickled_object_on_case_mode(): Sets whether to assert pickled object on case mode.
+    - get_large_output_threshold(): Gets the size from which outputs are saved in the large layout.
+    - set_large_output_threshold(): Sets the size from which outputs are saved in the large layout.
     - get_function_root_path(): Gets the root path of the function.
     - set_function_root_path(): Sets the root path of the function.
     - get_is_equal(): Gets the function for comparing two objects.
@@ -28,6 +30,16 @@ Functions and Modules Available:
     - get_test_case_quota(): Gets the test case quota.
     - set_test_case_quota(): Sets the test case quota.
     - reset_all_test_case_quota(): Resets all test case quota.
+    - get_record_performance_on_case_mode(): Gets whether to record the time of captured calls.
+    - set_record_performance_on_case_mode(): Sets whether to record the time of captured calls.
+    - get_record_memory_on_case_mode(): Gets whether to record the peak memory of captured calls.
+    - set_record_memory_on_case_mode(): Sets whether to record the peak memory of captured calls.
+    - get_profile_interval_on_case_mode(): Gets the sampling interval of captured calls.
+    - set_profile_interval_on_case_mode(): Sets the sampling interval of captured calls.
+    - get_storage_backend(): Gets the storage backend of test case files.
+    - set_storage_backend(): Sets the storage backend of test case files.
+    - get_test_case_tags(): Gets the tags of captured test cases.
+    - set_test_case_tags(): Sets the tags of captured test cases.
 
 """
 
@@ -40,6 +52,8 @@ __all__ = [
     "set_on_pickle_dump_error",
     "get_assert_pickled_object_on_case_mode",
     "set_assert_pickled_object_on_case_mode",
+    "get_large_output_threshold",
+    "set_large_output_threshold",
     "set_function_root_path",
     "get_function_root_path",
     "set_is_equal",
@@ -58,6 +72,16 @@ __all__ = [
     "get_test_case_quota",
     "set_test_case_quota",
     "reset_all_test_case_quota",
+    "get_record_performance_on_case_mode",
+    "set_record_performance_on_case_mode",
+    "get_record_memory_on_case_mode",
+    "set_record_memory_on_case_mode",
+    "get_profile_interval_on_case_mode",
+    "set_profile_interval_on_case_mode",
+    "get_storage_backend",
+    "set_storage_backend",
+    "get_test_case_tags",
+    "set_test_case_tags",
 ]
 
 from ..types import MessageRecord
@@ -70,11 +94,21 @@ from ._paths import (
     set_artest_root,
     set_function_root_path,
 )
+from ._perf import (
+    get_profile_interval_on_case_mode,
+    get_record_memory_on_case_mode,
+    get_record_performance_on_case_mode,
+    set_profile_interval_on_case_mode,
+    set_record_memory_on_case_mode,
+    set_record_performance_on_case_mode,
+)
 from ._pickler import (
     get_assert_pickled_object_on_case_mode,
+    get_large_output_threshold,
     get_on_pickle_dump_error,
     get_pickler,
     set_assert_pickled_object_on_case_mode,
+    set_large_output_threshold,
     set_on_pickle_dump_error,
     set_pickler,
 )
@@ -86,6 +120,8 @@ from ._printer import (
     set_printer,
     set_stringify_obj,
 )
+from ._storage import get_storage_backend, set_storage_backend
+from ._tags import get_test_case_tags, set_test_case_tags
 from ._tc_quota import (
     get_test_case_quota,
     reset_all_test_case_quota,
@@ -5,16 +5,153 @@ Functions and Classes:
     - get_is_equal(): Gets the function for comparing two objects.
 
 """
+import dataclasses
+import math
+
 from artest.config._pickler import get_pickler
 
+# types whose `==` is exact, so a mismatch is final
+_SCALAR_TYPES = (str, bytes, bytearray, int, bool, complex, type(None))
+
+
+def _is_array_like(obj):
+    return hasattr(obj, "shape") and hasattr(obj, "dtype")
+
+
+def _buffer_bytes(obj):
+    try:
+        return memoryview(obj).tobytes()
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_buffer_equal(actual, expected, chunk_bytes=1024 * 1024):
+    """Compares the raw bytes of two buffers chunk by chunk, without copying them whole.
+
+    Returns:
+        Optional[bool]: Whether the bytes are equal, None if either is not a contiguous buffer.
+    """
+    try:
+        actual_view = memoryview(actual).cast("B")
+        expected_view = memoryview(expected).cast("B")
+    except (TypeError, ValueError):
+        return None
+    if actual_view.nbytes != expected_view.nbytes:
+        return False
+    for i in range(0, actual_view.nbytes, chunk_bytes):
+        if (
+            actual_view[i : i + chunk_bytes].tobytes()
+            != expected_view[i : i + chunk_bytes].tobytes()
+        ):
+            return False
+    return True
+
+
+def _fallback_is_equal(actual, expected):
+    """Compares with `==` and then, as a last resort, the pickled bytes."""
+    try:
+        eq = actual == expected
+    except Exception:
+        eq = False
+    if isinstance(eq, bool) and eq:
+        return True
+    return get_pickler().dumps(actual) == get_pickler().dumps(expected)
+
+
+def _has_dataclass_eq(cls) -> bool:
+    """Checks whether `==` of a dataclass is the one generated by `dataclasses`.
+
+    Other dataclasses are compared by their own `__eq__`.
+    """
+    params = getattr(cls, "__dataclass_params__", None)
+    if params is None or not params.eq:
+        return False
+    for klass in cls.__mro__:
+        if "__eq__" in klass.__dict__:
+            code = getattr(klass.__dict__["__eq__"], "__code__", None)
+            # generated methods are compiled from strings, not from a source file
+            return (
+                dataclasses.is_dataclass(klass)
+                and code is not None
+                and code.co_filename.startswith("<")
+            )
+    return False
+
+
+def _structural_is_equal(actual, expected):
+    """Compares two objects by walking their structure.
+
+    Builtin containers, floats, dataclasses and array-likes are compared
+    without pickling, stopping at the first mismatch.
+    Other objects fall back to `==` and then to the pickled bytes.
+    """
+    if actual is expected:
+        return True
+    if isinstance(actual, Exception) and isinstance(expected, Exception):
+        return str(actual) == str(expected) and type(actual) == type(expected)
+
+    cls = type(actual)
+    if cls is not type(expected):
+        return _fallback_is_equal(actual, expected)
+    if cls is float:
+        return actual == expected or (math.isnan(actual) and math.isnan(expected))
+    if cls in _SCALAR_TYPES:
+        return actual == expected
+    if cls is dict:
+        if len(actual) != len(expected):
+            return False
+        for key, value in actual.items():
+            if key not in expected:
+                return False
+            if not _structural_is_equal(value, expected[key]):
+                return False
+        return True
+    if cls is list or cls is tuple:
+        if len(actual) != len(expected):
+            return False
+        for a, e in zip(actual, expected):
+            if not _structural_is_equal(a, e):
+                return False
+        return True
+    if cls is set or cls is frozenset:
+        if len(actual) != len(expected):
+            return False
+        return _fallback_is_equal(actual, expected)
+    if dataclasses.is_dataclass(actual) and _has_dataclass_eq(cls):
+        for field in dataclasses.fields(actual):
+            if not field.compare:
+                continue
+            if not _structural_is_equal(
+                getattr(actual, field.name), getattr(expected, field.name)
+            ):
+                return False
+        return True
+    if _is_array_like(actual):
+        if actual.shape != expected.shape or actual.dtype != expected.dtype:
+            return False
+        # the memory of object arrays holds pointers, not values
+        if not getattr(actual.dtype, "hasobject", False):
+            is_buffer_equal = _is_buffer_equal(actual, expected)
+            if is_buffer_equal is None:
+                actual_bytes = _buffer_bytes(actual)
+                expected_bytes = _buffer_bytes(expected)
+                if actual_bytes is not None and expected_bytes is not None:
+                    is_buffer_equal = actual_bytes == expected_bytes
+            if is_buffer_equal:
+                return True
+            # floats with different bytes can still be equal, e.g. -0.0 and 0.0
+            if is_buffer_equal is not None and getattr(
+                actual.dtype, "kind", None
+            ) not in ("f", "c"):
+                return False
+        if hasattr(actual, "tolist"):
+            return _structural_is_equal(actual.tolist(), expected.tolist())
+    return _fallback_is_equal(actual, expected)
+
 
 def _default_is_equal(actual, expected):
     try:
-        if isinstance(actual, Exception) and isinstance(expected, Exception):
-            return str(actual) == str(expected) and type(actual) == type(expected)
-        if actual == expected:
-            return True
-        return get_pickler().dumps(actual) == get_pickler().dumps(expected)
+        return _structural_is_equal(actual, expected)
     except Exception:
         return False
 
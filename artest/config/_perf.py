@@ -0,0 +1,84 @@
+"""This module provides config for recording performance on case mode.
+
+Functions:
+    - set_record_performance_on_case_mode(record): Sets whether to record the time of captured calls.
+    - get_record_performance_on_case_mode(): Gets whether to record the time of captured calls.
+    - set_record_memory_on_case_mode(record): Sets whether to record the peak memory of captured calls.
+    - get_record_memory_on_case_mode(): Gets whether to record the peak memory of captured calls.
+    - set_profile_interval_on_case_mode(interval): Sets the sampling interval of captured calls.
+    - get_profile_interval_on_case_mode(): Gets the sampling interval of captured calls.
+"""
+
+_record_performance_on_case_mode = False
+_record_memory_on_case_mode = False
+_profile_interval_on_case_mode = None
+
+
+def set_record_performance_on_case_mode(record_performance_on_case_mode=False):
+    """Sets whether to record the wall and CPU time of captured calls on case mode.
+
+    The recorded time is saved in the metadata of the test case,
+    and serves as the baseline of performance regression testing.
+
+    Args:
+        record_performance_on_case_mode (bool): Whether to record the time or not.
+    """
+    global _record_performance_on_case_mode
+    _record_performance_on_case_mode = record_performance_on_case_mode
+
+
+def get_record_performance_on_case_mode():
+    """Gets whether to record the wall and CPU time of captured calls on case mode.
+
+    Returns:
+        bool: Whether to record the time or not.
+    """
+    return _record_performance_on_case_mode
+
+
+def set_record_memory_on_case_mode(record_memory_on_case_mode=False):
+    """Sets whether to record the peak memory of captured calls on case mode.
+
+    The peak memory allocated during a captured call is traced by tracemalloc,
+    and saved in the metadata of the test case as the baseline of memory regression testing.
+    Only the outermost captured call is traced.
+
+    Args:
+        record_memory_on_case_mode (bool): Whether to record the peak memory or not.
+    """
+    global _record_memory_on_case_mode
+    _record_memory_on_case_mode = record_memory_on_case_mode
+
+
+def get_record_memory_on_case_mode():
+    """Gets whether to record the peak memory of captured calls on case mode.
+
+    Returns:
+        bool: Whether to record the peak memory or not.
+    """
+    return _record_memory_on_case_mode
+
+
+def set_profile_interval_on_case_mode(profile_interval_on_case_mode=None):
+    """Sets the interval of sampling the stack of captured calls on case mode.
+
+    While the outermost captured call executes, its stack is sampled every
+    `profile_interval_on_case_mode` seconds of CPU time, and the samples are saved
+    as collapsed stacks in the `profile.collapsed` file of the test case,
+    which can be rendered by flame graph tools.
+    The overhead is bounded by the interval. Sampling only works in the main thread.
+
+    Args:
+        profile_interval_on_case_mode (Optional[float]): The interval in seconds. None disables sampling.
+    """
+    global _profile_interval_on_case_mode
+    _profile_interval_on_case_mode = profile_interval_on_case_mode
+
+
+def get_profile_interval_on_case_mode():
+    """Gets the interval of sampling the stack of captured calls on case mode.
+
+    Returns:
+        Optional[float]: The interval in seconds. None if sampling is disabled.
+    """
+    return _profile_interval_on_case_mode
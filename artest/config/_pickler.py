@@ -9,6 +9,8 @@ Functions:
     - get_on_pickle_dump_error(error): Gets the action to take on a specific pickling error.
     - set_assert_pickled_object_on_case_mode(assert_pickled_object_on_case_mode): Sets whether to assert pickled object on case mode.
     - get_assert_pickled_object_on_case_mode(): Gets the status of asserting pickled object on case mode.
+    - set_large_output_threshold(nbytes): Sets the size from which outputs are saved in the large layout.
+    - get_large_output_threshold(): Gets the size from which outputs are saved in the large layout.
 
 Classes:
     - _PickleErrorMatcher: Matches a specific pickle error.
@@ -41,6 +43,9 @@ _on_pickle_dump_error = OrderedDict(
 
 _assert_pickled_object_on_case_mode = False
 
+_DEFAULT_LARGE_OUTPUT_THRESHOLD = 64 * 1024 * 1024
+_large_output_threshold = _DEFAULT_LARGE_OUTPUT_THRESHOLD
+
 
 def set_pickler(pkl):
     """Sets the pickler to be used for serialization.
@@ -134,3 +139,28 @@ def get_assert_pickled_object_on_case_mode():
     """
     global _assert_pickled_object_on_case_mode
     return _assert_pickled_object_on_case_mode
+
+
+def set_large_output_threshold(nbytes=_DEFAULT_LARGE_OUTPUT_THRESHOLD):
+    """Sets the size from which outputs are saved in the large layout.
+
+    Outputs whose pickled size reaches the threshold are saved with raw
+    buffers for bytes and array-likes, and in chunks for lists, so the test
+    runner compares them lazily from a memory-mapped file instead of loading
+    them whole. The large layout is pickled by the standard pickle, and
+    outputs it cannot pickle are saved as usual.
+
+    Args:
+        nbytes (Optional[int]): The threshold in bytes, 64 MiB by default. None disables the large layout.
+    """
+    global _large_output_threshold
+    _large_output_threshold = nbytes
+
+
+def get_large_output_threshold():
+    """Gets the size from which outputs are saved in the large layout.
+
+    Returns:
+        Optional[int]: The threshold in bytes, None if the large layout is disabled.
+    """
+    return _large_output_threshold
@@ -0,0 +1,36 @@
+"""This module provides config for the storage of test case files.
+
+Functions:
+    - set_storage_backend(backend): Sets the storage backend of test case files.
+    - get_storage_backend(): Gets the storage backend of test case files.
+"""
+
+_storage_backend = None
+
+
+def set_storage_backend(backend=None):
+    """Sets the storage backend of test case files.
+
+    Both capturing and replaying test cases read and write the files
+    through the backend. The metadata is always kept under the artest root.
+
+    Args:
+        backend (Optional[artest.storage.StorageBackend]): The storage backend.
+            None stores the files under the artest root.
+    """
+    global _storage_backend
+    _storage_backend = backend
+
+
+def get_storage_backend():
+    """Gets the storage backend of test case files.
+
+    Returns:
+        artest.storage.StorageBackend: The storage backend.
+    """
+    global _storage_backend
+    if _storage_backend is None:
+        from ..storage import LocalStorage
+
+        _storage_backend = LocalStorage()
+    return _storage_backend
@@ -0,0 +1,31 @@
+"""This module provides config for tagging captured test cases.
+
+Functions:
+    - set_test_case_tags(tags): Sets the tags of captured test cases.
+    - get_test_case_tags(): Gets the tags of captured test cases.
+"""
+
+_test_case_tags: tuple[str, ...] = ()
+
+
+def set_test_case_tags(tags=None):
+    """Sets the tags of test cases captured on case mode.
+
+    The tags are saved in the metadata of the test case,
+    e.g. the host or the release the test case is captured on,
+    and can be used to select test cases to be exported.
+
+    Args:
+        tags (Optional[Iterable[str]]): The tags. None removes all tags.
+    """
+    global _test_case_tags
+    _test_case_tags = tuple(tags or ())
+
+
+def get_test_case_tags():
+    """Gets the tags of test cases captured on case mode.
+
+    Returns:
+        tuple[str, ...]: The tags.
+    """
+    return _test_case_tags
@@ -1,10 +1,8 @@
 import dataclasses
-import os
-from glob import glob
 from typing import Literal, Optional, Union
 
 from ..types import ConfigTestCaseQuota
-from ._paths import get_artest_root
+from ._storage import get_storage_backend
 
 
 class _TestCaseQuota:
@@ -13,8 +11,12 @@ class _TestCaseQuota:
         if self._quota_config.max_count is None:
             self._quota_config.max_count = "inf"
 
+    @property
+    def max_count(self) -> Union[int, Literal["inf"]]:
+        return self._quota_config.max_count
+
     def can_add_test_case(self, fcid):
-        cur_count = len(glob(os.path.join(get_artest_root(), fcid, "*", "func")))
+        cur_count = len(get_storage_backend().list(fcid, artifact="func"))
         return (
             self._quota_config.max_count == "inf"
             or cur_count < self._quota_config.max_count
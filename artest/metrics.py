@@ -0,0 +1,254 @@
+"""This module provides the in-process metrics of artest.
+
+Counters and latency histograms are kept per function id, so the cost of
+capturing test cases in production can be monitored.
+
+Metrics recorded on case mode:
+    - captured (counter): The number of captured calls.
+    - skipped_by_quota (counter): The number of calls not captured due to the test case quota.
+    - bytes_written (counter): The number of bytes written to the artest root.
+    - pickle_failures (counter): The number of objects failed to be pickled.
+    - pickle_seconds (histogram): The time to pickle an object.
+    - write_seconds (histogram): The time to write a pickled object.
+
+Metrics recorded by shadow calls (see `autoshadow`):
+    - shadow_matches (counter): The number of candidate outputs equal to the primary ones.
+    - shadow_mismatches (counter): The number of candidate outputs not equal to the primary ones.
+    - shadow_skipped (counter): The number of sampled calls not run by the candidate.
+    - shadow_errors (counter): The number of shadow calls failed to be compared or recorded.
+    - shadow_unrecorded (counter): The number of mismatches not recorded, since the primary implementation calls stubs.
+    - shadow_primary_seconds (histogram): The time of the primary implementation.
+    - shadow_candidate_seconds (histogram): The time of the candidate implementation.
+
+Functions:
+    - get_metrics_registry(): Gets the metrics registry.
+    - start_prometheus_dump(path, interval): Periodically dumps the metrics in Prometheus text format.
+    - stop_prometheus_dump(): Stops dumping the metrics periodically.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+)
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value as required by the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class HistogramSnapshot(NamedTuple):
+    """Represents the observations of a histogram.
+
+    Attributes:
+        buckets (tuple[float, ...]): The upper bounds of the buckets.
+        bucket_counts (tuple[int, ...]): The number of observations in each bucket, not cumulative.
+            The last count is for observations above the largest bound.
+        count (int): The number of observations.
+        sum (float): The sum of observations.
+    """
+
+    buckets: tuple
+    bucket_counts: tuple
+    count: int
+    sum: float
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(
+            self.buckets, tuple(self.bucket_counts), self.count, self.sum
+        )
+
+
+class MetricsRegistry:
+    """Holds counters and histograms per metric name and function id.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Initializes the MetricsRegistry with no metrics."""
+        self._buckets = tuple(buckets)
+        self._counters: dict[tuple[str, str], float] = {}
+        self._histograms: dict[tuple[str, str], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, fcid: str, value: float = 1):
+        """Increase a counter.
+
+        Args:
+            name (str): The metric name.
+            fcid (str): The function id.
+            value (float): The amount to increase.
+        """
+        with self._lock:
+            self._counters[name, fcid] = self._counters.get((name, fcid), 0) + value
+
+    def observe(self, name: str, fcid: str, value: float):
+        """Add an observation to a histogram.
+
+        Args:
+            name (str): The metric name.
+            fcid (str): The function id.
+            value (float): The observed value.
+        """
+        with self._lock:
+            if (name, fcid) not in self._histograms:
+                self._histograms[name, fcid] = _Histogram(self._buckets)
+            self._histograms[name, fcid].observe(value)
+
+    @contextmanager
+    def time(self, name: str, fcid: str):
+        """Observe the wall time in seconds of the block in a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, fcid, time.perf_counter() - start)
+
+    def get_counter(self, name: str, fcid: str) -> float:
+        """Gets the value of a counter, 0 if it is never increased."""
+        with self._lock:
+            return self._counters.get((name, fcid), 0)
+
+    def get_histogram(self, name: str, fcid: str) -> Optional[HistogramSnapshot]:
+        """Gets the snapshot of a histogram, None if nothing is observed."""
+        with self._lock:
+            histogram = self._histograms.get((name, fcid))
+            return histogram.snapshot() if histogram is not None else None
+
+    def reset(self):
+        """Remove all metrics."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def to_prometheus(self) -> str:
+        """Format the metrics in Prometheus text format.
+
+        Metric names are prefixed with `artest_`, and counters are suffixed with `_total`.
+
+        Returns:
+            str: The metrics in Prometheus text format.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: h.snapshot() for k, h in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            metric = f"artest_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, fcid), value in sorted(counters.items()):
+                if n == name:
+                    label = f'fcid="{_escape_label_value(fcid)}"'
+                    lines.append(f"{metric}{{{label}}} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            metric = f"artest_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for (n, fcid), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                label = f'fcid="{_escape_label_value(fcid)}"'
+                cumulative_count = 0
+                for bound, bucket_count in zip(h.buckets, h.bucket_counts):
+                    cumulative_count += bucket_count
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="{bound}"}} {cumulative_count}'
+                    )
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum{{{label}}} {h.sum}")
+                lines.append(f"{metric}_count{{{label}}} {h.count}")
+        return "".join(f"{line}\n" for line in lines)
+
+    def dump_prometheus(self, path: str):
+        """Write the metrics in Prometheus text format to a file.
+
+        The file is replaced atomically, so a collector never reads a partial file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+_metrics_registry = MetricsRegistry()
+_dump_thread: Optional[threading.Thread] = None
+_dump_stop_event: Optional[threading.Event] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Gets the metrics registry.
+
+    Returns:
+        MetricsRegistry: The metrics registry.
+    """
+    return _metrics_registry
+
+
+def start_prometheus_dump(path: str, interval: float = 60.0):
+    """Periodically dumps the metrics in Prometheus text format to a file.
+
+    The metrics are dumped by a daemon thread every `interval` seconds,
+    e.g. for the textfile collector of the node exporter.
+    A running dump is stopped first.
+
+    Args:
+        path (str): The path of the file.
+        interval (float): The interval in seconds.
+    """
+    global _dump_thread
+    global _dump_stop_event
+    stop_prometheus_dump()
+    stop_event = threading.Event()
+
+    def dump_periodically():
+        while not stop_event.wait(interval):
+            _metrics_registry.dump_prometheus(path)
+
+    _dump_stop_event = stop_event
+    _dump_thread = threading.Thread(target=dump_periodically, daemon=True)
+    _dump_thread.start()
+
+
+def stop_prometheus_dump():
+    """Stops dumping the metrics periodically."""
+    global _dump_thread
+    global _dump_stop_event
+    if _dump_thread is None:
+        return
+    _dump_stop_event.set()
+    _dump_thread.join()
+    _dump_thread = None
+    _dump_stop_event = None
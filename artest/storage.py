@@ -0,0 +1,692 @@
+"""This module provides the storage backends of test case files.
+
+A test case file is addressed by the function id, the test case id and
+the artifact, which is the path of the file relative to the test case root,
+e.g. `inputs` or `stub/{stub_fcid}.{call_count}.{input_hash}.output`.
+Both capturing and replaying test cases go through the backend set by
+`artest.config.set_storage_backend`, the artest root by default.
+
+Classes:
+    - StorageBackend: The interface of storage backends.
+    - LocalStorage: Stores the files in a local directory.
+    - InMemoryStorage: Stores the files in memory.
+    - HttpStorage: Stores the files in an HTTP object store.
+    - CachedStorage: Caches the files read from another backend in a local directory.
+    - DeltaStorage: Stores the files as deltas against a reference per function id.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from glob import escape, glob
+from typing import NamedTuple, Optional
+
+from .config._paths import get_artest_root
+
+StorageKey = tuple[str, str, str]
+
+
+class StorageBackend:
+    """The interface of storage backends.
+
+    Implementations must be thread-safe, as test cases are captured
+    and prefetched from multiple threads.
+    """
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Store the content of a file, replacing the existing one."""
+        raise NotImplementedError
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Get the content of a file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        raise NotImplementedError
+
+    def get_prefix(self, fcid: str, tcid: str, artifact: str, n: int) -> bytes:
+        """Get the first `n` bytes of a file, e.g. to read a header without a full download.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        return self.get(fcid, tcid, artifact)[:n]
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file exists."""
+        raise NotImplementedError
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file, if it exists."""
+        raise NotImplementedError
+
+    def size(self, fcid: str, tcid: str, artifact: str) -> int:
+        """Get the size in bytes of a file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        return len(self.get(fcid, tcid, artifact))
+
+    def local_path(self, fcid: str, tcid: str, artifact: str) -> Optional[str]:
+        """Get the path of a local copy of a file, e.g. to memory-map it.
+
+        Returns:
+            Optional[str]: The path, None if the file has no local copy.
+        """
+        return None
+
+    def list(
+        self,
+        fcid: Optional[str] = None,
+        tcid: Optional[str] = None,
+        artifact: Optional[str] = None,
+    ) -> list[StorageKey]:
+        """List the keys of the files, optionally filtered by each part of the key.
+
+        Returns:
+            list[tuple[str, str, str]]: The sorted (fcid, tcid, artifact) of the files.
+        """
+        raise NotImplementedError
+
+
+def _matches(key: StorageKey, fcid, tcid, artifact) -> bool:
+    return all(
+        part is None or part == k for k, part in zip(key, (fcid, tcid, artifact))
+    )
+
+
+class LocalStorage(StorageBackend):
+    """Stores the files in a local directory, as `{root}/{fcid}/{tcid}/{artifact}`.
+
+    Args:
+        root (Optional[str]): The directory. If None, the artest root at the time of access.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """Initializes the LocalStorage."""
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        """The directory of the files."""
+        return self._root if self._root is not None else get_artest_root()
+
+    def path(self, fcid: str, tcid: str, artifact: str) -> str:
+        """Get the path of a file under the root."""
+        return os.path.join(self.root, fcid, tcid, *artifact.split("/"))
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Write a file, creating its directories if needed."""
+        path = self.path(fcid, tcid, artifact)
+        dirpath = os.path.dirname(path)
+        if not os.path.exists(dirpath):
+            os.makedirs(dirpath, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Read a file."""
+        with open(self.path(fcid, tcid, artifact), "rb") as f:
+            return f.read()
+
+    def get_prefix(self, fcid: str, tcid: str, artifact: str, n: int) -> bytes:
+        """Read the first `n` bytes of a file."""
+        with open(self.path(fcid, tcid, artifact), "rb") as f:
+            return f.read(n)
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file exists."""
+        return os.path.isfile(self.path(fcid, tcid, artifact))
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file, if it exists."""
+        path = self.path(fcid, tcid, artifact)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def size(self, fcid: str, tcid: str, artifact: str) -> int:
+        """Get the size in bytes of a file, without reading it."""
+        return os.path.getsize(self.path(fcid, tcid, artifact))
+
+    def local_path(self, fcid: str, tcid: str, artifact: str) -> Optional[str]:
+        """Get the path of a file, None if it does not exist."""
+        path = self.path(fcid, tcid, artifact)
+        return path if os.path.isfile(path) else None
+
+    def list(self, fcid=None, tcid=None, artifact=None) -> list[StorageKey]:
+        """List the keys of the files under the root."""
+        pattern = os.path.join(
+            escape(self.root),
+            escape(fcid) if fcid is not None else "*",
+            escape(tcid) if tcid is not None else "*",
+            escape(artifact) if artifact is not None else os.path.join("**", "*"),
+        )
+        keys = []
+        for path in glob(pattern, recursive=True):
+            if not os.path.isfile(path):
+                continue
+            relpath = os.path.relpath(path, self.root).split(os.path.sep)
+            keys.append((relpath[0], relpath[1], "/".join(relpath[2:])))
+        return sorted(keys)
+
+
+class InMemoryStorage(StorageBackend):
+    """Stores the files in memory, e.g. for tests or short-lived workers."""
+
+    def __init__(self):
+        """Initializes the InMemoryStorage with no files."""
+        self._files: dict[StorageKey, bytes] = {}
+        self._lock = threading.Lock()
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Store a copy of the content of a file."""
+        with self._lock:
+            self._files[fcid, tcid, artifact] = bytes(data)
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Get the content of a file."""
+        with self._lock:
+            try:
+                return self._files[fcid, tcid, artifact]
+            except KeyError:
+                raise FileNotFoundError(f"{fcid}/{tcid}/{artifact}") from None
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file exists."""
+        with self._lock:
+            return (fcid, tcid, artifact) in self._files
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file, if it exists."""
+        with self._lock:
+            self._files.pop((fcid, tcid, artifact), None)
+
+    def list(self, fcid=None, tcid=None, artifact=None) -> list[StorageKey]:
+        """List the keys of the files."""
+        with self._lock:
+            return sorted(k for k in self._files if _matches(k, fcid, tcid, artifact))
+
+
+class HttpStorage(StorageBackend):
+    """Stores the files in an HTTP object store.
+
+    A file is stored at `{base_url}/{fcid}/{tcid}/{artifact}` with PUT,
+    read with GET, checked with HEAD and deleted with DELETE.
+    A missing file is answered with 404. Files are listed with
+    `GET {base_url}/?prefix={prefix}`, answered with a JSON list of
+    the `{fcid}/{tcid}/{artifact}` starting with the prefix.
+
+    Args:
+        base_url (str): The URL of the object store.
+        timeout (float): The timeout in seconds of each request.
+        headers (Optional[dict[str, str]]): Extra headers, e.g. for authorization.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        headers: Optional[dict[str, str]] = None,
+    ):
+        """Initializes the HttpStorage."""
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._headers = dict(headers or {})
+
+    def _url(self, fcid: str, tcid: str, artifact: str) -> str:
+        path = "/".join(urllib.parse.quote(part) for part in (fcid, tcid, artifact))
+        return f"{self._base_url}/{path}"
+
+    def _request(
+        self,
+        url: str,
+        method: str,
+        data: Optional[bytes] = None,
+        headers: Optional[dict[str, str]] = None,
+    ):
+        request = urllib.request.Request(
+            url, data=data, method=method, headers={**self._headers, **(headers or {})}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                return response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise FileNotFoundError(url) from None
+            raise
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Upload a file with PUT."""
+        self._request(self._url(fcid, tcid, artifact), "PUT", data)
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Download a file with GET."""
+        data, _ = self._request(self._url(fcid, tcid, artifact), "GET")
+        return data
+
+    def get_prefix(self, fcid: str, tcid: str, artifact: str, n: int) -> bytes:
+        """Download the first `n` bytes of a file with a Range request.
+
+        A store ignoring the range answers with the whole file, which is then cut.
+        """
+        if n <= 0:
+            return b""
+        # a store ignoring the range answers with the whole file
+        data, _ = self._request(
+            self._url(fcid, tcid, artifact),
+            "GET",
+            headers={"Range": f"bytes=0-{n - 1}"},
+        )
+        return data[:n]
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file exists with HEAD."""
+        try:
+            self._request(self._url(fcid, tcid, artifact), "HEAD")
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file with DELETE, if it exists."""
+        try:
+            self._request(self._url(fcid, tcid, artifact), "DELETE")
+        except FileNotFoundError:
+            pass
+
+    def size(self, fcid: str, tcid: str, artifact: str) -> int:
+        """Get the size of a file from the Content-Length of HEAD.
+
+        The file is downloaded if the store does not answer the length.
+        """
+        _, headers = self._request(self._url(fcid, tcid, artifact), "HEAD")
+        if headers.get("Content-Length") is None:
+            return len(self.get(fcid, tcid, artifact))
+        return int(headers["Content-Length"])
+
+    def list(self, fcid=None, tcid=None, artifact=None) -> list[StorageKey]:
+        """List the keys of the files with `GET {base_url}/?prefix={prefix}`."""
+        prefix = ""
+        if fcid is not None:
+            prefix = f"{fcid}/"
+            if tcid is not None:
+                prefix += f"{tcid}/"
+        query = urllib.parse.urlencode({"prefix": prefix})
+        data, _ = self._request(f"{self._base_url}/?{query}", "GET")
+        names = json.loads(data)
+        keys = (tuple(name.split("/", 2)) for name in names)
+        return sorted(k for k in keys if _matches(k, fcid, tcid, artifact))
+
+
+class CachedStorage(StorageBackend):
+    """Caches the files read from another backend in a local directory.
+
+    Reads are served from the cache, and fetched from the backend on a miss.
+    The least recently read files are evicted when the cache exceeds
+    `max_bytes`. Writes and deletes go to the backend and drop the cached
+    copy, so a worker only caches what it replays.
+
+    Args:
+        backend (StorageBackend): The backend, usually a remote one.
+        cache_dir (str): The directory of the cache, which may be kept between runs.
+        max_bytes (int): The max bytes of cached files.
+    """
+
+    def __init__(self, backend: StorageBackend, cache_dir: str, max_bytes: int):
+        """Initializes the CachedStorage, with the files cached by previous runs."""
+        self._backend = backend
+        self._cache = LocalStorage(cache_dir)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes: OrderedDict[StorageKey, int] = OrderedDict()
+        self._bytes_held = 0
+        # the files cached by previous runs, least recently modified first
+        cached = [
+            (os.path.getmtime(self._cache.path(*k)), k) for k in self._cache.list()
+        ]
+        for _, key in sorted(cached):
+            self._sizes[key] = os.path.getsize(self._cache.path(*key))
+            self._bytes_held += self._sizes[key]
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        while self._bytes_held > self._max_bytes and self._sizes:
+            key, size = self._sizes.popitem(last=False)
+            self._bytes_held -= size
+            self._cache.delete(*key)
+
+    def _drop(self, key: StorageKey):
+        with self._lock:
+            if key in self._sizes:
+                self._bytes_held -= self._sizes.pop(key)
+                self._cache.delete(*key)
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Write a file to the backend and drop its cached copy."""
+        self._backend.put(fcid, tcid, artifact, data)
+        self._drop((fcid, tcid, artifact))
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Get a file from the cache, fetching and caching it on a miss.
+
+        Files larger than `max_bytes` are never cached.
+        """
+        key = (fcid, tcid, artifact)
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+                try:
+                    return self._cache.get(*key)
+                except FileNotFoundError:
+                    self._bytes_held -= self._sizes.pop(key)
+
+        data = self._backend.get(*key)
+        if len(data) > self._max_bytes:
+            return data
+        # write a temporary file first, so a concurrent reader never sees a partial file
+        path = self._cache.path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            prefix=".tmp-", dir=os.path.dirname(path), delete=False
+        ) as f:
+            f.write(data)
+        os.replace(f.name, path)
+        with self._lock:
+            self._bytes_held += len(data) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(data)
+            self._evict()
+        return data
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file is cached or exists in the backend."""
+        with self._lock:
+            if (fcid, tcid, artifact) in self._sizes:
+                return True
+        return self._backend.exists(fcid, tcid, artifact)
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file from the backend and drop its cached copy."""
+        self._backend.delete(fcid, tcid, artifact)
+        self._drop((fcid, tcid, artifact))
+
+    def get_prefix(self, fcid: str, tcid: str, artifact: str, n: int) -> bytes:
+        """Get the first `n` bytes of a file, from the cache if it is cached.
+
+        A miss reads the prefix from the backend without caching the file.
+        """
+        key = (fcid, tcid, artifact)
+        with self._lock:
+            if key in self._sizes:
+                try:
+                    return self._cache.get_prefix(*key, n)
+                except FileNotFoundError:
+                    pass
+        return self._backend.get_prefix(*key, n)
+
+    def size(self, fcid: str, tcid: str, artifact: str) -> int:
+        """Get the size of a file, from the cache if it is cached."""
+        with self._lock:
+            if (fcid, tcid, artifact) in self._sizes:
+                return self._sizes[fcid, tcid, artifact]
+        return self._backend.size(fcid, tcid, artifact)
+
+    def local_path(self, fcid: str, tcid: str, artifact: str) -> Optional[str]:
+        """Get the path of the cached copy of a file, fetching it on a miss."""
+        key = (fcid, tcid, artifact)
+        with self._lock:
+            is_cached = key in self._sizes
+        if not is_cached:
+            self.get(*key)
+        return self._cache.local_path(*key)
+
+    def list(self, fcid=None, tcid=None, artifact=None) -> list[StorageKey]:
+        """List the keys of the files in the backend."""
+        return self._backend.list(fcid, tcid, artifact)
+
+
+class DeltaReport(NamedTuple):
+    """Represents the space saved by `DeltaStorage`.
+
+    Attributes:
+        files (int): The number of files.
+        delta_files (int): The number of files stored as deltas.
+        stored_bytes (int): The bytes stored in the backend.
+        original_bytes (int): The bytes of the files before delta encoding.
+    """
+
+    files: int
+    delta_files: int
+    stored_bytes: int
+    original_bytes: int
+
+    @property
+    def saved_bytes(self) -> int:
+        """The bytes saved by delta encoding."""
+        return self.original_bytes - self.stored_bytes
+
+
+def _common_prefix_length(a: memoryview, b: memoryview, limit: int) -> int:
+    # binary search, so the slices are compared in C
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_length(a: memoryview, b: memoryview, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class DeltaStorage(StorageBackend):
+    """Stores the files as deltas against a reference per function id.
+
+    The first file stored for an artifact of a function id is copied to
+    `references` and becomes the reference of that artifact. Stub and
+    fastreg files of the same function share a reference, whatever their
+    call count and input hash. A later file is stored as its common prefix
+    and suffix with the reference and the bytes in between, if that is at
+    most `max_ratio` of its size, which is the case for near-duplicate
+    pickles such as a config dict with one field changed. Reads rebuild
+    the files transparently. A file stored as is, but starting like a delta,
+    is prefixed with `RAW_MAGIC`, so any content can be stored.
+
+    References are never replaced or removed, so test cases can be deleted
+    or refreshed by any means, but `references` must be kept along with
+    `backend`.
+
+    Args:
+        backend (StorageBackend): The backend storing the files.
+        references (StorageBackend): The backend storing the references.
+        min_bytes (int): The min size of files to be delta encoded.
+        max_ratio (float): The max size of a delta relative to its file.
+    """
+
+    MAGIC = b"ARTEST-DELTA-1\n"
+    RAW_MAGIC = b"ARTEST-RAW-1\n"
+    # prefix length, suffix length, size of the file, digest of the reference
+    _HEADER = struct.Struct("<QQQ8s")
+    _REFERENCE_TCID = "reference"
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        references: StorageBackend,
+        min_bytes: int = 256,
+        max_ratio: float = 0.5,
+    ):
+        """Initializes the DeltaStorage, with no reference loaded yet."""
+        self._backend = backend
+        self._references_backend = references
+        self._min_bytes = min_bytes
+        self._max_ratio = max_ratio
+        self._lock = threading.Lock()
+        self._references: dict[tuple[str, str], bytes] = {}
+
+    @staticmethod
+    def _reference_artifact(artifact: str) -> str:
+        dirname, _, name = artifact.rpartition("/")
+        parts = name.split(".")
+        if dirname in ("stub", "fastreg") and len(parts) == 4:
+            # {fcid}.{call_count}.{input_hash}.{suffix}
+            return f"{dirname}/{parts[0]}.{parts[3]}"
+        return artifact
+
+    def _reference(self, fcid: str, artifact: str, data: Optional[bytes] = None):
+        """Get the reference of an artifact, or make `data` the reference if there is none."""
+        key = (fcid, self._reference_artifact(artifact))
+        with self._lock:
+            if key in self._references:
+                return self._references[key]
+            try:
+                reference = self._references_backend.get(
+                    fcid, self._REFERENCE_TCID, key[1]
+                )
+            except FileNotFoundError:
+                if data is None:
+                    raise
+                reference = bytes(data)
+                self._references_backend.put(
+                    fcid, self._REFERENCE_TCID, key[1], reference
+                )
+            self._references[key] = reference
+            return reference
+
+    def _escape(self, data: bytes) -> bytes:
+        if data.startswith((self.MAGIC, self.RAW_MAGIC)):
+            return self.RAW_MAGIC + data
+        return data
+
+    def _encode(self, fcid: str, artifact: str, data: bytes) -> bytes:
+        if len(data) < self._min_bytes:
+            return self._escape(data)
+        reference = self._reference(fcid, artifact, data)
+        if reference == data:
+            prefix, suffix = len(data), 0
+        else:
+            a, b = memoryview(reference), memoryview(data)
+            limit = min(len(a), len(b))
+            prefix = _common_prefix_length(a, b, limit)
+            suffix = _common_suffix_length(a, b, limit - prefix)
+        middle = data[prefix : len(data) - suffix]
+        if (
+            len(middle) + len(self.MAGIC) + self._HEADER.size
+            > len(data) * self._max_ratio
+        ):
+            return self._escape(data)
+        header = self._HEADER.pack(
+            prefix, suffix, len(data), hashlib.sha256(reference).digest()[:8]
+        )
+        return self.MAGIC + header + middle
+
+    def _decode(self, fcid: str, artifact: str, data: bytes) -> bytes:
+        if data.startswith(self.RAW_MAGIC):
+            return data[len(self.RAW_MAGIC) :]
+        if not data.startswith(self.MAGIC):
+            return data
+        start = len(self.MAGIC)
+        prefix, suffix, size, digest = self._HEADER.unpack_from(data, start)
+        reference = self._reference(fcid, artifact)
+        if hashlib.sha256(reference).digest()[:8] != digest:
+            raise ValueError(f"The reference of {fcid}/{artifact} has been changed.")
+        middle = data[start + self._HEADER.size :]
+        return reference[:prefix] + middle + reference[len(reference) - suffix :]
+
+    def put(self, fcid: str, tcid: str, artifact: str, data: bytes):
+        """Store a file as a delta against the reference of its artifact, or as is.
+
+        Files smaller than `min_bytes` and files whose delta would exceed
+        `max_ratio` of their size are stored as is. A delta is stored as
+        `MAGIC`, a header with the lengths of the common prefix and suffix,
+        the size of the file and a digest of the reference, and then the
+        bytes in between. A file stored as is, but starting with `MAGIC` or
+        `RAW_MAGIC`, is prefixed with `RAW_MAGIC`.
+        """
+        self._backend.put(fcid, tcid, artifact, self._encode(fcid, artifact, data))
+
+    def get(self, fcid: str, tcid: str, artifact: str) -> bytes:
+        """Get the content of a file, rebuilt from its reference if it is a delta.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the reference has changed since the delta was stored.
+        """
+        return self._decode(fcid, artifact, self._backend.get(fcid, tcid, artifact))
+
+    def exists(self, fcid: str, tcid: str, artifact: str) -> bool:
+        """Check whether a file exists in the backend."""
+        return self._backend.exists(fcid, tcid, artifact)
+
+    def delete(self, fcid: str, tcid: str, artifact: str):
+        """Delete a file from the backend, keeping the references."""
+        self._backend.delete(fcid, tcid, artifact)
+
+    def size(self, fcid: str, tcid: str, artifact: str) -> int:
+        """Get the size of a file before delta encoding.
+
+        Only the header of the stored file is read, and the size of files
+        stored as is comes from the backend.
+        """
+        # the prefetcher gets the size of every file, so nothing more is downloaded
+        head = self._backend.get_prefix(
+            fcid, tcid, artifact, len(self.MAGIC) + self._HEADER.size
+        )
+        if head.startswith(self.MAGIC):
+            return self._HEADER.unpack_from(head, len(self.MAGIC))[2]
+        size = self._backend.size(fcid, tcid, artifact)
+        if head.startswith(self.RAW_MAGIC):
+            return size - len(self.RAW_MAGIC)
+        return size
+
+    def local_path(self, fcid: str, tcid: str, artifact: str) -> Optional[str]:
+        """Get the path of the stored file in the backend, delta or not."""
+        # a delta never looks like a file to be memory-mapped, so readers fall back to get()
+        return self._backend.local_path(fcid, tcid, artifact)
+
+    def list(self, fcid=None, tcid=None, artifact=None) -> list[StorageKey]:
+        """List the keys of the files in the backend."""
+        return self._backend.list(fcid, tcid, artifact)
+
+    def report(self, fcid: Optional[str] = None) -> DeltaReport:
+        """Report the space saved by delta encoding.
+
+        Args:
+            fcid (Optional[str]): The function id. If None, all functions.
+
+        Returns:
+            DeltaReport: The sizes of the stored files. Files stored as is count
+                at their size without the `RAW_MAGIC` prefix.
+        """
+        files = delta_files = stored_bytes = original_bytes = 0
+        for key in self._backend.list(fcid):
+            data = self._backend.get(*key)
+            files += 1
+            stored_bytes += len(data)
+            if data.startswith(self.MAGIC):
+                delta_files += 1
+                original_bytes += self._HEADER.unpack_from(data, len(self.MAGIC))[2]
+            elif data.startswith(self.RAW_MAGIC):
+                original_bytes += len(data) - len(self.RAW_MAGIC)
+            else:
+                original_bytes += len(data)
+        return DeltaReport(files, delta_files, stored_bytes, original_bytes)
@@ -10,13 +10,14 @@ Classes:
 Enums:
     - OnPickleDumpErrorAction: Actions enums on pickle dump error.
     - OnFuncIdDuplicateAction: Actions enums on function id duplicate.
+    - StubMatchPolicy: How stub calls are matched with the recorded outputs on replay.
     - ArtestMode: Artest Modes.
     - FunctionOutputType: Function output types.
 
 
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Literal, NamedTuple, Optional, Union
 
@@ -45,17 +46,86 @@ class StatusTestResult(str, Enum):
     SKIP = "SKIP"
     REFRESH = "REFRESH"
     ERROR = "ERROR"
+    CACHED = "CACHED"
 
 
-TestResult = NamedTuple(
-    "TestResult",
-    [
-        ("status", StatusTestResult),
-        ("fcid", str),
-        ("tcid", str),
-        ("message", str),
-    ],
-)
+class StatusVerifyResult(str, Enum):
+    """Verify result status."""
+
+    OK = "OK"
+    MODIFIED = "MODIFIED"
+    CORRUPTED = "CORRUPTED"
+    MISSING = "MISSING"
+
+
+class VerifyResult(NamedTuple):
+    """Represents the integrity of a test case.
+
+    Attributes:
+        fcid (str): The function id.
+        tcid (str): The test case id.
+        status (StatusVerifyResult): MISSING if the test case or one of its files is gone,
+            CORRUPTED if the outputs do not match their digest or a file cannot be read,
+            MODIFIED if the files do not match the hash in the metadata.
+        message (Optional[str]): The details of the problem.
+    """
+
+    fcid: str
+    tcid: str
+    status: StatusVerifyResult
+    message: Optional[str] = None
+
+
+class TestResult(NamedTuple):
+    """Represents the result of a test.
+
+    Attributes:
+        status (StatusTestResult): The test result status.
+        fcid (str): The function id.
+        tcid (str): The test case id.
+        message (str): The message of the result.
+        wall_time (Optional[float]): The wall time in seconds to run the test case.
+        cpu_time (Optional[float]): The CPU time in seconds to run the test case.
+        artifact_bytes (Optional[int]): The size of the test case artifacts in bytes.
+        load_time (Optional[float]): The wall time in seconds to load the artifacts.
+        exec_time (Optional[float]): The wall time in seconds to execute the function.
+        compare_time (Optional[float]): The wall time in seconds to compare the outputs.
+        peak_memory (Optional[int]): The peak memory in bytes traced during the execution.
+    """
+
+    status: StatusTestResult
+    fcid: str
+    tcid: str
+    message: str
+    wall_time: Optional[float] = None
+    cpu_time: Optional[float] = None
+    artifact_bytes: Optional[int] = None
+    load_time: Optional[float] = None
+    exec_time: Optional[float] = None
+    compare_time: Optional[float] = None
+    peak_memory: Optional[int] = None
+
+
+class BenchResult(NamedTuple):
+    """Represents the benchmark result of a function.
+
+    Attributes:
+        fcid (str): The function id.
+        calls (int): The number of timed calls.
+        min (float): The min wall time in seconds of a call.
+        median (float): The median wall time in seconds of a call.
+        p95 (float): The 95th percentile wall time in seconds of a call.
+        stddev (float): The standard deviation in seconds of the wall time.
+        calls_per_sec (float): The number of calls per second.
+    """
+
+    fcid: str
+    calls: int
+    min: float
+    median: float
+    p95: float
+    stddev: float
+    calls_per_sec: float
 
 
 @dataclass
@@ -87,6 +157,20 @@ class OnFuncIdDuplicateAction(str, Enum):
     IGNORE = "ignore"
 
 
+class StubMatchPolicy(str, Enum):
+    """How stub calls are matched with the recorded outputs on replay.
+
+    ORDERED matches the n-th call of a stub with its n-th recorded call,
+    which must have the same inputs. INPUT_HASH matches a call with the
+    recorded calls of the same inputs, first recorded first, so calls
+    may be reordered or made concurrently, e.g. with `asyncio.gather` or
+    from worker threads running in a copy of the caller's context.
+    """
+
+    ORDERED = "ordered"
+    INPUT_HASH = "input_hash"
+
+
 class ArtestMode(str, Enum):
     """Artest Modes."""
 
@@ -117,6 +201,32 @@ class ArtestConfig:
         include_test_case (Optional[list[str]]): The list of test case ids to be included.
         exclude_function (Optional[list[str]]): The list of function ids to be excluded.
         exclude_test_case (Optional[list[str]]): The list of test case ids to be excluded.
+        enable_fastreg (bool): Whether to load saved outputs of nested autoreg functions.
+        prefetch_depth (int): The number of upcoming test cases to read ahead. 0 disables prefetching.
+        prefetch_max_bytes (Optional[int]): The max bytes held by prefetched test cases.
+        fail_fast (bool): Whether to stop at the first failed test case.
+        max_failures (Optional[int]): Stop after this many failed test cases.
+        timeout (Optional[float]): The max wall time in seconds of a test case.
+        record_coverage (bool): Whether to record the source lines executed by passing test cases.
+        record_arcs (bool): Whether to also trace the line transitions, i.e. branch coverage.
+        changed_files (Optional[list[str]]): Absolute paths of changed files.
+            If given, only test cases that executed these files are run.
+        use_cache (bool): Whether to skip test cases whose cached result is still valid.
+        report_jsonl (Optional[str]): The path to stream test results as JSON lines.
+        junit_xml (Optional[str]): The path to stream test results as JUnit XML.
+        durations (Optional[int]): Print the N slowest test cases and functions. 0 prints all.
+        perf (bool): Whether to fail test cases slower than the time recorded on case mode.
+        perf_repeat (int): The number of replays to measure the time of a test case.
+        perf_ratio (float): The max ratio of the measured time to the recorded time.
+        perf_min_delta (float): The min difference in seconds to report a slowdown.
+        perf_metric (Literal['wall', 'cpu']): The time to compare.
+        memory (bool): Whether to fail test cases whose peak memory grows beyond the baseline.
+        memory_bless (bool): Whether to save the peak memory of passing test cases as the baseline.
+        memory_ratio (float): The max ratio of the peak memory to the baseline.
+        memory_min_delta (int): The min difference in bytes to report a growth.
+        memory_top (int): The number of top memory consumers to print.
+        profile (Optional[str]): The directory to save the merged cProfile stats of each function.
+        profile_top (int): The number of entries to print in the cumulative profile table.
     """
 
     mode: Literal["refresh", "test"] = "test"
@@ -125,6 +235,213 @@ class ArtestConfig:
     exclude_function: Union[None, list[str]] = None
     exclude_test_case: Union[None, list[str]] = None
     enable_fastreg: bool = False
+    prefetch_depth: int = 0
+    prefetch_max_bytes: Optional[int] = None
+    fail_fast: bool = False
+    max_failures: Optional[int] = None
+    timeout: Optional[float] = None
+    record_coverage: bool = False
+    record_arcs: bool = False
+    changed_files: Union[None, list[str]] = None
+    use_cache: bool = True
+    report_jsonl: Optional[str] = None
+    junit_xml: Optional[str] = None
+    durations: Optional[int] = None
+    perf: bool = False
+    perf_repeat: int = 5
+    perf_ratio: float = 1.5
+    perf_min_delta: float = 0.0
+    perf_metric: Literal["wall", "cpu"] = "wall"
+    memory: bool = False
+    memory_bless: bool = False
+    memory_ratio: float = 1.2
+    memory_min_delta: int = 0
+    memory_top: int = 10
+    profile: Optional[str] = None
+    profile_top: int = 20
+
+
+@dataclass
+class BenchConfig:
+    """Bench config.
+
+    Attributes:
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        enable_fastreg (bool): Whether to load saved outputs of nested autoreg functions.
+        warmup (int): The number of untimed rounds over the test cases of a function.
+        repeat (int): The number of timed rounds over the test cases of a function.
+        save (Optional[str]): The path to save the benchmark results as JSON.
+        compare (Optional[str]): The path of saved benchmark results to compare with.
+    """
+
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    enable_fastreg: bool = False
+    warmup: int = 1
+    repeat: int = 10
+    save: Optional[str] = None
+    compare: Optional[str] = None
+
+
+@dataclass
+class MinimizeConfig:
+    """Minimize config.
+
+    Attributes:
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        enable_fastreg (bool): Whether to load saved outputs of nested autoreg functions.
+        action (Literal['dry-run', 'archive', 'delete']): What to do with the redundant test cases.
+        archive (Optional[str]): The directory to move the redundant test cases to.
+    """
+
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    enable_fastreg: bool = False
+    action: Literal["dry-run", "archive", "delete"] = "dry-run"
+    archive: Optional[str] = None
+
+
+class MinimizeResult(NamedTuple):
+    """Represents the minimized test cases of a function.
+
+    Attributes:
+        fcid (str): The function id.
+        kept (list[str]): The ids of test cases kept.
+        removed (list[str]): The ids of redundant test cases, removed unless it is a dry run.
+    """
+
+    fcid: str
+    kept: list
+    removed: list
+
+
+@dataclass
+class GcConfig:
+    """Garbage collection config.
+
+    Attributes:
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        max_count (Optional[int]): The max count of test cases of each function.
+            If None, the test case quota of each function is enforced.
+        min_age (float): The min age in seconds of an incomplete test case to be removed,
+            so test cases being captured are left alone.
+        workers (Optional[int]): The number of threads scanning the functions.
+        full (bool): Whether to rescan the test cases checked by the previous runs.
+        dry_run (bool): Whether to only report what would be removed.
+    """
+
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    max_count: Optional[int] = None
+    min_age: float = 60.0
+    workers: Optional[int] = None
+    full: bool = False
+    dry_run: bool = False
+
+
+class GcResult(NamedTuple):
+    """Represents what is removed by the garbage collection.
+
+    Attributes:
+        removed_incomplete (list[tuple[str, str]]): The (fcid, tcid) of incomplete test cases.
+        removed_by_quota (list[tuple[str, str]]): The (fcid, tcid) of the oldest test cases over the quota.
+        dropped_meta (list[tuple[str, str]]): The (fcid, tcid) of metadata entries without a test case.
+        removed_files (list[str]): The paths of files not belonging to any test case.
+    """
+
+    removed_incomplete: list
+    removed_by_quota: list
+    dropped_meta: list
+    removed_files: list
+
+
+@dataclass
+class VerifyConfig:
+    """Verify config.
+
+    Attributes:
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        workers (Optional[int]): The number of threads hashing the test cases.
+        report_jsonl (Optional[str]): The path to write one JSON line per verified test case.
+    """
+
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    workers: Optional[int] = None
+    report_jsonl: Optional[str] = None
+
+
+@dataclass
+class ExportConfig:
+    """Export config.
+
+    Attributes:
+        path (str): The path of the bundle to write.
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        since (Optional[str]): Only export test cases created at or after this ISO 8601 time.
+        until (Optional[str]): Only export test cases created before this ISO 8601 time.
+        tags (Optional[list[str]]): Only export test cases with any of the tags.
+        compress (bool): Whether to deflate the files in the bundle.
+    """
+
+    path: str
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+    tags: Union[None, list[str]] = None
+    compress: bool = False
+
+
+class ExportResult(NamedTuple):
+    """Represents the test cases written to a bundle.
+
+    Attributes:
+        exported (list[tuple[str, str]]): The (fcid, tcid) of exported test cases.
+        missing (list[tuple[str, str]]): The (fcid, tcid) of selected test cases without a directory.
+    """
+
+    exported: list
+    missing: list
+
+
+@dataclass
+class ImportConfig:
+    """Import config.
+
+    Attributes:
+        path (str): The path of the bundle to read.
+        include_function (Optional[list[str]]): The list of function ids to be included.
+        exclude_function (Optional[list[str]]): The list of function ids to be excluded.
+        overwrite (bool): Whether to replace existing test cases with a different hash.
+    """
+
+    path: str
+    include_function: Union[None, list[str]] = None
+    exclude_function: Union[None, list[str]] = None
+    overwrite: bool = False
+
+
+class ImportResult(NamedTuple):
+    """Represents the test cases read from a bundle.
+
+    Attributes:
+        imported (list[tuple[str, str]]): The (fcid, tcid) of imported test cases.
+        skipped (list[tuple[str, str]]): The (fcid, tcid) of test cases already present with the same hash.
+        conflicted (list[tuple[str, str]]): The (fcid, tcid) of test cases present with a different hash,
+            which are not imported unless overwriting.
+        corrupted (list[tuple[str, str]]): The (fcid, tcid) of test cases not matching their hash in the bundle.
+    """
+
+    imported: list
+    skipped: list
+    conflicted: list
+    corrupted: list
 
 
 @dataclass
@@ -138,6 +455,12 @@ class MetadataTestCase:
         test_case_id (str): The test case id.
         hash_hex (str): The hash of the test case.
         bytes_size (int): The size of the test case in bytes.
+        wall_time (Optional[float]): The wall time in seconds of the captured call.
+        cpu_time (Optional[float]): The CPU time in seconds of the captured call.
+        peak_memory (Optional[int]): The peak memory in bytes traced during the captured call.
+        hash_version (int): How the hash is calculated. 1 hashes the absolute file paths,
+            2 hashes the file paths relative to the test case root.
+        tags (list[str]): The tags set when the test case is captured.
     """
 
     version: str
@@ -146,6 +469,11 @@ class MetadataTestCase:
     test_case_id: str
     hash_hex: str
     bytes_size: int
+    wall_time: Optional[float] = None
+    cpu_time: Optional[float] = None
+    peak_memory: Optional[int] = None
+    hash_version: int = 1
+    tags: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -0,0 +1,10 @@
+"""Benchmarks of artest overhead.
+
+The benchmarks measure the per-call cost of the autoreg and autostub wrappers
+in each artest mode, and the growth of the metadata with the corpus size.
+Results can be saved as JSON and compared across commits.
+
+Usage:
+    python -m benchmarks --save before.json
+    python -m benchmarks --compare before.json
+"""
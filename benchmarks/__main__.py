@@ -0,0 +1,49 @@
+"""Run the benchmarks of artest overhead.
+
+Usage:
+    python -m benchmarks [--quick] [--filter NAME ...] [--save PATH] [--compare PATH]
+"""
+
+import argparse
+import sys
+
+from . import bench_decorators, bench_meta  # noqa: F401, register the benchmarks
+from ._harness import (
+    compare_results,
+    environment,
+    format_result,
+    get_benchmarks,
+    run_benchmark,
+    save_results,
+)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--filter", nargs="+", action="extend")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--number", type=int, default=None)
+    parser.add_argument("--save", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args(args)
+
+    repeat = args.repeat or (3 if args.quick else 15)
+    number = args.number or (10 if args.quick else 100)
+
+    print(" ".join(f"{k}={v}" for k, v in environment().items()))
+    results = []
+    for b in get_benchmarks(args.filter):
+        r = run_benchmark(b, repeat=repeat, number=number, quick=args.quick)
+        print(format_result(r))
+        results.append(r)
+
+    if args.compare is not None:
+        print("\n".join(compare_results(results, args.compare)))
+    if args.save is not None:
+        save_results(results, args.save)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
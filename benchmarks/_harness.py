@@ -0,0 +1,212 @@
+"""The harness to register, time and report benchmarks."""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, NamedTuple, Optional
+
+import artest
+import artest.artest
+from artest.config import _paths, set_artest_root, set_test_case_id_generator
+
+
+class Benchmark(NamedTuple):
+    """A registered benchmark.
+
+    Attributes:
+        name (str): The benchmark name.
+        factory (Callable): A generator function taking `quick`, which sets up the
+            benchmark, yields `(run, reset)` and tears down after resumed.
+            `run` is the timed call, and `reset`, if not None, is called
+            before each timed call without being timed.
+    """
+
+    name: str
+    factory: Callable
+
+
+class BenchmarkResult(NamedTuple):
+    """The timing of a benchmark in seconds per call.
+
+    Attributes:
+        name (str): The benchmark name.
+        calls (int): The number of timed calls.
+        min (float): The min time of a call.
+        median (float): The median time of a call.
+        stddev (float): The standard deviation of the time of a call.
+    """
+
+    name: str
+    calls: int
+    min: float
+    median: float
+    stddev: float
+
+
+_benchmarks: list[Benchmark] = []
+
+
+def benchmark(name: str):
+    """Register a benchmark.
+
+    Args:
+        name (str): The benchmark name.
+    """
+
+    def decorator(factory):
+        _benchmarks.append(Benchmark(name, factory))
+        return factory
+
+    return decorator
+
+
+def get_benchmarks(patterns: Optional[list[str]] = None) -> list[Benchmark]:
+    """Get the registered benchmarks whose names contain any of the patterns."""
+    if not patterns:
+        return list(_benchmarks)
+    return [b for b in _benchmarks if any(p in b.name for p in patterns)]
+
+
+def _tcid_generator():
+    i = 0
+    while True:
+        yield f"bench-{i}"
+        i += 1
+
+
+def run_benchmark(b: Benchmark, repeat: int, number: int, quick: bool):
+    """Time a benchmark in a fresh artest root, restoring the previous one afterwards.
+
+    Each of the `repeat` samples times `number` calls, with the garbage
+    collector disabled as timeit does. Benchmarks with a reset step are
+    timed one call per sample.
+
+    Args:
+        b (Benchmark): The benchmark.
+        repeat (int): The number of samples.
+        number (int): The number of calls per sample.
+        quick (bool): Whether to run a smaller workload.
+
+    Returns:
+        BenchmarkResult: The timing.
+    """
+    root = tempfile.mkdtemp(prefix="artest-bench-")
+    # None when the root follows the working directory
+    previous_root = _paths._artest_root
+    try:
+        set_artest_root(root)
+        set_test_case_id_generator(_tcid_generator())
+        artest.artest._stub_counter.clear()
+        artest.artest._fastreg_counter.clear()
+        gen = b.factory(quick)
+        run, reset = next(gen)
+        if reset is not None:
+            number = 1
+        # warmup
+        if reset is not None:
+            reset()
+        run()
+
+        samples = []
+        gc_enabled = gc.isenabled()
+        for _ in range(repeat):
+            if reset is not None:
+                reset()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(number):
+                    run()
+                samples.append((time.perf_counter() - start) / number)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+        next(gen, None)
+    finally:
+        set_test_case_id_generator()
+        _paths._artest_root = previous_root
+        shutil.rmtree(root, ignore_errors=True)
+    return BenchmarkResult(
+        name=b.name,
+        calls=repeat * number,
+        min=min(samples),
+        median=statistics.median(samples),
+        stddev=statistics.pstdev(samples),
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """Describe where the benchmarks ran, for comparing results across commits."""
+    return {
+        "artest_version": artest.__version__,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+
+
+def format_result(r: BenchmarkResult) -> str:
+    return (
+        f"{r.name:45s} min={r.min * 1e6:12.2f}us median={r.median * 1e6:12.2f}us "
+        f"stddev={r.stddev * 1e6:10.2f}us"
+    )
+
+
+def save_results(results: list[BenchmarkResult], path: str):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "environment": environment(),
+                "results": [r._asdict() for r in results],
+            },
+            f,
+            indent=2,
+        )
+
+
+def compare_results(results: list[BenchmarkResult], path: str) -> list[str]:
+    """Compare the medians with saved results.
+
+    Returns:
+        list[str]: One line per benchmark.
+    """
+    with open(path) as f:
+        saved = json.load(f)
+    baseline = {r["name"]: BenchmarkResult(**r) for r in saved["results"]}
+    lines = [f"Compared with {path} (commit {saved['environment'].get('commit')}):"]
+    for r in results:
+        if r.name not in baseline:
+            lines.append(f"{r.name:45s} (new)")
+            continue
+        base_median = baseline[r.name].median
+        if r.median <= 0 or base_median <= 0:
+            change = "unchanged"
+        elif r.median <= base_median:
+            change = f"{base_median / r.median:.2f}x faster"
+        else:
+            change = f"{r.median / base_median:.2f}x slower"
+        lines.append(
+            f"{r.name:45s} {base_median * 1e6:12.2f}us -> {r.median * 1e6:12.2f}us {change}"
+        )
+    return lines
@@ -0,0 +1,184 @@
+"""Benchmarks of the per-call cost of the autoreg and autostub wrappers."""
+
+import os
+import random
+import shutil
+from contextlib import contextmanager
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import get_artest_root
+from artest.types import ArtestMode
+
+from ._harness import benchmark
+
+NESTING_DEPTH = 5  # nested to nested_4
+STUB_CALLS = 100
+
+
+def plain_echo(x):
+    return x
+
+
+@autoreg("bench-echo")
+def echo(x):
+    return x
+
+
+@autostub("bench-stub-echo")
+def stub_echo(x):
+    return x
+
+
+@autoreg("bench-stub-heavy")
+def stub_heavy(n):
+    return sum(stub_echo(i) for i in range(n))
+
+
+# artest looks up functions by their qualified names,
+# so the nested functions are defined at the module level
+@autoreg("bench-nested-0")
+def nested(x):
+    return nested_1(x) + 1
+
+
+@autoreg("bench-nested-1")
+def nested_1(x):
+    return nested_2(x) + 1
+
+
+@autoreg("bench-nested-2")
+def nested_2(x):
+    return nested_3(x) + 1
+
+
+@autoreg("bench-nested-3")
+def nested_3(x):
+    return nested_4(x) + 1
+
+
+@autoreg("bench-nested-4")
+def nested_4(x):
+    return x + 1
+
+
+def _payload(large: bool, quick: bool):
+    if not large:
+        return (1, "a")
+    rng = random.Random(0)
+    return [rng.random() for _ in range(1_000 if quick else 100_000)]
+
+
+@contextmanager
+def _artest_mode(mode: ArtestMode, fcid=None, tcid=None, enable_fastreg=False):
+    tokens = [
+        (artest.artest._artest_mode_var, artest.artest._artest_mode_var.set(mode)),
+        (
+            artest.artest._enable_fastreg_var,
+            artest.artest._enable_fastreg_var.set(enable_fastreg),
+        ),
+    ]
+    if fcid is not None:
+        tokens.append((artest.artest._fcid_var, artest.artest._fcid_var.set(fcid)))
+        tokens.append((artest.artest._tcid_var, artest.artest._tcid_var.set(tcid)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def _clear_artest_root():
+    root = get_artest_root()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def _capture(fcid, func, *args):
+    """Capture the only test case of func in the artest root, and return its id."""
+    with _artest_mode(ArtestMode.CASE):
+        func(*args)
+    (tcid,) = os.listdir(os.path.join(get_artest_root(), fcid))
+    return tcid
+
+
+def _reset_counters(tcid):
+    return lambda: artest.artest._reset_test_case_counters(tcid)
+
+
+@benchmark("disable/plain-call-baseline")
+def bench_plain_call(quick):
+    x = _payload(False, quick)
+    yield lambda: plain_echo(x), None
+
+
+@benchmark("disable/autoreg-small")
+def bench_disable_autoreg(quick):
+    x = _payload(False, quick)
+    with _artest_mode(ArtestMode.DISABLE):
+        yield lambda: echo(x), None
+
+
+@benchmark("disable/autostub-small")
+def bench_disable_autostub(quick):
+    x = _payload(False, quick)
+    with _artest_mode(ArtestMode.DISABLE):
+        yield lambda: stub_echo(x), None
+
+
+@benchmark("case/autoreg-small")
+def bench_case_autoreg_small(quick):
+    x = _payload(False, quick)
+    with _artest_mode(ArtestMode.CASE):
+        yield lambda: echo(x), _clear_artest_root
+
+
+@benchmark("case/autoreg-large")
+def bench_case_autoreg_large(quick):
+    x = _payload(True, quick)
+    with _artest_mode(ArtestMode.CASE):
+        yield lambda: echo(x), _clear_artest_root
+
+
+@benchmark(f"case/stub-heavy-{STUB_CALLS}")
+def bench_case_stub_heavy(quick):
+    with _artest_mode(ArtestMode.CASE):
+        yield lambda: stub_heavy(STUB_CALLS), _clear_artest_root
+
+
+@benchmark(f"case/nested-{NESTING_DEPTH}")
+def bench_case_nested(quick):
+    with _artest_mode(ArtestMode.CASE):
+        yield lambda: nested(0), _clear_artest_root
+
+
+@benchmark("test/autoreg-small")
+def bench_test_autoreg_small(quick):
+    x = _payload(False, quick)
+    with _artest_mode(ArtestMode.TEST, "bench-echo", "bench-0"):
+        yield lambda: echo(x), None
+
+
+@benchmark(f"test/stub-heavy-{STUB_CALLS}")
+def bench_test_stub_heavy(quick):
+    tcid = _capture("bench-stub-heavy", stub_heavy, STUB_CALLS)
+    with _artest_mode(ArtestMode.TEST, "bench-stub-heavy", tcid):
+        yield lambda: stub_heavy(STUB_CALLS), _reset_counters(tcid)
+
+
+@benchmark(f"test/nested-{NESTING_DEPTH}")
+def bench_test_nested(quick):
+    tcid = _capture("bench-nested-0", nested, 0)
+    with _artest_mode(ArtestMode.TEST, "bench-nested-0", tcid):
+        yield lambda: nested(0), _reset_counters(tcid)
+
+
+@benchmark(f"test/nested-{NESTING_DEPTH}-fastreg")
+def bench_test_nested_fastreg(quick):
+    tcid = _capture("bench-nested-0", nested, 0)
+    with _artest_mode(ArtestMode.TEST, "bench-nested-0", tcid, enable_fastreg=True):
+        yield lambda: nested(0), _reset_counters(tcid)
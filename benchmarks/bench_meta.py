@@ -0,0 +1,49 @@
+"""Benchmarks of the metadata growth with the corpus size."""
+
+import dataclasses
+import json
+import os
+import shutil
+
+from artest.artest import _meta_handler
+from artest.types import Metadata, MetadataTestCase
+
+from ._harness import benchmark
+
+CORPUS_SIZES = (10, 1_000, 100_000)
+
+
+def _tc_meta(i: int) -> MetadataTestCase:
+    return MetadataTestCase(
+        version="0.0.0",
+        test_case_created_time="2000-01-01T00:00:00+00:00",
+        func_id=f"bench-meta-{i % 100}",
+        test_case_id=f"bench-{i}",
+        hash_hex=f"{i:064x}",
+        bytes_size=1024,
+    )
+
+
+def _make_bench_add_test_case_meta(n: int):
+    def bench_add_test_case_meta(quick):
+        _meta_handler.save_meta(
+            Metadata([dataclasses.asdict(_tc_meta(i)) for i in range(n)])
+        )
+        snapshot_path = f"{_meta_handler.meta_path}.snapshot"
+        shutil.copyfile(_meta_handler.meta_path, snapshot_path)
+        tc_meta = _tc_meta(n)
+
+        def reset():
+            shutil.copyfile(snapshot_path, _meta_handler.meta_path)
+
+        yield lambda: _meta_handler.add_test_case_meta(tc_meta), reset
+
+        with open(_meta_handler.meta_path) as f:
+            assert len(json.load(f)["test_cases"]) == n + 1
+        os.remove(snapshot_path)
+
+    return bench_add_test_case_meta
+
+
+for _size in CORPUS_SIZES:
+    benchmark(f"meta/add_test_case_meta-{_size}")(_make_bench_add_test_case_meta(_size))
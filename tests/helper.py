@@ -19,15 +19,27 @@ from contextlib import contextmanager
 from functools import wraps
 
 import artest
-from artest.artest import _meta_handler
+import artest.metrics
+from artest.artest import (
+    _coverage_handler,
+    _gc_state_handler,
+    _meta_handler,
+    _result_cache_handler,
+)
 from artest.config import (
     reset_all_test_case_quota,
     set_is_equal,
+    set_large_output_threshold,
     set_message_formatter,
     set_on_func_id_duplicate,
     set_printer,
+    set_profile_interval_on_case_mode,
+    set_record_memory_on_case_mode,
+    set_record_performance_on_case_mode,
+    set_storage_backend,
     set_stringify_obj,
     set_test_case_id_generator,
+    set_test_case_tags,
 )
 from artest.types import ArtestMode
 
@@ -220,7 +232,17 @@ def make_test_autoreg(
                     set_printer()
                     set_stringify_obj()
                     reset_all_test_case_quota()
+                    set_record_performance_on_case_mode()
+                    set_record_memory_on_case_mode()
+                    set_profile_interval_on_case_mode()
+                    set_test_case_tags()
+                    set_storage_backend()
+                    set_large_output_threshold()
                     _meta_handler.remove()
+                    _coverage_handler.remove()
+                    _result_cache_handler.remove()
+                    _gc_state_handler.remove()
+                    artest.metrics.get_metrics_registry().reset()
                     importlib.reload(artest.config)
                     importlib.reload(artest.artest)
 
@@ -0,0 +1,2 @@
+def greet(to):
+    return f"Hello {to}!"
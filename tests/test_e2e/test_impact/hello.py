@@ -0,0 +1,14 @@
+from artest import autoreg
+
+from .greet import greet
+from .hello_id import hello_id, world_id
+
+
+@autoreg(hello_id, on_duplicate="ignore")
+def hello(to):
+    return greet(to)
+
+
+@autoreg(world_id, on_duplicate="ignore")
+def world():
+    return "world"
@@ -0,0 +1,2 @@
+hello_id = "3d6f2a9c8b1e4f7a9c0d1e2f3a4b5c6d"
+world_id = "c4b3a2918f7e4d6c8b5a4f3e2d1c0b9a"
@@ -0,0 +1,63 @@
+import itertools
+import os
+
+import artest.artest
+from artest.config import set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+from .hello_id import hello_id, world_id
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+dirname = os.path.dirname(__file__)
+coverage_path = "./.artest/coverage.json"
+
+
+@make_test_autoreg(fcid_list=[hello_id, world_id])
+def test_changed_files_select_affected_test_cases():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+
+    from .hello import hello, world  # noqa: E402
+
+    hello("World")
+    world()
+    tcid_hello, tcid_world = next(gen2), next(gen2)
+    assert_test_case_files_exist(hello_id, tcid_hello)
+    assert_test_case_files_exist(world_id, tcid_world)
+
+    # without recorded coverage, every test case is affected
+    results = artest.artest.main(
+        ["--no-cache", "--changed-files", f"{dirname}/greet.py"]
+    )
+    assert {r.status for r in results} == {StatusTestResult.SUCCESS}
+
+    results = artest.artest.main(["--no-cache", "--record-coverage"])
+    assert {r.status for r in results} == {StatusTestResult.SUCCESS}
+    assert os.path.exists(coverage_path)
+
+    results = artest.artest.main(
+        ["--no-cache", "--changed-files", f"{dirname}/greet.py"]
+    )
+    statuses = {r.fcid: r.status for r in results}
+    assert statuses == {
+        hello_id: StatusTestResult.SUCCESS,
+        world_id: StatusTestResult.SKIP,
+    }
+
+    results = artest.artest.main(
+        ["--no-cache", "--changed-files", f"{dirname}/hello.py"]
+    )
+    assert {r.status for r in results} == {StatusTestResult.SUCCESS}
+
+    results = artest.artest.main(
+        ["--no-cache", "--changed-files", f"{dirname}/hello_id.py"]
+    )
+    assert {r.status for r in results} == {StatusTestResult.SKIP}
@@ -0,0 +1 @@
+hello_id = "e1d2c3b4a5964f87a6b5c4d3e2f1a0b9"
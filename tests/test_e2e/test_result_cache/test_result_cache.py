@@ -0,0 +1,97 @@
+import itertools
+import os
+import shutil
+
+import artest.artest
+from artest.config import set_function_root_path, set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+from .hello_id import hello_id
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+dirname = os.path.dirname(__file__)
+
+
+@make_test_autoreg(
+    fcid_list=[hello_id],
+    more_files_to_clean=[f"{dirname}/hello.py"],
+    remove_modules=["hello"],
+)
+def test_result_cache():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+
+    tcid = next(gen2)
+
+    shutil.copy(f"{dirname}/hello.py.before", f"{dirname}/hello.py")
+    from .hello import hello  # noqa: E402
+
+    hello("Hello", "World")
+    assert_test_case_files_exist(hello_id, tcid)
+
+    results = artest.artest.main([])
+    assert [r.status for r in results] == [StatusTestResult.SUCCESS]
+
+    # nothing changed, the cached result is used
+    results = artest.artest.main([])
+    assert [r.status for r in results] == [StatusTestResult.CACHED]
+
+    results = artest.artest.main(["--no-cache"])
+    assert [r.status for r in results] == [StatusTestResult.SUCCESS]
+
+    # the code of the function changed, the cache is invalidated
+    shutil.copy(f"{dirname}/hello.py.after", f"{dirname}/hello.py")
+    # each run is a new process in practice, forget the loaded function
+    artest.artest._func_id_repo.store.clear()
+    results = artest.artest.main([])
+    assert [r.status for r in results] == [StatusTestResult.FAIL]
+    results = artest.artest.main([])
+    assert [r.status for r in results] == [StatusTestResult.FAIL]
+
+
+@make_test_autoreg(
+    fcid_list=[hello_id],
+    more_files_to_clean=[f"{dirname}/hello.py"],
+    remove_modules=["hello"],
+)
+def test_result_cache_nothing_traced(tmp_path):
+    set_test_case_id_generator(gen())
+
+    shutil.copy(f"{dirname}/hello.py.before", f"{dirname}/hello.py")
+    from .hello import hello  # noqa: E402
+
+    hello("Hello", "World")
+    # load the function while it is under the function root path
+    artest.artest.main(["--no-cache"])
+
+    # the function is outside the function root path, so nothing is traced
+    set_function_root_path(str(tmp_path))
+    try:
+        results = artest.artest.main([])
+        assert [r.status for r in results] == [StatusTestResult.SUCCESS]
+        # a code change could not be detected, so the result is not cached
+        results = artest.artest.main([])
+        assert [r.status for r in results] == [StatusTestResult.SUCCESS]
+    finally:
+        artest.config._paths._function_root_path = None
+
+
+def test_traced_files_under_function_root_path(tmp_path):
+    set_function_root_path(str(tmp_path / "app"))
+    try:
+        tracer = artest.artest._ExecutionTracer()
+        assert tracer._get_traced_path(str(tmp_path / "app" / "hello.py")) == str(
+            tmp_path / "app" / "hello.py"
+        )
+        # a sibling directory sharing the prefix is outside the root
+        assert tracer._get_traced_path(str(tmp_path / "app2" / "hello.py")) is None
+    finally:
+        artest.config._paths._function_root_path = None
@@ -0,0 +1,113 @@
+import itertools
+import json
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import (
+    set_printer,
+    set_storage_backend,
+    set_test_case_id_generator,
+)
+from artest.storage import LocalStorage
+from tests.helper import (
+    assert_test_case_files_exist,
+    get_call_time,
+    make_test_autoreg,
+    set_call_time,
+)
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+hello_id = "b3e1f2a4c5d64e7f8091a2b3c4d5e6f7"
+stub_id = "c4f2a3b5d6e74f808192b3c4d5e6f7a8"
+
+
+@autoreg(hello_id)
+def hello(say, to):
+    set_call_time(hello_id, get_call_time(hello_id) + 1)
+    return f"{say} {to} {the_stub(len(to))}!"
+
+
+@autostub(stub_id)
+def the_stub(x):
+    set_call_time(stub_id, get_call_time(stub_id) + 1)
+    return x**2
+
+
+class CountingStorage(LocalStorage):
+    def __init__(self):
+        super().__init__()
+        self.stub_gets = 0
+
+    def get(self, fcid, tcid, artifact):
+        if artifact.startswith("stub/"):
+            self.stub_gets += 1
+        return super().get(fcid, tcid, artifact)
+
+
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_bench(tmp_path):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(2)]
+
+    hello("Hello", "World")
+    hello("Hi", "there")
+    for i in range(2):
+        assert_test_case_files_exist(hello_id, tcid[i])
+
+    set_call_time(hello_id, 0)
+    set_call_time(stub_id, 0)
+
+    saved = str(tmp_path / "bench.json")
+    bench_results = artest.artest.main(
+        ["bench", "--warmup", "2", "--repeat", "3", "--save", saved]
+    )
+
+    assert len(bench_results) == 1
+    r = bench_results[0]
+    assert r.fcid == hello_id
+    assert r.calls == 6
+    assert 0 < r.min <= r.median <= r.p95
+    assert r.calls_per_sec > 0
+
+    assert get_call_time(hello_id) == 10  # warmup and timed calls
+    assert get_call_time(stub_id) == 0  # stubbed by artest, should not be called
+
+    with open(saved) as f:
+        assert json.load(f) == [r._asdict()]
+
+    bench_results = artest.artest.main(
+        ["bench", "--repeat", "1", "--compare", saved, "--exclude-function", stub_id]
+    )
+    assert [r.calls for r in bench_results] == [2]
+
+    bench_results = artest.artest.main(["bench", "--exclude-function", hello_id])
+    assert bench_results == []
+
+
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_bench_reads_stubs_once():
+    storage = CountingStorage()
+    set_storage_backend(storage)
+    set_test_case_id_generator(gen())
+    hello("Hello", "World")
+    hello("Hi", "there")
+
+    stub_files = [key for key in storage.list() if key[2].startswith("stub/")]
+    storage.stub_gets = 0
+
+    messages = []
+    set_printer(messages.append)
+    bench_results = artest.artest.main(["bench", "--warmup", "2", "--repeat", "3"])
+
+    assert [r.calls for r in bench_results] == [6]
+    # read once before the timed calls
+    assert storage.stub_gets == len(stub_files)
+    assert "excluding storage reads" in messages[0]
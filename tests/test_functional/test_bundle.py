@@ -0,0 +1,138 @@
+import itertools
+import json
+import os
+import shutil
+import zipfile
+
+import pytest
+
+import artest.artest
+from artest import autoreg
+from artest.config import (
+    set_artest_root,
+    set_test_case_id_generator,
+    set_test_case_tags,
+)
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+double_id = "c5e7a9b1d3f54e6a8c0b2d4f6a8c0e21"
+
+
+@autoreg(double_id)
+def double(x):
+    return x * 2
+
+
+def capture_double_cases(n, tcid_gen):
+    gen1, gen2 = itertools.tee(tcid_gen, 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(n)]
+    for i in range(n):
+        double(i)
+    for i in range(n):
+        assert_test_case_files_exist(double_id, tcid[i])
+    return tcid
+
+
+@make_test_autoreg(fcid_list=[double_id])
+def test_export_import(tmp_path):
+    tcid_gen = gen()
+    set_test_case_tags(["host-a"])
+    tcid_a = capture_double_cases(2, tcid_gen)
+    set_test_case_tags(["host-b"])
+    tcid_b = capture_double_cases(1, tcid_gen)
+
+    bundle_path = str(tmp_path / "bundle.zip")
+    export_result = artest.artest.main(
+        ["export", bundle_path, "--tags", "host-a", "--compress"]
+    )
+    assert export_result.exported == [(double_id, t) for t in tcid_a]
+    with zipfile.ZipFile(bundle_path) as zf:
+        assert f"{double_id}/{tcid_a[0]}/inputs" in zf.namelist()
+        assert not any(
+            name.startswith(f"{double_id}/{tcid_b[0]}/") for name in zf.namelist()
+        )
+
+    export_result = artest.artest.main(
+        ["export", str(tmp_path / "empty.zip"), "--since", "2999-01-01"]
+    )
+    assert export_result.exported == []
+
+    set_artest_root(str(tmp_path / "ci"))
+    try:
+        import_result = artest.artest.main(["import", bundle_path])
+        assert import_result.imported == [(double_id, t) for t in tcid_a]
+
+        test_results = artest.artest.main([])
+        assert {tr.tcid for tr in test_results} == set(tcid_a)
+        assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+        assert {r.status for r in artest.artest.main(["verify"])} == {"OK"}
+
+        # already present
+        import_result = artest.artest.main(["import", bundle_path])
+        assert import_result.imported == []
+        assert import_result.skipped == [(double_id, t) for t in tcid_a]
+    finally:
+        artest.config._paths._artest_root = None
+
+
+@make_test_autoreg(fcid_list=[double_id])
+def test_import_conflict(tmp_path):
+    tcid = capture_double_cases(1, gen())
+
+    bundle_path = str(tmp_path / "bundle.zip")
+    artest.artest.main(["export", bundle_path])
+
+    # the same test case id is captured again with another input
+    shutil.rmtree(f"./.artest/{double_id}/{tcid[0]}")
+    artest.artest._meta_handler.remove()
+    set_test_case_id_generator(iter(tcid))
+    double(100)
+
+    import_result = artest.artest.main(["import", bundle_path])
+    assert import_result.conflicted == [(double_id, tcid[0])]
+
+    import_result = artest.artest.main(["import", bundle_path, "--overwrite"])
+    assert import_result.imported == [(double_id, tcid[0])]
+    assert len(artest.artest._meta_handler.read_meta().test_cases) == 1
+    assert {r.status for r in artest.artest.main(["verify"])} == {"OK"}
+
+
+@pytest.mark.parametrize(
+    "func_id, test_case_id",
+    [("../victim", "0"), ("..", "victim"), (double_id, "../../victim"), ("", "0")],
+)
+@make_test_autoreg(fcid_list=[double_id])
+def test_import_rejects_unsafe_ids(tmp_path, func_id, test_case_id):
+    capture_double_cases(1, gen())
+    bundle_path = str(tmp_path / "bundle.zip")
+    artest.artest.main(["export", bundle_path])
+
+    # a bundle whose metadata points outside the artest root
+    with zipfile.ZipFile(bundle_path) as zf:
+        files = {name: zf.read(name) for name in zf.namelist()}
+    meta = json.loads(files["meta.json"])
+    meta["test_cases"][0]["func_id"] = func_id
+    meta["test_cases"][0]["test_case_id"] = test_case_id
+    files["meta.json"] = json.dumps(meta).encode()
+    unsafe_path = str(tmp_path / "unsafe.zip")
+    with zipfile.ZipFile(unsafe_path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+
+    os.makedirs("./victim", exist_ok=True)
+    try:
+        with pytest.raises(ValueError, match="Unsafe test case"):
+            artest.artest.main(["import", unsafe_path, "--overwrite"])
+        assert os.path.isdir("./victim")
+    finally:
+        shutil.rmtree("./victim")
@@ -0,0 +1,86 @@
+import itertools
+import os
+
+import pytest
+
+import artest.artest
+from artest import autoreg
+from artest.config import set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+add_id = "5f0c8e6a2b7d4c19a3e4b5c6d7e8f901"
+hang_id = "9a8b7c6d5e4f4a3b8c2d1e0f9a8b7c6d"
+
+# the module is reloaded when artest looks up the functions,
+# so the behavior is switched with environment variables
+offset_env = "ARTEST_TEST_FAIL_FAST_OFFSET"
+hang_env = "ARTEST_TEST_FAIL_FAST_HANG"
+
+
+@autoreg(add_id)
+def add(x):
+    return x + 1 + int(os.environ.get(offset_env, "0"))
+
+
+@autoreg(hang_id)
+def maybe_hang(x):
+    while os.environ.get(hang_env):
+        pass
+    return x
+
+
+def capture_add_cases(n):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(n)]
+    for i in range(n):
+        add(i)
+    for i in range(n):
+        assert_test_case_files_exist(add_id, tcid[i])
+
+
+@pytest.mark.parametrize(
+    "args,expected_count",
+    [
+        ([], 4),
+        (["--fail-fast"], 1),
+        (["--max-failures", "2"], 2),
+        (["--max-failures", "2", "--fail-fast"], 1),
+    ],
+)
+@make_test_autoreg(fcid_list=[add_id])
+def test_stop_on_failures(args, expected_count):
+    capture_add_cases(4)
+
+    with environ(offset_env, "1"):
+        test_results = artest.artest.main(args)
+
+    assert len(test_results) == expected_count
+    assert {tr.status for tr in test_results} == {StatusTestResult.FAIL}
+
+
+@make_test_autoreg(fcid_list=[hang_id])
+def test_timeout():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    assert maybe_hang(1) == 1
+    assert_test_case_files_exist(hang_id, tcid)
+
+    with environ(hang_env, "1"):
+        test_results = artest.artest.main(["--timeout", "0.2"])
+
+    assert len(test_results) == 1
+    assert test_results[0].status == StatusTestResult.ERROR
+    assert test_results[0].message.startswith("TIMEOUT")
+    assert artest.artest._test_stack == []
@@ -0,0 +1,125 @@
+import itertools
+import os
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import set_test_case_id_generator
+from artest.types import FunctionOutput, FunctionOutputType, StatusTestResult
+from tests.helper import make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+outer_id = "3b5d7f9a1c2e4b6d8f0a2c4e6b8d0f35"
+inner_id = "7e9a1c3e5b2d4f6a8c0e2b4d6f8a0c46"
+lookup_id = "1d3f5a7c9e2b4d6f8a0c2e4b6d8f0a57"
+wrap_id = "9a1c3e5b7d2f4a6c8e0b2d4f6a8c0e68"
+extend_id = "5c7e9a1b3d2f4c6e8a0b2d4f6a8c0e79"
+
+
+@autostub(lookup_id)
+def lookup(x):
+    return x * 10
+
+
+@autoreg(inner_id)
+def inner(x):
+    return lookup(x) + 1
+
+
+@autoreg(outer_id)
+def outer(n):
+    return [inner(i) for i in range(n)] + [lookup(n)]
+
+
+@autoreg(wrap_id)
+def wrap(n):
+    return [n]
+
+
+@autoreg(extend_id)
+def extend(n):
+    values = wrap(n)
+    values.append(99)
+    return values
+
+
+def capture():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+    outer(2)
+    return tcid
+
+
+def replay_outer():
+    test_results = artest.artest.main(["--enable-fastreg", "--no-cache"])
+    return {tr.status for tr in test_results if tr.fcid == outer_id}
+
+
+@make_test_autoreg(fcid_list=[outer_id, inner_id, lookup_id])
+def test_fastreg_index():
+    tcid = capture()
+
+    fastreg_root = os.path.join(artest.artest._paths.root(outer_id, tcid), "fastreg")
+    assert os.listdir(fastreg_root) == ["index"]
+    index = artest.artest._serializer.read(
+        artest.artest._paths.fastreg_index(outer_id, tcid)
+    )
+    assert sorted(call_count for _, call_count, _ in index) == [0, 1]
+    assert {delta[lookup_id] for _, delta in index.values()} == {1}
+
+    assert replay_outer() == {StatusTestResult.SUCCESS}
+
+    # the nested calls are served by the index
+    key = next(key for key in index if key[1] == 0)
+    index[key] = (
+        artest.artest._serializer.dumps(FunctionOutput(FunctionOutputType.RETURN, -1)),
+        index[key][1],
+    )
+    artest.artest._serializer.save(
+        index, artest.artest._paths.fastreg_index(outer_id, tcid)
+    )
+    assert replay_outer() == {StatusTestResult.FAIL}
+
+
+@make_test_autoreg(fcid_list=[outer_id, inner_id, lookup_id])
+def test_fastreg_per_file_layout():
+    tcid = capture()
+
+    # rewrite the index in the layout of older test cases
+    index_path = artest.artest._paths.fastreg_index(outer_id, tcid)
+    index = artest.artest._serializer.read(index_path)
+    os.remove(index_path)
+    for (reg_fcid, call_count, input_hash), (output_data, delta) in index.items():
+        output = artest.artest._serializer.loads(output_data)
+        if call_count == 0:
+            output = FunctionOutput(FunctionOutputType.RETURN, -1)
+        path_args = (outer_id, tcid, reg_fcid, call_count, input_hash)
+        artest.artest._serializer.save(output, artest.artest._paths.fastreg(*path_args))
+        artest.artest._serializer.save(
+            delta, artest.artest._paths.fastreg_stub_counter(*path_args)
+        )
+
+    assert replay_outer() == {StatusTestResult.FAIL}
+
+
+@make_test_autoreg(fcid_list=[wrap_id, extend_id])
+def test_fastreg_output_mutated_by_caller():
+    set_test_case_id_generator(gen())
+    assert extend(1) == [1, 99]
+
+    # the nested output is recorded as returned, not as mutated by the caller
+    index = artest.artest._serializer.read(
+        artest.artest._paths.fastreg_index(extend_id, "0")
+    )
+    [(output_data, _)] = index.values()
+    assert artest.artest._serializer.loads(output_data).output == [1]
+
+    test_results = artest.artest.main(["--enable-fastreg"])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
@@ -0,0 +1,150 @@
+import itertools
+import os
+import shutil
+import time
+
+import pytest
+
+import artest.artest
+from artest import autoreg, search_meta
+from artest.config import reset_all_test_case_quota, set_test_case_id_generator
+from artest.types import ConfigTestCaseQuota, StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+square_id = "4e6a1c2b8d9f4a3e9b7c5d1f2a3b4c5d"
+
+# the module is reloaded when gc looks up the quota of the function,
+# so the quota is switched with an environment variable
+quota_env = "ARTEST_TEST_GC_MAX_COUNT"
+square_quota = (
+    ConfigTestCaseQuota(max_count=int(os.environ[quota_env]))
+    if os.environ.get(quota_env)
+    else None
+)
+
+
+@autoreg(square_id, quota=square_quota)
+def square(x):
+    return x * x
+
+
+def capture_square_cases(n):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(n)]
+    for i in range(n):
+        square(i)
+    for i in range(n):
+        assert_test_case_files_exist(square_id, tcid[i])
+    return tcid
+
+
+def make_old(path):
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+
+
+@make_test_autoreg(fcid_list=[square_id])
+def test_gc_removes_garbage():
+    tcid = capture_square_cases(3)
+    fcid_root = f"./.artest/{square_id}"
+
+    # killed while writing the outputs, so the metadata is never added
+    os.makedirs(f"{fcid_root}/killed")
+    shutil.copy(f"{fcid_root}/0/inputs", f"{fcid_root}/killed/inputs")
+    make_old(f"{fcid_root}/killed")
+    # being captured
+    os.makedirs(f"{fcid_root}/capturing")
+    # removed without its metadata
+    shutil.rmtree(f"{fcid_root}/{tcid[2]}")
+    # left behind in a test case
+    with open(f"{fcid_root}/{tcid[1]}/outputs.tmp", "wb") as f:
+        f.write(b"garbage")
+
+    gc_result = artest.artest.main(["gc", "--dry-run"])
+
+    assert gc_result.removed_incomplete == [(square_id, "killed")]
+    assert gc_result.dropped_meta == [(square_id, tcid[2])]
+    assert os.path.isdir(f"{fcid_root}/killed")
+    assert search_meta(square_id, tcid[2], on_missing="none") is not None
+
+    gc_result = artest.artest.main(["gc"])
+
+    assert gc_result.removed_incomplete == [(square_id, "killed")]
+    assert gc_result.removed_by_quota == []
+    assert gc_result.dropped_meta == [(square_id, tcid[2])]
+    assert gc_result.removed_files == [
+        os.path.join(artest.artest._paths.root(square_id, tcid[1]), "outputs.tmp")
+    ]
+    assert sorted(os.listdir(fcid_root)) == ["0", "1", "capturing"]
+    assert search_meta(square_id, tcid[2], on_missing="none") is None
+
+    # nothing is left for the next run
+    gc_result = artest.artest.main(["gc", "--full"])
+    assert gc_result == ([], [], [], [])
+
+    os.rmdir(f"{fcid_root}/capturing")
+    test_results = artest.artest.main([])
+    assert {tr.tcid for tr in test_results} == set(tcid[:2])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+
+@make_test_autoreg(fcid_list=[square_id])
+def test_gc_enforces_quota():
+    tcid = capture_square_cases(4)
+
+    gc_result = artest.artest.main(["gc", "--max-count", "3"])
+    assert gc_result.removed_by_quota == [(square_id, tcid[0])]
+
+    # as in a fresh process, where only the code of the function registers its quota
+    reset_all_test_case_quota()
+    artest.artest._func_id_repo.store.clear()
+    with environ(quota_env, "2"):
+        gc_result = artest.artest.main(["gc"])
+    assert gc_result.removed_by_quota == [(square_id, tcid[1])]
+
+    for i in range(2):
+        assert_test_case_files_exist(square_id, tcid[i], assert_not_exist=True)
+        assert search_meta(square_id, tcid[i], on_missing="none") is None
+
+    test_results = artest.artest.main([])
+    assert {tr.tcid for tr in test_results} == set(tcid[2:])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+
+@make_test_autoreg(fcid_list=[square_id])
+def test_gc_rescans_changed_function():
+    tcid = capture_square_cases(2)
+    artest.artest.main(["gc"])
+
+    # the first run has checked the existing test cases
+    state = artest.artest._gc_state_handler.load()
+    assert state[square_id]["complete"] == tcid
+
+    os.makedirs(f"./.artest/{square_id}/killed")
+    make_old(f"./.artest/{square_id}/killed")
+
+    gc_result = artest.artest.main(["gc"])
+    assert gc_result.removed_incomplete == [(square_id, "killed")]
+
+
+@make_test_autoreg(fcid_list=[square_id])
+def test_gc_requires_max_count_of_unknown_function():
+    capture_square_cases(1)
+    unknown_id = "0" * 32
+    os.makedirs(f"./.artest/{unknown_id}/0")
+    try:
+        with pytest.raises(ValueError, match="--max-count"):
+            artest.artest.main(["gc"])
+        gc_result = artest.artest.main(["gc", "--exclude-function", unknown_id])
+        assert gc_result.removed_by_quota == []
+    finally:
+        shutil.rmtree(f"./.artest/{unknown_id}")
@@ -0,0 +1,172 @@
+import dataclasses
+import struct
+from collections import OrderedDict
+
+import pytest
+
+from artest.config import get_is_equal, get_pickler, set_pickler
+
+
+@dataclasses.dataclass
+class Point:
+    x: float
+    y: list
+
+
+@dataclasses.dataclass
+class Stamped:
+    value: float
+    stamp: float = dataclasses.field(compare=False)
+
+
+@dataclasses.dataclass
+class Keyed:
+    key: str
+    cache: list
+
+    def __eq__(self, other):
+        return isinstance(other, Keyed) and self.key == other.key
+
+
+class NoEq:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeArray(bytearray):
+    """An array-like exposing shape, dtype and the buffer protocol."""
+
+    def __init__(self, data, dtype="uint8"):
+        super().__init__(data)
+        self.shape = (len(data),)
+        self.dtype = dtype
+
+    def __eq__(self, other):
+        raise ValueError("The truth value of an array is ambiguous.")
+
+    __hash__ = None
+
+
+class FakeDtype:
+    def __init__(self, name, kind, hasobject=False):
+        self.name = name
+        self.kind = kind
+        self.hasobject = hasobject
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDtype) and self.name == other.name
+
+
+class FakeObjectArray(FakeArray):
+    """An array-like of objects, whose buffer holds the addresses of the objects."""
+
+    def __init__(self, values):
+        super().__init__(
+            b"".join(struct.pack("<Q", id(v)) for v in values),
+            dtype=FakeDtype("object", "O", hasobject=True),
+        )
+        self.shape = (len(values),)
+        self._values = values
+
+    def tolist(self):
+        return list(self._values)
+
+
+class FakeFloatArray(FakeArray):
+    def __init__(self, values):
+        super().__init__(
+            struct.pack(f"<{len(values)}d", *values), dtype=FakeDtype("float64", "f")
+        )
+        self.shape = (len(values),)
+        self._values = values
+
+    def tolist(self):
+        return list(self._values)
+
+
+nan = float("nan")
+
+
+@pytest.mark.parametrize(
+    "actual,expected,eq",
+    [
+        (1, 1, True),
+        (1, 1.0, True),
+        (1, 2, False),
+        ("a", "a", True),
+        ("a", "b", False),
+        (b"ab", b"ab", True),
+        (b"ab", b"ac", False),
+        (nan, nan, True),
+        (0.1, 0.1, True),
+        (0.1, 0.2, False),
+        ([1, [nan, 2]], [1, [nan, 2]], True),
+        ([1, 2], [1, 2, 3], False),
+        ([1, 2], (1, 2), False),
+        ((1, {"a": nan}), (1, {"a": nan}), True),
+        ({"a": 1, "b": 2}, {"b": 2, "a": 1}, True),
+        ({"a": 1}, {"b": 1}, False),
+        ({"a": 1}, {"a": 2}, False),
+        (OrderedDict(a=1, b=2), OrderedDict(b=2, a=1), False),
+        ({1, 2}, {2, 1}, True),
+        ({1, 2}, {1, 3}, False),
+        (Point(nan, [1]), Point(nan, [1]), True),
+        (Point(1.0, [1]), Point(1.0, [2]), False),
+        (Stamped(nan, 1.0), Stamped(nan, 2.0), True),
+        (Stamped(1.0, 1.0), Stamped(2.0, 1.0), False),
+        (Keyed("a", [1]), Keyed("a", [2]), True),
+        (Keyed("a", [1]), Keyed("b", [1]), False),
+        (NoEq(1), NoEq(1), True),
+        (NoEq(1), NoEq(2), False),
+        ({"k": NoEq([1, 2])}, {"k": NoEq([1, 2])}, True),
+        (FakeArray(b"abc"), FakeArray(b"abc"), True),
+        (FakeArray(b"abc"), FakeArray(b"abd"), False),
+        (FakeArray(b"abc"), FakeArray(b"abc", dtype="int8"), False),
+        (FakeObjectArray([[1], "a"]), FakeObjectArray([[1], "a"]), True),
+        (FakeObjectArray([[1], "a"]), FakeObjectArray([[2], "a"]), False),
+        (FakeFloatArray([0.0, nan]), FakeFloatArray([-0.0, nan]), True),
+        (FakeFloatArray([0.0, 1.0]), FakeFloatArray([0.0, 2.0]), False),
+        (ValueError("x"), ValueError("x"), True),
+        (ValueError("x"), TypeError("x"), False),
+    ],
+)
+def test_default_is_equal(actual, expected, eq):
+    assert get_is_equal()(actual, expected) is eq
+
+
+class CountingPickler:
+    def __init__(self, pickler):
+        self.pickler = pickler
+        self.n_dumps = 0
+
+    def dumps(self, obj, *args, **kwargs):
+        self.n_dumps += 1
+        return self.pickler.dumps(obj, *args, **kwargs)
+
+
+def test_structural_comparison_does_not_pickle():
+    pickler = get_pickler()
+    counting_pickler = CountingPickler(pickler)
+    set_pickler(counting_pickler)
+    try:
+        actual = {"a": [1.0, nan, b"x" * 100], "b": Point(1.0, [FakeArray(b"abc")])}
+        expected = {"a": [1.0, nan, b"x" * 100], "b": Point(1.0, [FakeArray(b"abc")])}
+        assert get_is_equal()(actual, expected)
+        assert not get_is_equal()(actual, {**expected, "a": [2.0]})
+        assert counting_pickler.n_dumps == 0
+    finally:
+        set_pickler(pickler)
+
+
+def test_numpy_arrays_are_compared_by_value():
+    np = pytest.importorskip("numpy")
+
+    assert get_is_equal()(
+        np.array([[1], "a", None], dtype=object),
+        np.array([[1], "a", None], dtype=object),
+    )
+    assert not get_is_equal()(
+        np.array([[1], "a"], dtype=object), np.array([[2], "a"], dtype=object)
+    )
+    assert get_is_equal()(np.array([0.0, np.nan]), np.array([-0.0, np.nan]))
+    assert not get_is_equal()(np.array([0.0, 1.0]), np.array([0.0, 2.0]))
@@ -0,0 +1,107 @@
+import itertools
+import os
+
+import artest.artest
+from artest import autoreg
+from artest.config import set_large_output_threshold, set_test_case_id_generator
+from artest.types import (
+    FunctionOutput,
+    FunctionOutputType,
+    StatusTestResult,
+    StatusVerifyResult,
+)
+from tests.helper import make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+repeat_id = "0a3c5e7b9d1f4a6c8e2b4d6f8a0c2e94"
+
+
+@autoreg(repeat_id)
+def repeat(kind, n):
+    if kind == "bytes":
+        return b"ab" * n
+    if kind == "list":
+        return [{"i": i} for i in range(n)]
+    return {"data": bytearray(b"ab" * n), "n": n}
+
+
+def capture_repeat_cases(kinds, n):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(len(kinds))]
+    for kind in kinds:
+        repeat(kind, n)
+    return tcid
+
+
+def outputs_path(tcid):
+    return f"./.artest/{repeat_id}/{tcid}/outputs"
+
+
+@make_test_autoreg(fcid_list=[repeat_id])
+def test_large_outputs():
+    set_large_output_threshold(1)
+    kinds = ["bytes", "list", "object"]
+    tcid = capture_repeat_cases(kinds, 1000)
+
+    for t in tcid:
+        with open(outputs_path(t), "rb") as f:
+            assert f.read().startswith(artest.artest._LargeOutputsWriter.MAGIC)
+        # compared lazily, without the digest
+        os.remove(f"{outputs_path(t)}.digest")
+    expected = artest.artest._serializer.read(outputs_path(tcid[1]))
+    assert expected.output == [{"i": i} for i in range(1000)]
+
+    test_results = artest.artest.main(["--no-cache"])
+    assert {tr.tcid for tr in test_results} == set(tcid)
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+    # the saved outputs differ from the actual ones
+    for t, output in zip(tcid, [b"ab" * 999 + b"ac", [{"i": 0}] * 1000, {"n": 0}]):
+        artest.artest._serializer.save_outputs(
+            FunctionOutput(FunctionOutputType.RETURN, output),
+            outputs_path(t),
+            f"{outputs_path(t)}.digest",
+        )
+    test_results = artest.artest.main(["--no-cache"])
+    assert {tr.status for tr in test_results} == {StatusTestResult.FAIL}
+
+    artest.artest.main(["--refresh"])
+    test_results = artest.artest.main(["--no-cache"])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+
+@make_test_autoreg(fcid_list=[repeat_id])
+def test_small_outputs_keep_layout():
+    set_large_output_threshold(1 << 20)
+    tcid = capture_repeat_cases(["bytes"], 10)
+
+    with open(outputs_path(tcid[0]), "rb") as f:
+        assert not f.read().startswith(artest.artest._LargeOutputsWriter.MAGIC)
+    test_results = artest.artest.main([])
+    assert [tr.status for tr in test_results] == [StatusTestResult.SUCCESS]
+
+
+@make_test_autoreg(fcid_list=[repeat_id])
+def test_verify_large_outputs():
+    set_large_output_threshold(1)
+    tcid = capture_repeat_cases(["bytes", "list", "object"], 1000)
+
+    verify_results = artest.artest.main(["verify"])
+    assert [r.status for r in verify_results] == [StatusVerifyResult.OK] * 3
+
+    with open(outputs_path(tcid[1]), "r+b") as f:
+        f.truncate(200)
+    verify_results = artest.artest.main(["verify"])
+    assert [r.status for r in verify_results] == [
+        StatusVerifyResult.OK,
+        StatusVerifyResult.CORRUPTED,
+        StatusVerifyResult.OK,
+    ]
@@ -0,0 +1,72 @@
+import itertools
+import os
+
+import pytest
+
+import artest.artest
+from artest import autoreg, search_meta
+from artest.config import set_record_memory_on_case_mode, set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+func_id = "3c9a7e51d2b84f06a1e8c4d7b2f5a960"
+
+# the module is reloaded when artest looks up the functions,
+# so the behavior is switched with environment variables
+size_env = "ARTEST_TEST_MEMORY_SIZE"
+
+
+@autoreg(func_id)
+def allocate(x):
+    buffer = bytearray(int(os.environ.get(size_env, "1000000")))
+    return x + len(buffer) * 0
+
+
+def capture_case():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    set_record_memory_on_case_mode(True)
+    allocate(3)
+    assert_test_case_files_exist(func_id, tcid)
+    return tcid
+
+
+@pytest.mark.parametrize(
+    "size,expected_status",
+    [("1000000", StatusTestResult.SUCCESS), ("4000000", StatusTestResult.FAIL)],
+)
+@make_test_autoreg(fcid_list=[func_id])
+def test_memory(size, expected_status):
+    tcid = capture_case()
+    assert search_meta(func_id, tcid).peak_memory >= 1000000
+
+    with environ(size_env, size):
+        test_results = artest.artest.main(["--memory", "--memory-ratio", "2"])
+    assert len(test_results) == 1
+    assert test_results[0].status == expected_status
+    assert test_results[0].peak_memory >= int(size)
+    if expected_status == StatusTestResult.FAIL:
+        assert test_results[0].message.startswith("Memory regression: peak")
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_memory_bless():
+    tcid = capture_case()
+
+    with environ(size_env, "4000000"):
+        test_results = artest.artest.main(["--memory-bless"])
+        assert [tr.status for tr in test_results] == [StatusTestResult.SUCCESS]
+        assert search_meta(func_id, tcid).peak_memory >= 4000000
+
+        test_results = artest.artest.main(["--memory", "--memory-ratio", "2"])
+    assert [tr.status for tr in test_results] == [StatusTestResult.SUCCESS]
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from artest import autoreg, autostub
+from artest.config import set_test_case_id_generator, set_test_case_quota
+from artest.metrics import (
+    MetricsRegistry,
+    get_metrics_registry,
+    start_prometheus_dump,
+    stop_prometheus_dump,
+)
+from tests.helper import make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+hello_id = "a8d6e7f9b0c14d2e9f3a4b5c6d7e8f90"
+stub_id = "b9e7f8a0c1d24e3f8a4b5c6d7e8f9a01"
+lambda_id = "c0f8a9b1d2e34f4a9b5c6d7e8f9a0b12"
+apply_id = "d1a9b0c2e3f45a5b0c6d7e8f9a0b1c23"
+
+
+@autoreg(hello_id)
+def hello(say, to):
+    return f"{say} {to} {the_stub(len(to))}!"
+
+
+@autostub(stub_id)
+def the_stub(x):
+    return x**2
+
+
+@autoreg(lambda_id)
+def returns_lambda(n):
+    return lambda x: x + n
+
+
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_capture_metrics(tmp_path):
+    set_test_case_id_generator(gen())
+    set_test_case_quota(hello_id, max_count=2)
+
+    for _ in range(3):
+        hello("Hello", "World")
+
+    registry = get_metrics_registry()
+    assert registry.get_counter("captured", hello_id) == 2
+    assert registry.get_counter("skipped_by_quota", hello_id) == 1
+    assert registry.get_counter("bytes_written", hello_id) > 0
+    assert registry.get_counter("pickle_failures", hello_id) == 0
+    # stub outputs are written under the caller
+    assert registry.get_counter("bytes_written", stub_id) == 0
+
+    write_seconds = registry.get_histogram("write_seconds", hello_id)
+    pickle_seconds = registry.get_histogram("pickle_seconds", hello_id)
+    assert write_seconds.count >= 8  # inputs, func, outputs, digest, stub of 2 cases
+    assert pickle_seconds.count >= 6
+    assert sum(write_seconds.bucket_counts) == write_seconds.count
+
+    text = registry.to_prometheus()
+    assert "# TYPE artest_captured_total counter" in text
+    assert f'artest_captured_total{{fcid="{hello_id}"}} 2' in text
+    assert f'artest_write_seconds_bucket{{fcid="{hello_id}",le="+Inf"}}' in text
+
+    path = tmp_path / "artest.prom"
+    start_prometheus_dump(str(path), interval=0.01)
+    try:
+        deadline = time.time() + 5
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop_prometheus_dump()
+    assert path.read_text() == text
+
+
+@autoreg(apply_id)
+def apply_lambda(n):
+    return returns_lambda(n)(1)
+
+
+@make_test_autoreg(fcid_list=[lambda_id])
+def test_pickle_failure_metrics():
+    import pickle
+
+    from artest.config import set_pickler
+
+    set_test_case_id_generator(gen())
+    set_pickler(pickle)
+
+    with pytest.warns(UserWarning, match="Can't pickle"):
+        returns_lambda(1)
+
+    assert get_metrics_registry().get_counter("pickle_failures", lambda_id) >= 1
+
+
+@make_test_autoreg(fcid_list=[lambda_id, apply_id])
+def test_fastreg_pickle_failure_metrics():
+    import pickle
+
+    from artest.config import set_pickler
+
+    set_test_case_id_generator(gen())
+    set_pickler(pickle)
+
+    with pytest.warns(UserWarning, match="Can't pickle"):
+        assert apply_lambda(1) == 2
+
+    # the output of the nested call is not recorded for fastreg of the caller
+    assert get_metrics_registry().get_counter("pickle_failures", apply_id) == 1
+
+
+def test_prometheus_label_escaped():
+    registry = MetricsRegistry()
+    fcid = 'a"b\\c\nd'
+    registry.inc("captured", fcid)
+    registry.observe("write_seconds", fcid, 0.1)
+
+    text = registry.to_prometheus()
+    label = 'fcid="a\\"b\\\\c\\nd"'
+    assert f"artest_captured_total{{{label}}} 1" in text
+    assert f'artest_write_seconds_bucket{{{label},le="+Inf"}} 1' in text
+    assert f"artest_write_seconds_count{{{label}}} 1" in text
+    # one sample per line
+    assert all(line.startswith(("#", "artest_")) for line in text.splitlines())
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import artest.artest
+from artest import autoreg, search_meta
+from artest.config import set_test_case_id_generator
+from tests.helper import make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+classify_id = "e2b0c1d3f4a54b6c9d7e8f9a0b1c2d34"
+flag_id = "f3c1d2e4a5b64c7d8e9f0a1b2c3d4e56"
+
+
+@autoreg(classify_id)
+def classify(x):
+    if x < 0:
+        return "negative"
+    elif x == 0:
+        return "zero"
+    return "positive"
+
+
+@autoreg(flag_id)
+def flag(x):
+    y = 0
+    if x:
+        y = 1
+    return y
+
+
+def list_tcids(fcid):
+    return sorted(os.listdir(f"./.artest/{fcid}"))
+
+
+def capture():
+    set_test_case_id_generator(gen())
+    for x in [1, 2, 3, -1, -5, 0]:
+        classify(x)
+    # the same lines, but a different branch
+    flag(1)
+    flag(0)
+
+
+@make_test_autoreg(fcid_list=[classify_id, flag_id])
+def test_minimize_dry_run():
+    capture()
+    coverage_path = artest.artest._coverage_handler.coverage_path
+    assert not os.path.exists(coverage_path)
+
+    results = {r.fcid: r for r in artest.artest.main(["minimize"])}
+
+    assert results[classify_id].kept == ["0", "3", "5"]
+    assert results[classify_id].removed == ["1", "2", "4"]
+    assert results[flag_id].kept == ["6", "7"]
+    assert results[flag_id].removed == []
+    assert len(list_tcids(classify_id)) == 6
+    # a dry run leaves the coverage of the test cases untouched
+    assert not os.path.exists(coverage_path)
+
+
+@pytest.mark.parametrize("action", ["delete", "archive"])
+@make_test_autoreg(fcid_list=[classify_id, flag_id])
+def test_minimize(action, tmp_path):
+    capture()
+
+    archive = str(tmp_path / "archive")
+    args = ["--delete"] if action == "delete" else ["--archive", archive]
+    artest.artest.main(["minimize", "--include-function", classify_id, *args])
+
+    assert list_tcids(classify_id) == ["0", "3", "5"]
+    assert list_tcids(flag_id) == ["6", "7"]
+    assert search_meta(classify_id, "1", on_missing="none") is None
+    assert search_meta(classify_id, "0", on_missing="none") is not None
+    if action == "archive":
+        assert sorted(os.listdir(os.path.join(archive, classify_id))) == [
+            "1",
+            "2",
+            "4",
+        ]
+
+    test_results = artest.artest.main([])
+    assert len(test_results) == 5
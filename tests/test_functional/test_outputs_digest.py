@@ -0,0 +1,60 @@
+import itertools
+import os
+
+import artest.artest
+from artest import autoreg
+from artest.config import set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+func_id = "6a5b4c3d2e1f40a9b8c7d6e5f4a3b2c1"
+
+# the module is reloaded when artest looks up the functions,
+# so the behavior is switched with environment variables
+suffix_env = "ARTEST_TEST_OUTPUTS_DIGEST_SUFFIX"
+
+
+@autoreg(func_id)
+def make_payload(n):
+    return {"values": list(range(n)), "suffix": os.environ.get(suffix_env, "")}
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_outputs_digest():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    make_payload(100)
+    assert_test_case_files_exist(func_id, tcid)
+    f_outputs = f"./.artest/{func_id}/{tcid}/outputs"
+    f_outputs_digest = f"./.artest/{func_id}/{tcid}/outputs.digest"
+    assert os.path.exists(f_outputs_digest)
+
+    with open(f_outputs, "rb") as f:
+        outputs_bytes = f.read()
+    # corrupt the expected outputs,
+    # matching digests must not load them
+    with open(f_outputs, "wb") as f:
+        f.write(b"corrupted")
+    results = artest.artest.main(["--no-cache"])
+    assert [r.status for r in results] == [StatusTestResult.SUCCESS]
+
+    with open(f_outputs, "wb") as f:
+        f.write(outputs_bytes)
+    with environ(suffix_env, "changed"):
+        results = artest.artest.main(["--no-cache"])
+    assert [r.status for r in results] == [StatusTestResult.FAIL]
+
+    # test cases without digest are compared as usual
+    os.remove(f_outputs_digest)
+    results = artest.artest.main(["--no-cache"])
+    assert [r.status for r in results] == [StatusTestResult.SUCCESS]
@@ -0,0 +1,76 @@
+import itertools
+import os
+import time
+
+import pytest
+
+import artest.artest
+from artest import autoreg, search_meta
+from artest.config import (
+    set_record_performance_on_case_mode,
+    set_test_case_id_generator,
+)
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+func_id = "f0e1d2c3b4a5469788796a5b4c3d2e1f"
+
+# the module is reloaded when artest looks up the functions,
+# so the behavior is switched with environment variables
+sleep_env = "ARTEST_TEST_PERF_SLEEP"
+
+
+@autoreg(func_id)
+def slow_square(x):
+    time.sleep(float(os.environ.get(sleep_env, "0.01")))
+    return x**2
+
+
+@pytest.mark.parametrize(
+    "sleep,expected_status",
+    [("0.01", StatusTestResult.SUCCESS), ("0.1", StatusTestResult.FAIL)],
+)
+@make_test_autoreg(fcid_list=[func_id])
+def test_perf(sleep, expected_status):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    set_record_performance_on_case_mode(True)
+    slow_square(3)
+    assert_test_case_files_exist(func_id, tcid)
+
+    tc_meta = search_meta(func_id, tcid)
+    assert tc_meta.wall_time >= 0.01
+    assert tc_meta.cpu_time is not None
+
+    with environ(sleep_env, sleep):
+        test_results = artest.artest.main(
+            ["--perf", "--perf-repeat", "2", "--perf-ratio", "3"]
+        )
+    assert len(test_results) == 1
+    assert test_results[0].status == expected_status
+    if expected_status == StatusTestResult.FAIL:
+        assert test_results[0].message.startswith("Performance regression: wall time")
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_perf_without_baseline():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    slow_square(3)
+    assert search_meta(func_id, tcid).wall_time is None
+
+    with environ(sleep_env, "0.1"):
+        test_results = artest.artest.main(["--perf"])
+    assert [tr.status for tr in test_results] == [StatusTestResult.SUCCESS]
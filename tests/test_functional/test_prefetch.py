@@ -0,0 +1,136 @@
+import itertools
+
+import pytest
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import set_storage_backend, set_test_case_id_generator
+from artest.storage import LocalStorage
+from artest.types import StatusTestResult
+from tests.helper import (
+    assert_test_case_files_exist,
+    get_call_time,
+    make_test_autoreg,
+    set_call_time,
+)
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+hello_id = "0b1f4f0e5d6c4a67a3e5f1f3c2d7e8a9"
+stub_id = "7c3e1b2a9d8f4e6b8a1c2d3e4f5a6b7c"
+
+
+@autoreg(hello_id)
+def hello(say, to):
+    set_call_time(hello_id, get_call_time(hello_id) + 1)
+    y = the_stub(len(to))
+    return f"{say} {to} {y}!"
+
+
+@autostub(stub_id)
+def the_stub(x):
+    set_call_time(stub_id, get_call_time(stub_id) + 1)
+    return x**2
+
+
+@pytest.mark.parametrize(
+    "prefetch_args",
+    [
+        ["--prefetch-depth", "2"],
+        ["--prefetch-depth", "1", "--prefetch-max-bytes", "1"],
+    ],
+)
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_prefetch(prefetch_args):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+
+    tcid = [next(gen2) for _ in range(4)]
+
+    for i in range(4):
+        hello("Hello", "World" * (i + 1))
+    for i in range(4):
+        assert_test_case_files_exist(hello_id, tcid[i])
+
+    set_call_time(hello_id, 0)
+    set_call_time(stub_id, 0)
+
+    test_results = artest.artest.main(prefetch_args)
+
+    assert len(test_results) == 4
+    assert {tr.tcid for tr in test_results} == set(tcid)
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+    assert get_call_time(hello_id) == 4
+    assert get_call_time(stub_id) == 0  # stubbed by artest, should not be called
+
+
+def test_prefetcher_yields_all_cases_under_memory_cap(tmp_path):
+    artest.config.set_artest_root(str(tmp_path))
+    try:
+        cases = []
+        for i in range(5):
+            case_root = tmp_path / "fc" / str(i)
+            case_root.mkdir(parents=True)
+            (case_root / "inputs").write_bytes(b"x" * (i + 10))
+            (case_root / "func").write_bytes(b"")
+            cases.append(("fc", str(i)))
+
+        prefetched = list(artest.artest._Prefetcher(cases, depth=2, max_bytes=1))
+
+        assert [(fcid, tcid) for fcid, tcid, _ in prefetched] == cases
+        for fcid, tcid, contents in prefetched:
+            inputs_path = str(tmp_path / fcid / tcid / "inputs")
+            assert contents == {inputs_path: b"x" * (int(tcid) + 10)}
+    finally:
+        artest.config._paths._artest_root = None
+
+
+class _BrokenInputsStorage(LocalStorage):
+    def get(self, fcid, tcid, artifact):
+        if artifact == "inputs":
+            raise ValueError("corrupted inputs")
+        return super().get(fcid, tcid, artifact)
+
+
+class _Abort(BaseException):
+    pass
+
+
+class _AbortingStorage(LocalStorage):
+    def size(self, fcid, tcid, artifact):
+        raise _Abort()
+
+
+@pytest.mark.parametrize("prefetch_args", [[], ["--prefetch-depth", "2"]])
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_prefetch_backend_error(prefetch_args):
+    set_test_case_id_generator(gen())
+    for i in range(3):
+        hello("Hello", "World" * (i + 1))
+
+    # the error is raised by the runner, whether the case was prefetched or not
+    set_storage_backend(_BrokenInputsStorage())
+    with pytest.raises(ValueError, match="corrupted inputs"):
+        artest.artest.main(prefetch_args)
+
+
+def test_prefetcher_reraises_worker_failure(tmp_path):
+    artest.config.set_artest_root(str(tmp_path))
+    set_storage_backend(_AbortingStorage())
+    try:
+        case_root = tmp_path / "fc" / "0"
+        case_root.mkdir(parents=True)
+        (case_root / "inputs").write_bytes(b"x")
+
+        with pytest.raises(_Abort):
+            list(artest.artest._Prefetcher([("fc", "0")], depth=2))
+    finally:
+        set_storage_backend()
+        artest.config._paths._artest_root = None
@@ -0,0 +1,61 @@
+import itertools
+import os
+import pstats
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import set_printer, set_test_case_id_generator
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+hello_id = "d5a3b4c6e7f84a9b8c0d1e2f3a4b5c6d"
+stub_id = "e6b4c5d7f8a94b0c9d1e2f3a4b5c6d7e"
+
+
+def helper(to):
+    return to.upper()
+
+
+@autoreg(hello_id)
+def hello(say, to):
+    return f"{say} {helper(to)} {the_stub(len(to))}!"
+
+
+@autostub(stub_id)
+def the_stub(x):
+    return x**2
+
+
+@make_test_autoreg(fcid_list=[hello_id, stub_id])
+def test_profile(tmp_path):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(2)]
+
+    hello("Hello", "World")
+    hello("Hi", "there")
+    for i in range(2):
+        assert_test_case_files_exist(hello_id, tcid[i])
+
+    messages = []
+    set_printer(messages.append)
+    profile_dir = str(tmp_path / "profile")
+    artest.artest.main(["--profile", profile_dir])
+
+    assert os.listdir(profile_dir) == [f"{hello_id}.pstats"]
+    stats = pstats.Stats(os.path.join(profile_dir, f"{hello_id}.pstats"))
+    funcnames = {funcname: nc for (_, _, funcname), (_, nc, *_) in stats.stats.items()}
+    assert funcnames["hello"] == 2  # merged over the test cases
+    assert funcnames["helper"] == 2
+    artest_dir = os.path.dirname(artest.__file__)
+    assert not any(filename.startswith(artest_dir) for filename, _, _ in stats.stats)
+
+    assert not any("dill" in filename for filename, _, _ in stats.stats)
+    assert any("cumulative" in m and "(hello)" in m for m in messages)
@@ -0,0 +1,136 @@
+import itertools
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import artest.artest
+from artest import autoreg
+from artest.config import set_printer, set_test_case_id_generator
+from artest.types import StatusTestResult
+from tests.helper import assert_test_case_files_exist, environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+func_id = "8e7d6c5b4a394f28a1b2c3d4e5f6a7b8"
+
+# the module is reloaded when artest looks up the functions,
+# so the behavior is switched with environment variables
+fail_env = "ARTEST_TEST_REPORT_FAIL"
+
+
+@autoreg(func_id)
+def double(x):
+    if os.environ.get(fail_env) and x > 1:
+        return x
+    return x * 2
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_report(tmp_path):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(3)]
+
+    for x in range(3):
+        double(x)
+    for i in range(3):
+        assert_test_case_files_exist(func_id, tcid[i])
+
+    report_jsonl = str(tmp_path / "report.jsonl")
+    junit_xml = str(tmp_path / "junit.xml")
+    with environ(fail_env, "1"):
+        test_results = artest.artest.main(
+            ["--no-cache", "--report-jsonl", report_jsonl, "--junit-xml", junit_xml]
+        )
+
+    statuses = {tr.tcid: tr.status for tr in test_results}
+    assert statuses == {
+        tcid[0]: StatusTestResult.SUCCESS,
+        tcid[1]: StatusTestResult.SUCCESS,
+        tcid[2]: StatusTestResult.FAIL,
+    }
+    for tr in test_results:
+        assert tr.wall_time >= 0
+        assert tr.cpu_time >= 0
+        assert tr.artifact_bytes > 0
+
+    with open(report_jsonl) as f:
+        records = [json.loads(line) for line in f]
+    assert {r["tcid"]: r["status"] for r in records} == {
+        k: v.value for k, v in statuses.items()
+    }
+    for r in records:
+        assert r["fcid"] == func_id
+        assert r["wall_time"] >= 0
+        assert r["cpu_time"] >= 0
+        assert r["artifact_bytes"] > 0
+
+    suite = ET.parse(junit_xml).getroot()
+    assert suite.tag == "testsuite"
+    assert suite.attrib["tests"] == "3"
+    assert suite.attrib["failures"] == "1"
+    assert suite.attrib["errors"] == "0"
+    testcases = suite.findall("testcase")
+    assert {tc.attrib["name"] for tc in testcases} == set(tcid)
+    failed = [tc for tc in testcases if tc.find("failure") is not None]
+    assert [tc.attrib["name"] for tc in failed] == [tcid[2]]
+    assert failed[0].find("failure").attrib["message"] == "Outputs not matched."
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_durations():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(3)]
+
+    for x in range(3):
+        double(x)
+
+    messages = []
+    set_printer(messages.append)
+    test_results = artest.artest.main(["--no-cache", "--durations", "2"])
+
+    for tr in test_results:
+        assert tr.load_time > 0
+        assert tr.exec_time > 0
+        assert tr.compare_time > 0
+        assert tr.load_time + tr.exec_time + tr.compare_time <= tr.wall_time
+
+    slowest_index = messages.index("Slowest test cases:")
+    slowest_cases = messages[slowest_index + 1 : slowest_index + 3]
+    slowest_tcids = [
+        tr.tcid for tr in sorted(test_results, key=lambda tr: -tr.wall_time)
+    ]
+    for message, tcid in zip(slowest_cases, slowest_tcids[:2]):
+        assert f"fc={func_id} tc={tcid} " in message
+    assert messages[slowest_index + 3] == "Slowest functions:"
+    assert messages[slowest_index + 4].endswith(f"fc={func_id} test_cases=3")
+    assert len(messages) == slowest_index + 5
+
+
+escaped_id = "2f4a6c8e0b1d4f3a5c7e9b1d3f5a7c02"
+
+
+@autoreg(escaped_id)
+def identity(x):
+    return x
+
+
+@make_test_autoreg(fcid_list=[escaped_id])
+def test_junit_xml_escaped(tmp_path):
+    # an id with a control character and a non-ASCII character
+    set_test_case_id_generator(iter(["caf\x1b\u00e9"]))
+    identity(1)
+
+    junit_xml = str(tmp_path / "junit.xml")
+    artest.artest.main(["--no-cache", "--junit-xml", junit_xml])
+
+    suite = ET.parse(junit_xml).getroot()
+    [testcase] = suite.findall("testcase")
+    assert testcase.attrib["name"] == "caf\u00e9"
@@ -0,0 +1,72 @@
+import itertools
+import os
+import time
+
+import pytest
+
+import artest.artest
+from artest import autoreg, search_meta
+from artest.config import set_profile_interval_on_case_mode, set_test_case_id_generator
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+busy_id = "f7c5d6e8a9b04c1d8e2f3a4b5c6d7e8f"
+
+
+def spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+@autoreg(busy_id)
+def busy(seconds):
+    spin(seconds)
+    return seconds
+
+
+@pytest.mark.parametrize("interval", [0.001, None])
+@make_test_autoreg(fcid_list=[busy_id])
+def test_sampling_profile(interval):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = next(gen2)
+
+    set_profile_interval_on_case_mode(interval)
+    assert busy(0.1) == 0.1
+    assert_test_case_files_exist(busy_id, tcid)
+
+    path = f"./.artest/{busy_id}/{tcid}/profile.collapsed"
+    if interval is None:
+        assert not os.path.exists(path)
+        return
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    stacks = {}
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+    assert all(stack.startswith("busy (") for stack in stacks)
+    assert any(";spin (" in stack for stack in stacks)
+    assert not any("artest.py" in stack for stack in stacks)
+
+    # the hash does not depend on whether the test case was sampled
+    tc_meta = search_meta(busy_id, tcid)
+    expected = (tc_meta.hash_hex, tc_meta.bytes_size)
+    os.remove(path)
+    assert artest.artest._MetaHandler.calc_hash(busy_id, tcid) == expected
+    assert (
+        artest.artest._MetaHandler.calc_hash_of_root(
+            artest.artest._paths.root(busy_id, tcid)
+        )
+        == expected
+    )
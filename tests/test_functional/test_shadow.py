@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import artest.artest
+from artest import autoreg, autoshadow, autostub, search_meta
+from artest.config import set_test_case_id_generator
+from artest.metrics import get_metrics_registry
+from artest.types import StatusTestResult
+from tests.helper import environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+func_id = "d1a9b0c2e3f44a5b8c6d7e8f9a0b1c23"
+scaled_id = "e2b0c1d3f4a54b6c9d7e8f0a1b2c3d34"
+scale_id = "f3c1d2e4a5b64c7d0e8f9a1b2c3d4e45"
+
+
+@autostub(scale_id)
+def scale():
+    return 10
+
+
+@autoreg(scaled_id)
+def scaled_total(values):
+    return sum(values) * scale()
+
+
+@autoreg(func_id)
+def total(values):
+    s = sum(values)
+    values.clear()  # the candidate should still see the inputs
+    return s
+
+
+def total_fast(values):
+    # wrong for negative values
+    return sum(abs(v) for v in values)
+
+
+def wait_shadow_calls():
+    artest.artest._shadow_candidates[func_id].wait()
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_shadow():
+    set_test_case_id_generator(gen())
+    autoshadow(func_id)(total_fast)
+
+    with environ("ARTEST_MODE", "disable"):
+        assert total([1, 2, 3]) == 6
+        assert total([1, -2, 3]) == 2
+        wait_shadow_calls()
+
+    registry = get_metrics_registry()
+    assert registry.get_counter("shadow_matches", func_id) == 1
+    assert registry.get_counter("shadow_mismatches", func_id) == 1
+    assert registry.get_histogram("shadow_primary_seconds", func_id).count == 2
+    assert registry.get_histogram("shadow_candidate_seconds", func_id).count == 2
+
+    # only the mismatch is recorded, expecting the primary output
+    (tcid,) = os.listdir(f"./.artest/{func_id}")
+    assert tcid.startswith("shadow-")
+    assert search_meta(func_id, tcid) is not None
+
+    test_results = artest.artest.main([])
+    assert [(tr.tcid, tr.status) for tr in test_results] == [
+        (tcid, StatusTestResult.SUCCESS)
+    ]
+
+
+@make_test_autoreg(fcid_list=[func_id])
+def test_shadow_sample_rate():
+    set_test_case_id_generator(gen())
+    autoshadow(func_id, sample_rate=0.0)(total_fast)
+
+    with environ("ARTEST_MODE", "disable"):
+        assert total([1, -2, 3]) == 2
+        wait_shadow_calls()
+
+    registry = get_metrics_registry()
+    assert registry.get_counter("shadow_mismatches", func_id) == 0
+    assert registry.get_histogram("shadow_candidate_seconds", func_id) is None
+    assert not os.path.exists(f"./.artest/{func_id}")
+
+
+@make_test_autoreg(fcid_list=[scaled_id, scale_id])
+def test_shadow_with_stub_calls():
+    set_test_case_id_generator(gen())
+    autoshadow(scaled_id)(lambda values: sum(values) * 100)
+
+    with environ("ARTEST_MODE", "disable"):
+        assert scaled_total([1, 2]) == 30
+        artest.artest._shadow_candidates[scaled_id].wait()
+
+    # the outputs of the stubs are not recorded, so neither is the mismatch
+    registry = get_metrics_registry()
+    assert registry.get_counter("shadow_mismatches", scaled_id) == 1
+    assert registry.get_counter("shadow_unrecorded", scaled_id) == 1
+    assert not os.path.exists(f"./.artest/{scaled_id}")
+
+    shadow = artest.artest._shadow_candidates[scaled_id]
+    shadow.shutdown()
+    with pytest.raises(RuntimeError):
+        shadow._executor.submit(print)
@@ -0,0 +1,297 @@
+import itertools
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import (
+    set_artest_root,
+    set_storage_backend,
+    set_test_case_id_generator,
+)
+from artest.storage import (
+    CachedStorage,
+    DeltaStorage,
+    HttpStorage,
+    InMemoryStorage,
+)
+from artest.types import StatusTestResult, StatusVerifyResult
+from tests.helper import make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+greet_id = "2f4a6c8e0b1d4f3a5c7e9b0d2f4a6c81"
+shout_id = "6d8f0a2c4e1b4d7f9a3c5e7b9d1f3a52"
+summarize_id = "9c1e3a5b7d2f4c6e8a0b1d3f5a7c9e24"
+
+
+@autoreg(greet_id)
+def greet(name):
+    return f"Hello {shout(name)}!"
+
+
+@autostub(shout_id)
+def shout(name):
+    return name.upper()
+
+
+@autoreg(summarize_id)
+def summarize(config):
+    return {key: str(value) for key, value in config.items()}
+
+
+@make_test_autoreg(fcid_list=[greet_id, shout_id])
+def test_commands_with_in_memory_storage(tmp_path):
+    storage = InMemoryStorage()
+    set_storage_backend(storage)
+    # nothing but the metadata is written under a fresh artest root
+    set_artest_root(str(tmp_path / "fresh"))
+    try:
+        tcid = capture_and_replay()
+
+        verify_results = artest.artest.main(["verify"])
+        assert {r.status for r in verify_results} == {StatusVerifyResult.OK}
+        bench_results = artest.artest.main(["bench", "--repeat", "1"])
+        assert [r.fcid for r in bench_results] == [greet_id]
+        with pytest.raises(ValueError, match="artest gc"):
+            artest.artest.main(["gc"])
+        assert len(artest.artest._meta_handler.read_meta().test_cases) == 2
+
+        bundle_path = str(tmp_path / "bundle.zip")
+        export_result = artest.artest.main(["export", bundle_path])
+        assert export_result.exported == [(greet_id, t) for t in tcid]
+
+        set_storage_backend(InMemoryStorage())
+        set_artest_root(str(tmp_path / "other"))
+        import_result = artest.artest.main(["import", bundle_path])
+        assert import_result.imported == [(greet_id, t) for t in tcid]
+        verify_results = artest.artest.main(["verify"])
+        assert {r.status for r in verify_results} == {StatusVerifyResult.OK}
+        test_results = artest.artest.main([])
+        assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+    finally:
+        artest.config._paths._artest_root = None
+
+
+class _ObjectStore(BaseHTTPRequestHandler):
+    """A local stand-in of an HTTP object store."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _key(self):
+        return unquote(urlparse(self.path).path).lstrip("/")
+
+    def _reply(self, code, body=b""):
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_PUT(self):
+        self.server.requests.append(("PUT", self._key()))
+        self.server.files[self._key()] = self.rfile.read(
+            int(self.headers["Content-Length"])
+        )
+        self._reply(200)
+
+    def do_GET(self):
+        if self.headers["Range"] is not None:
+            # only the ranges of the form bytes=0-{end} are served
+            end = int(self.headers["Range"].rpartition("-")[2])
+            self.server.requests.append(("RANGE", self._key()))
+            if self._key() not in self.server.files:
+                return self._reply(404)
+            return self._reply(206, self.server.files[self._key()][: end + 1])
+        self.server.requests.append(("GET", self._key()))
+        if self._key() == "":
+            prefix = parse_qs(urlparse(self.path).query).get("prefix", [""])[0]
+            names = sorted(k for k in self.server.files if k.startswith(prefix))
+            return self._reply(200, json.dumps(names).encode())
+        if self._key() not in self.server.files:
+            return self._reply(404)
+        self._reply(200, self.server.files[self._key()])
+
+    def do_HEAD(self):
+        if self._key() not in self.server.files:
+            return self._reply(404)
+        self._reply(200, self.server.files[self._key()])
+
+    def do_DELETE(self):
+        self.server.files.pop(self._key(), None)
+        self._reply(200)
+
+
+@pytest.fixture
+def object_store():
+    # the state is kept by the server, as the module is reloaded on replay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ObjectStore)
+    server.files = {}
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def capture_and_replay():
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(2)]
+
+    assert greet("world") == "Hello WORLD!"
+    assert greet("artest") == "Hello ARTEST!"
+    # nothing is written under the artest root but the metadata
+    assert not os.path.exists(f"./.artest/{greet_id}")
+
+    test_results = artest.artest.main([])
+    assert {tr.tcid for tr in test_results} == set(tcid)
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+    return tcid
+
+
+@make_test_autoreg(fcid_list=[greet_id, shout_id])
+def test_in_memory_storage():
+    storage = InMemoryStorage()
+    set_storage_backend(storage)
+
+    tcid = capture_and_replay()
+
+    assert (greet_id, tcid[0], "inputs") in storage.list(greet_id)
+    assert any(key[2].startswith("stub/") for key in storage.list(greet_id, tcid[0]))
+
+
+@make_test_autoreg(fcid_list=[greet_id, shout_id])
+def test_http_storage_with_cache(object_store, tmp_path):
+    set_storage_backend(HttpStorage(object_store.url))
+    tcid = capture_and_replay()
+    assert f"{greet_id}/{tcid[0]}/outputs" in object_store.files
+
+    # a worker replaying through the cache fetches each file once
+    cached_storage = CachedStorage(
+        HttpStorage(object_store.url), str(tmp_path / "cache"), max_bytes=1 << 20
+    )
+    set_storage_backend(cached_storage)
+    object_store.requests.clear()
+    for _ in range(2):
+        test_results = artest.artest.main(["--no-cache"])
+        assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+    gets = [key for method, key in object_store.requests if method == "GET" and key]
+    assert len(gets) == len(set(gets))
+
+
+def test_cached_storage_evicts_least_recently_read(tmp_path):
+    backend = InMemoryStorage()
+    for name in ["a", "b", "c"]:
+        backend.put("fc", "tc", name, b"x" * 10)
+
+    storage = CachedStorage(backend, str(tmp_path), max_bytes=20)
+    storage.get("fc", "tc", "a")
+    storage.get("fc", "tc", "b")
+    storage.get("fc", "tc", "a")
+    storage.get("fc", "tc", "c")
+
+    assert sorted(os.listdir(tmp_path / "fc" / "tc")) == ["a", "c"]
+
+    backend.delete("fc", "tc", "a")
+    assert storage.get("fc", "tc", "a") == b"x" * 10  # served by the cache
+
+    storage.put("fc", "tc", "c", b"y")
+    assert storage.get("fc", "tc", "c") == b"y"
+
+    # the cache is kept between runs
+    storage = CachedStorage(backend, str(tmp_path), max_bytes=20)
+    assert storage.get("fc", "tc", "a") == b"x" * 10
+
+
+@make_test_autoreg(fcid_list=[summarize_id])
+def test_delta_storage():
+    backend = InMemoryStorage()
+    references = InMemoryStorage()
+    storage = DeltaStorage(backend, references)
+    set_storage_backend(storage)
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(5)]
+
+    config = {f"option_{i}": i for i in range(200)}
+    for i in range(5):
+        summarize({**config, "option_0": f"changed {i}"})
+
+    # near-duplicates are stored as deltas
+    data = backend.get(summarize_id, tcid[1], "inputs")
+    assert data.startswith(DeltaStorage.MAGIC)
+    assert storage.size(summarize_id, tcid[1], "inputs") > len(data)
+    report = storage.report(summarize_id)
+    assert report.delta_files >= 10
+    assert report.saved_bytes > report.stored_bytes
+
+    # removing the case the reference was copied from breaks nothing
+    for key in storage.list(summarize_id, tcid[0]):
+        storage.delete(*key)
+    test_results = artest.artest.main([])
+    assert {tr.tcid for tr in test_results} == set(tcid[1:])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
+
+
+def test_delta_storage_round_trip():
+    storage = DeltaStorage(InMemoryStorage(), InMemoryStorage(), min_bytes=1)
+    reference = bytes(range(256)) * 4
+    cases = {
+        "same": reference,
+        "changed": reference[:100] + b"xyz" + reference[110:],
+        "appended": reference + b"tail",
+        "truncated": reference[:-300],
+        "unrelated": b"\0" * 1000,
+        "short": b"a",
+        # stored as is, but escaped so as not to be read as deltas
+        "magic": DeltaStorage.MAGIC + b"\0" * 100,
+        "raw_magic": DeltaStorage.RAW_MAGIC,
+    }
+    storage.put("fc", "ref", "outputs", reference)
+    for tcid, data in cases.items():
+        storage.put("fc", tcid, "outputs", data)
+    for tcid, data in cases.items():
+        assert storage.get("fc", tcid, "outputs") == data
+        assert storage.size("fc", tcid, "outputs") == len(data)
+
+    # stub files of the same function share a reference
+    storage.put("fc", "a", "stub/sf.0.h0.output", reference)
+    storage.put("fc", "b", "stub/sf.1.h1.output", reference + b"!")
+    assert storage.get("fc", "b", "stub/sf.1.h1.output") == reference + b"!"
+    assert storage.report().delta_files == 7
+
+
+def test_delta_storage_size_reads_header(object_store):
+    storage = DeltaStorage(HttpStorage(object_store.url), InMemoryStorage())
+    reference = bytes(range(256)) * 4
+    cases = {
+        "ref": reference,
+        "changed": reference[:100] + b"xyz" + reference[110:],
+        "short": b"a",
+        "magic": DeltaStorage.MAGIC,
+    }
+    for tcid, data in cases.items():
+        storage.put("fc", tcid, "outputs", data)
+
+    object_store.requests.clear()
+    for tcid, data in cases.items():
+        assert storage.size("fc", tcid, "outputs") == len(data)
+    assert not [method for method, _ in object_store.requests if method == "GET"]
+    assert storage.get("fc", "magic", "outputs") == DeltaStorage.MAGIC
@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import artest.artest
+from artest import autoreg, autostub
+from artest.config import set_test_case_id_generator
+from artest.types import StatusTestResult, StubMatchPolicy
+from tests.helper import environ, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+fetch_id = "5f7a9c1e3b2d4f6a8c0e2b4d6f8a0c68"
+fetch_ordered_id = "2c4e6a8b0d1f4a3c5e7b9d1f3a5c7e79"
+gather_id = "8d0f2a4c6e1b4d3f5a7c9e1b3d5f7a80"
+gather_ordered_id = "4a6c8e0b2d1f4e3a5c7e9b1d3f5a7c91"
+visit_id = "6b8d0f2a4c1e4b3d5f7a9c1e3b5d7f02"
+visit_all_id = "0e2a4c6b8d1f4a3e5c7b9d1f3a5c7e13"
+load_id = "3e5a7c9b1d2f4e6a8c0b2d4f6a8c0e24"
+load_all_id = "7a9c1e3b5d2f4a6c8e0b2d4f6a8c0e35"
+
+_visited = []
+
+
+@autostub(fetch_id, match_policy=StubMatchPolicy.INPUT_HASH)
+def fetch(key):
+    return key.upper()
+
+
+@autostub(fetch_ordered_id)
+def fetch_ordered(key):
+    return key.upper()
+
+
+async def _fetch_later(fetch_func, key, i):
+    # the calls are completed in reverse order when reversed
+    delay = i if os.environ.get("ARTEST_TEST_REVERSED") else -i
+    await asyncio.sleep(0.01 * (delay + 10))
+    return fetch_func(key)
+
+
+async def _gather(fetch_func, keys):
+    return await asyncio.gather(
+        *[_fetch_later(fetch_func, key, i) for i, key in enumerate(keys)]
+    )
+
+
+@autoreg(gather_id)
+def gather(keys):
+    return asyncio.run(_gather(fetch, keys))
+
+
+@autoreg(gather_ordered_id)
+def gather_ordered(keys):
+    return asyncio.run(_gather(fetch_ordered, keys))
+
+
+@autostub(visit_id, match_policy=StubMatchPolicy.INPUT_HASH)
+def visit(key):
+    # the n-th visit of a key returns n
+    _visited.append(key)
+    return _visited.count(key)
+
+
+@autoreg(visit_all_id)
+def visit_all(keys):
+    if os.environ.get("ARTEST_TEST_REVERSED"):
+        keys = keys[::-1]
+    visits = {}
+    for key in keys:
+        visits.setdefault(key, []).append(visit(key))
+    return visits
+
+
+_loaded = []
+
+
+@autostub(load_id, match_policy=StubMatchPolicy.INPUT_HASH)
+def load(key):
+    # the calls are completed in reverse order when reversed
+    delay = ord(key) if os.environ.get("ARTEST_TEST_REVERSED") else -ord(key)
+    time.sleep(0.01 * (delay % 10))
+    _loaded.append(key)
+    return key.upper()
+
+
+@autoreg(load_all_id)
+def load_all(keys):
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, load, key) for key in keys
+        ]
+        return [future.result() for future in futures]
+
+
+@make_test_autoreg(fcid_list=[load_all_id, load_id])
+def test_input_hash_policy_thread_pool():
+    set_test_case_id_generator(gen())
+    keys = ["a", "b", "c"]
+    assert load_all(keys) == ["A", "B", "C"]
+    assert len(_loaded) == 3
+
+    with environ("ARTEST_TEST_REVERSED", "1"):
+        test_results = artest.artest.main([])
+    assert [tr.status for tr in test_results] == [StatusTestResult.SUCCESS]
+    # replayed from the recorded outputs, the module is reloaded on replay
+    assert _loaded == []
+
+
+@make_test_autoreg(
+    fcid_list=[
+        gather_id,
+        gather_ordered_id,
+        visit_all_id,
+        fetch_id,
+        fetch_ordered_id,
+        visit_id,
+    ]
+)
+def test_input_hash_policy():
+    set_test_case_id_generator(itertools.islice(gen(), 3))
+    keys = ["a", "b", "a", "c"]
+    assert gather(keys) == ["A", "B", "A", "C"]
+    gather_ordered(keys)
+    assert visit_all(["a", "a", "b"]) == {"a": [1, 2], "b": [1]}
+
+    with environ("ARTEST_TEST_REVERSED", "1"):
+        test_results = artest.artest.main([])
+    statuses = {tr.fcid: tr.status for tr in test_results}
+    assert statuses[gather_id] == StatusTestResult.SUCCESS
+    # the calls with the same inputs are replayed first recorded first
+    assert statuses[visit_all_id] == StatusTestResult.SUCCESS
+    assert statuses[gather_ordered_id] != StatusTestResult.SUCCESS
+
+    # replayed again in the recorded order
+    test_results = artest.artest.main(["--no-cache"])
+    assert {tr.status for tr in test_results} == {StatusTestResult.SUCCESS}
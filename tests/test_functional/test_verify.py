@@ -0,0 +1,98 @@
+import itertools
+import json
+import os
+import shutil
+
+import artest.artest
+from artest import autoreg
+from artest.config import set_artest_root, set_test_case_id_generator
+from artest.types import StatusVerifyResult
+from tests.helper import assert_test_case_files_exist, make_test_autoreg
+
+
+def gen():
+    i = 0
+    while True:
+        yield str(i)
+        i += 1
+
+
+cube_id = "8b2d4f6a1c3e4b5d9f7a2c4e6b8d0f13"
+
+
+@autoreg(cube_id)
+def cube(x):
+    return x**3
+
+
+def capture_cube_cases(n):
+    gen1, gen2 = itertools.tee(gen(), 2)
+    set_test_case_id_generator(gen1)
+    tcid = [next(gen2) for _ in range(n)]
+    for i in range(n):
+        cube(i)
+    for i in range(n):
+        assert_test_case_files_exist(cube_id, tcid[i])
+    return tcid
+
+
+@make_test_autoreg(fcid_list=[cube_id])
+def test_verify(tmp_path):
+    tcid = capture_cube_cases(4)
+    case_root = f"./.artest/{cube_id}"
+
+    with open(f"{case_root}/{tcid[1]}/inputs", "ab") as f:
+        f.write(b"\0")
+    with open(f"{case_root}/{tcid[2]}/outputs", "ab") as f:
+        f.write(b"\0")
+    os.remove(f"{case_root}/{tcid[3]}/func")
+
+    report_path = str(tmp_path / "verify.jsonl")
+    verify_results = artest.artest.main(
+        ["verify", "--workers", "2", "--report-jsonl", report_path]
+    )
+
+    assert [(r.tcid, r.status) for r in verify_results] == [
+        (tcid[0], StatusVerifyResult.OK),
+        (tcid[1], StatusVerifyResult.MODIFIED),
+        (tcid[2], StatusVerifyResult.CORRUPTED),
+        (tcid[3], StatusVerifyResult.MISSING),
+    ]
+    with open(report_path) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted((r["tcid"], r["status"]) for r in records) == [
+        (r.tcid, r.status.value) for r in verify_results
+    ]
+
+
+@make_test_autoreg(fcid_list=[cube_id])
+def test_verify_moved_root(tmp_path):
+    capture_cube_cases(2)
+    artest.artest.main(["--refresh"])
+
+    moved_root = str(tmp_path / "moved")
+    shutil.copytree("./.artest", moved_root)
+    set_artest_root(moved_root)
+    try:
+        verify_results = artest.artest.main(["verify"])
+    finally:
+        artest.config._paths._artest_root = None
+
+    assert len(verify_results) == 2
+    assert {r.status for r in verify_results} == {StatusVerifyResult.OK}
+
+
+@make_test_autoreg(fcid_list=[cube_id])
+def test_verify_legacy_hash():
+    tcid = capture_cube_cases(1)
+
+    meta = artest.artest._meta_handler.read_meta()
+    tc_meta = meta.test_cases[0]
+    tc_meta.hash_hex, _ = artest.artest._meta_handler.calc_hash(
+        cube_id, tcid[0], hash_version=1
+    )
+    tc_meta.hash_version = 1
+    artest.artest._meta_handler.save_meta(meta)
+
+    verify_results = artest.artest.main(["verify"])
+    assert [r.status for r in verify_results] == [StatusVerifyResult.OK]